@@ -7,8 +7,15 @@ from routes.profil import profile
 from routes.igre import igre
 from routes.zamjene import zamjene
 from routes.admin import admin
+from routes.uploads import uploads
+from routes.events import events
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
+from utils.schema import init_database, upgrade_db_command
+from utils.image_store import cleanup_images_command, migrate_images_command
+from utils.outbox import outbox_worker_command, start_outbox_workers
+from utils.trade_counters import reconcile_trade_counters_command
+from utils.current_user import revoke_tokens_command
 import os
 
 from models.actualUser import Korisnik
@@ -18,6 +25,7 @@ from models.igra import Igra
 from models.ponuda import Ponuda
 from models.listazelja import ListaZelja
 from models.zamjena import Zamjena, ZamjenaIgra
+from models.obavijest import Obavijest
 
 app = Flask(__name__, static_folder="../Frontend/build", static_url_path="/")
 app.config.from_object(Config)
@@ -34,6 +42,20 @@ app.register_blueprint(profile, url_prefix="/api")
 app.register_blueprint(igre, url_prefix="/api")
 app.register_blueprint(zamjene, url_prefix="/api")
 app.register_blueprint(admin, url_prefix="/api")
+app.register_blueprint(uploads, url_prefix="/api")
+app.register_blueprint(events, url_prefix="/api")
+
+app.cli.add_command(migrate_images_command)
+app.cli.add_command(cleanup_images_command)
+app.cli.add_command(outbox_worker_command)
+app.cli.add_command(reconcile_trade_counters_command)
+app.cli.add_command(revoke_tokens_command)
+app.cli.add_command(upgrade_db_command)
+
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return {"error": "Zahtjev je prevelik."}, 413
 
 
 @app.route("/api/health")
@@ -53,8 +75,9 @@ def server_react(path):
         return send_from_directory(build_dir, "index.html") 
 
 
-with app.app_context():
-    db.create_all()
-
 if __name__ == "__main__":
+    with app.app_context():
+        init_database()
+    if app.config["EMAIL_OUTBOX_WORKERS"] > 0:
+        start_outbox_workers(app)
     app.run(debug=True)
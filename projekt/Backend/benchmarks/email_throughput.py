@@ -0,0 +1,155 @@
+"""Notification email throughput benchmark against a local SMTP sink.
+
+Run from projekt/Backend:
+
+    python -m benchmarks.email_throughput --messages 500 --requests 200 --latency-ms 5
+"""
+import os
+import statistics
+import tempfile
+import time
+
+import click
+
+from utils.smtp_sink import SMTPSink
+
+NOTIFICATIONS = (
+    lambda es, to, i: es.send_trade_offer_notification(to, f"Korisnik {i}", f"Igra {i}", ["Catan", "Azul"]),
+    lambda es, to, i: es.send_trade_accepted_notification(to, f"Korisnik {i}", "Catan", f"Igra {i}"),
+    lambda es, to, i: es.send_trade_rejected_notification(to, f"Korisnik {i}", f"Igra {i}"),
+    lambda es, to, i: es.send_counter_offer_notification(to, f"Korisnik {i}", f"Igra {i}", ["Dixit"]),
+    lambda es, to, i: es.send_wishlist_available_notification(to, f"Igra {i}", f"Korisnik {i}"),
+)
+
+
+def report(name, count, elapsed, latencies=None, unit='msg'):
+    line = f"{name:<34} {count:6d} {unit}s  {count / elapsed:9.1f} {unit}/s"
+    if latencies and len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+        line += f"  p50 {statistics.median(latencies) * 1000:8.2f} ms  p99 {cuts[98] * 1000:8.2f} ms"
+    click.echo(line)
+
+
+def timed(calls):
+    latencies = []
+    started = time.perf_counter()
+    for call in calls:
+        call_started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - call_started)
+    return time.perf_counter() - started, latencies
+
+
+def bench_direct(app, email_service, count):
+    app.config['EMAIL_OUTBOX_ENABLED'] = False
+    with app.app_context():
+        elapsed, latencies = timed(
+            lambda i=i: NOTIFICATIONS[i % len(NOTIFICATIONS)](email_service, f"user{i % 50}@example.com", i)
+            for i in range(count)
+        )
+    report("direct send (pooled SMTP)", count, elapsed, latencies)
+
+
+def bench_outbox(app, email_service, outbox, db, count):
+    app.config['EMAIL_OUTBOX_ENABLED'] = True
+
+    def queue(i):
+        NOTIFICATIONS[i % len(NOTIFICATIONS)](email_service, f"user{i % 50}@example.com", i)
+        db.session.commit()
+
+    with app.app_context():
+        elapsed, latencies = timed(lambda i=i: queue(i) for i in range(count))
+        report("outbox enqueue", count, elapsed, latencies)
+
+        started = time.perf_counter()
+        delivered = 0
+        while processed := outbox.process_outbox_batch():
+            delivered += processed
+        report("outbox drain", delivered, time.perf_counter() - started)
+
+
+def seed_trade(app, db):
+    from models.actualUser import Korisnik
+    from models.igra import Igra
+    from models.ponuda import Ponuda
+    from models.zanr import Zanr
+
+    with app.app_context():
+        genre = Zanr(naziv_zanr="Benchmark")
+        owner = Korisnik(email="owner@example.com", username="Owner", passwordHash="x", jeAdmin=0)
+        offerer = Korisnik(email="offerer@example.com", username="Offerer", passwordHash="x", jeAdmin=0)
+        db.session.add_all([genre, owner, offerer])
+        db.session.flush()
+
+        games = []
+        for user, title in ((owner, "Catan"), (offerer, "Azul")):
+            game = Igra(naziv=title, izdavac="Benchmark", godina_izdanja=2020, ocjena_ocuvanosti=5,
+                        broj_igraca="2-4", vrijeme_igranja="60 min", procjena_tezine=2, id_zanr=genre.id)
+            db.session.add(game)
+            db.session.flush()
+            db.session.add(Ponuda(id_korisnik=user.id, id_igra=game.id, jeAktivna=1))
+            games.append(game.id)
+        db.session.commit()
+        return {'email': offerer.email, 'trazenaIgraId': games[0], 'ponudjeneIgreIds': [games[1]]}
+
+
+def bench_api(app, payload, count, outbox_enabled):
+    app.config['EMAIL_OUTBOX_ENABLED'] = outbox_enabled
+    client = app.test_client()
+
+    def create_trade():
+        response = client.post('/api/trades', json=payload)
+        assert response.status_code == 201, response.get_json()
+
+    elapsed, latencies = timed(create_trade for _ in range(count))
+    name = "POST /api/trades (outbox)" if outbox_enabled else "POST /api/trades (inline SMTP)"
+    report(name, count, elapsed, latencies, unit='req')
+
+
+@click.command()
+@click.option('--messages', default=500, help='Notifications per delivery scenario.')
+@click.option('--requests', default=200, help='API requests per latency scenario.')
+@click.option('--latency-ms', default=2.0, help='Latency the sink adds to every SMTP reply.')
+@click.option('--failure-rate', default=0.0, help='Share of messages the sink rejects with 451.')
+@click.option('--seed', default=1, help='Seed for failure injection.')
+def main(messages, requests, latency_ms, failure_rate, seed):
+    """Measure notification throughput, latency and its effect on API latency."""
+    with SMTPSink(latency=latency_ms / 1000, failure_rate=failure_rate, seed=seed) as sink, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(tmp, 'benchmark.db')}",
+            'EMAIL_ENABLED': 'true',
+            'SMTP_SERVER': sink.host,
+            'SMTP_PORT': str(sink.port),
+            'SMTP_USERNAME': 'benchmark',
+            'SMTP_PASSWORD': 'benchmark',
+            'SMTP_USE_TLS': 'false',
+            'EMAIL_OUTBOX_WORKERS': '0',
+            'EMAIL_DIGEST_WINDOW_SECONDS': '0',
+            'IMAGE_STORE_DIR': os.path.join(tmp, 'images'),
+            'THUMBNAIL_CACHE_DIR': os.path.join(tmp, 'thumbnails'),
+            'UPLOAD_TMP_DIR': os.path.join(tmp, 'uploads'),
+        })
+        from app import app
+        from database import db
+        from utils import email_service, outbox
+        from utils.schema import init_database
+
+        with app.app_context():
+            init_database()
+
+        click.echo(f"SMTP sink latency {latency_ms} ms/reply, failure rate {failure_rate:.0%}")
+        bench_direct(app, email_service, messages)
+        bench_outbox(app, email_service, outbox, db, messages)
+
+        payload = seed_trade(app, db)
+        bench_api(app, payload, requests, outbox_enabled=False)
+        bench_api(app, payload, requests, outbox_enabled=True)
+
+        click.echo(f"SMTP pool: {email_service.get_smtp_pool().stats()}")
+        click.echo(f"Sink: {len(sink.messages)} messages over {sink.connections} connections")
+        email_service.reset_smtp_pool()
+
+
+if __name__ == '__main__':
+    main()
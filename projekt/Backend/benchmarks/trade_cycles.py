@@ -0,0 +1,92 @@
+"""Trade cycle matching benchmark on a synthetic listing/wishlist graph.
+
+Run from projekt/Backend:
+
+    python -m benchmarks.trade_cycles --listings 100000 --users 25000
+"""
+import random
+import statistics
+import time
+
+import click
+
+from utils.trade_matching import TradeGraph
+
+
+def zipf_titles(rng, titles, count, skew):
+    weights = [1 / (rank + 1) ** skew for rank in range(titles)]
+    return rng.choices(range(titles), weights=weights, k=count)
+
+
+def report(name, elapsed, count=None, latencies=None):
+    line = f"{name:<32} {elapsed * 1000:10.1f} ms"
+    if count is not None:
+        line += f"  {count / elapsed:12.0f} ops/s"
+    if latencies and len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100)
+        line += f"  p50 {statistics.median(latencies) * 1e6:8.1f} us  p99 {cuts[98] * 1e6:8.1f} us"
+    click.echo(line)
+
+
+@click.command()
+@click.option('--listings', default=100000, help='Active listings in the synthetic graph.')
+@click.option('--users', default=25000, help='Distinct users.')
+@click.option('--titles', default=8000, help='Distinct game titles.')
+@click.option('--wishes', default=4, help='Wishlist entries per user.')
+@click.option('--skew', default=0.8, help='Zipf exponent of title popularity.')
+@click.option('--queries', default=2000, help='Per-user suggestion lookups to time.')
+@click.option('--updates', default=20000, help='Incremental listing/wish updates to time.')
+@click.option('--seed', default=1)
+def main(listings, users, titles, wishes, skew, queries, updates, seed):
+    """Measure graph build, incremental updates and 2-4 cycle search."""
+    rng = random.Random(seed)
+    listing_titles = zipf_titles(rng, titles, listings, skew)
+    listing_owners = [rng.randrange(users) for _ in range(listings)]
+    wish_titles = zipf_titles(rng, titles, users * wishes, skew)
+
+    graph = TradeGraph()
+    started = time.perf_counter()
+    for game_id, (owner, title) in enumerate(zip(listing_owners, listing_titles)):
+        graph.add_listing(owner, game_id, title)
+    for i, title in enumerate(wish_titles):
+        graph.add_wish(i // wishes, title)
+    report(f"build ({listings} listings)", time.perf_counter() - started, listings + len(wish_titles))
+
+    implied = sum(len(w) * len(l) for w, l in zip(graph._wanters, graph._listers))
+    click.echo(f"graph: {len(graph)} users, {len(graph._wanters)} titles, ~{implied} user-to-user edges implied")
+
+    latencies = []
+    found = 0
+    started = time.perf_counter()
+    for user in rng.sample(range(users), min(queries, users)):
+        query_started = time.perf_counter()
+        found += len(graph.cycles_for(user, limit=20))
+        latencies.append(time.perf_counter() - query_started)
+    report("cycles_for (limit 20)", time.perf_counter() - started, len(latencies), latencies)
+    click.echo(f"  {found} suggestions for {len(latencies)} users")
+
+    latencies = []
+    started = time.perf_counter()
+    next_game = listings
+    for _ in range(updates):
+        update_started = time.perf_counter()
+        if rng.random() < 0.5:
+            game_id = rng.randrange(listings)
+            graph.remove_listing(listing_owners[game_id], game_id, listing_titles[game_id])
+            graph.add_listing(rng.randrange(users), next_game, listing_titles[game_id])
+            next_game += 1
+        else:
+            user = rng.randrange(users)
+            graph.add_wish(user, rng.randrange(titles))
+        latencies.append(time.perf_counter() - update_started)
+    report("incremental updates", time.perf_counter() - started, updates, latencies)
+
+    started = time.perf_counter()
+    cycles = graph.find_cycles(limit=100000)
+    report("find_cycles (limit 100k)", time.perf_counter() - started)
+    by_length = {length: sum(1 for c in cycles if len(c) == length) for length in (2, 3, 4)}
+    click.echo(f"  {len(cycles)} cycles, by length {by_length}")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,19 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'tajnikljuc')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwttajnikljuc')
+    AUTH_EMAIL_FALLBACK = os.environ.get('AUTH_EMAIL_FALLBACK', 'true').lower() == 'true'
+    AUTH_CLAIMS_CACHE_SECONDS = float(os.environ.get('AUTH_CLAIMS_CACHE_SECONDS', '30'))
+
+    # Google sign-in
+    GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID', '908350048308-7gtb4thpdptckllb3hal2jrmctb7a0sl.apps.googleusercontent.com')
+    GOOGLE_KEY_SOURCE = os.environ.get('GOOGLE_KEY_SOURCE', 'utils.google_auth.GoogleCertSource')
+    GOOGLE_CERTS_CACHE_PATH = os.environ.get('GOOGLE_CERTS_CACHE_PATH', os.path.join(basedir, 'instance', 'google_certs.json'))
+
+    # Password hashing
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', '12'))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '4'))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', '32'))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', '10'))
     # Use absolute path for SQLite database
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{os.path.join(basedir, "instance", "database.db")}')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -16,4 +29,36 @@ class Config:
     SMTP_PORT = int(os.environ.get('SMTP_PORT', '587'))
     SMTP_USERNAME = os.environ.get('SMTP_USERNAME', '')
     SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
+    SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
     FROM_EMAIL = os.environ.get('FROM_EMAIL', '')
+    EMAIL_OUTBOX_ENABLED = os.environ.get('EMAIL_OUTBOX_ENABLED', 'true').lower() == 'true'
+    EMAIL_OUTBOX_WORKERS = int(os.environ.get('EMAIL_OUTBOX_WORKERS', '2'))
+    EMAIL_OUTBOX_POLL_SECONDS = float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', '5'))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+    EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.environ.get('EMAIL_OUTBOX_BACKOFF_SECONDS', '30'))
+    EMAIL_DIGEST_WINDOW_SECONDS = int(os.environ.get('EMAIL_DIGEST_WINDOW_SECONDS', '900'))
+
+    # Server-sent events; the default in-process broker only reaches clients
+    # connected to the same worker process
+    EVENT_STREAM_ENABLED = os.environ.get('EVENT_STREAM_ENABLED', 'false').lower() == 'true'
+    EVENT_BROKER = os.environ.get('EVENT_BROKER', 'utils.events.InProcessBroker')
+    EVENT_BUFFER_SIZE = int(os.environ.get('EVENT_BUFFER_SIZE', '100'))
+    EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', '15'))
+
+    # Trade suggestions; other workers' changes show up once the graph is this old
+    TRADE_GRAPH_MAX_AGE_SECONDS = float(os.environ.get('TRADE_GRAPH_MAX_AGE_SECONDS', '60'))
+
+    # Image storage
+    IMAGE_STORE_DIR = os.environ.get('IMAGE_STORE_DIR', os.path.join(basedir, 'instance', 'images'))
+    IMAGE_ACCEL_REDIRECT_PREFIX = os.environ.get('IMAGE_ACCEL_REDIRECT_PREFIX', '')
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    THUMBNAIL_CACHE_DIR = os.environ.get('THUMBNAIL_CACHE_DIR', os.path.join(basedir, 'instance', 'thumbnails'))
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', '2'))
+
+    # Upload limits
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
+    MAX_IMAGE_SIZE = int(os.environ.get('MAX_IMAGE_SIZE', str(10 * 1024 * 1024)))
+    MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', str(40 * 1000 * 1000)))
+    UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR', os.path.join(basedir, 'instance', 'uploads'))
+    UPLOAD_MAX_SESSIONS = int(os.environ.get('UPLOAD_MAX_SESSIONS', '5'))
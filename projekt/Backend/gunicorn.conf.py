@@ -0,0 +1,22 @@
+# Loaded by gunicorn from the working directory.
+
+
+def on_starting(server):
+    """Upgrade the schema once in the master, before any worker boots."""
+    from app import app
+    from database import db
+    from utils.schema import init_database
+
+    with app.app_context():
+        init_database()
+        db.session.remove()
+        db.engine.dispose()
+
+
+def post_worker_init(worker):
+    """Start the email outbox threads in each server worker, not on every import of app."""
+    from app import app
+    from utils.outbox import start_outbox_workers
+
+    if app.config["EMAIL_OUTBOX_WORKERS"] > 0:
+        start_outbox_workers(app)
@@ -1,17 +1,38 @@
 from database import db
 from sqlalchemy.dialects.sqlite import BLOB
+from sqlalchemy.orm import deferred, validates
+
+NOTIFICATION_MODES = ('instant', 'digest')
 
 class Korisnik(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(20), nullable=False)
     passwordHash = db.Column(db.Integer, nullable=False)
-    fotografija = db.Column(BLOB, nullable=True)
+    fotografija = deferred(db.Column(BLOB, nullable=True))
+    has_image = db.Column(db.Boolean, nullable=False, default=False, server_default='0', index=True)
+    image_size = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    image_hash = db.Column(db.String(64), nullable=True)
+    image_mimetype = db.Column(db.String(32), nullable=True)
     opis = db.Column(db.String(300), nullable=True)
-    lokacija = db.Column(BLOB, nullable=True)
-    email = db.Column(db.String(254), nullable=False)
+    lokacija = deferred(db.Column(BLOB, nullable=True))
+    email = db.Column(db.String(254), nullable=False, unique=True, index=True)
     jeAdmin = db.Column(db.Integer, nullable=False)
+    verzija_tokena = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    broj_novih_zamjena = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    nacin_obavijesti = db.Column(db.String(10), nullable=False, default='instant', server_default=db.text("'instant'"))
 
     interesira = db.relationship('Interes', backref='user', lazy=True)
 
+    @validates('fotografija')
+    def _sync_image_flags(self, key, value):
+        if value is not None:
+            self.has_image = True
+            self.image_size = len(value)
+        return value
 
-
+    def set_stored_image(self, digest, size, mimetype=None):
+        self.image_hash = digest
+        self.image_mimetype = mimetype
+        self.fotografija = None
+        self.has_image = True
+        self.image_size = size
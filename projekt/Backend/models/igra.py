@@ -1,20 +1,120 @@
 from database import db
 from sqlalchemy.dialects.sqlite import BLOB
+from sqlalchemy import event
+from sqlalchemy.orm import deferred, validates
+
+MAX_PLAYERS_OPEN_ENDED = 99
+
+
+def parse_player_range(players_str):
+    try:
+        players_str = (players_str or '').strip()
+        if '-' in players_str:
+            parts = players_str.split('-')
+            return int(parts[0]), int(parts[1])
+        if '+' in players_str:
+            return int(players_str.replace('+', '')), MAX_PLAYERS_OPEN_ENDED
+        count = int(players_str)
+        return count, count
+    except ValueError:
+        return None, None
+
+
+def normalize_title(title):
+    return ' '.join((title or '').casefold().split())
+
 
 class Igra(db.Model):
     __tablename__ = 'igra'
     id = db.Column(db.Integer, primary_key=True)
     naziv = db.Column(db.String(250), nullable=False)
+    naziv_normaliziran = db.Column(db.String(250), nullable=True, index=True)
     izdavac = db.Column(db.String(100), nullable=False)
     godina_izdanja = db.Column(db.Integer, nullable=False)
     ocjena_ocuvanosti = db.Column(db.Integer, nullable=False)
     broj_igraca = db.Column(db.String(10), nullable=False)
+    min_igraca = db.Column(db.Integer, nullable=True, index=True)
+    max_igraca = db.Column(db.Integer, nullable=True, index=True)
     vrijeme_igranja = db.Column(db.String(15), nullable=False)
-    procjena_tezine = db.Column(db.Integer, nullable=False)
-    fotografija = db.Column(BLOB, nullable=True)
+    procjena_tezine = db.Column(db.Integer, nullable=False, index=True)
+    fotografija = deferred(db.Column(BLOB, nullable=True))
+    has_image = db.Column(db.Boolean, nullable=False, default=False, server_default='0', index=True)
+    image_size = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    image_hash = db.Column(db.String(64), nullable=True)
+    image_mimetype = db.Column(db.String(32), nullable=True)
     dodatan_opis = db.Column(db.String(500), nullable=True)
     id_zanr = db.Column(db.Integer, db.ForeignKey('zanr.id'), nullable=False)
-    
+
     zanr = db.relationship('Zanr', backref='igre', lazy=True)
     ponude = db.relationship('Ponuda', backref='igra', lazy=True)
     lista_zelja = db.relationship('ListaZelja', backref='igra', lazy=True)
+
+    @validates('naziv')
+    def _sync_normalized_title(self, key, value):
+        self.naziv_normaliziran = normalize_title(value)
+        return value
+
+    @validates('broj_igraca')
+    def _sync_player_range(self, key, value):
+        self.min_igraca, self.max_igraca = parse_player_range(value)
+        return value
+
+    @validates('fotografija')
+    def _sync_image_flags(self, key, value):
+        if value is not None:
+            self.has_image = True
+            self.image_size = len(value)
+        return value
+
+    def set_stored_image(self, digest, size, mimetype=None):
+        self.image_hash = digest
+        self.image_mimetype = mimetype
+        self.fotografija = None
+        self.has_image = True
+        self.image_size = size
+
+
+SEARCH_INDEX_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS igra_fts USING fts5(
+        naziv, izdavac, dodatan_opis,
+        content='igra', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS igra_fts_ai AFTER INSERT ON igra BEGIN
+        INSERT INTO igra_fts(rowid, naziv, izdavac, dodatan_opis)
+        VALUES (new.id, new.naziv, new.izdavac, new.dodatan_opis);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS igra_fts_ad AFTER DELETE ON igra BEGIN
+        INSERT INTO igra_fts(igra_fts, rowid, naziv, izdavac, dodatan_opis)
+        VALUES ('delete', old.id, old.naziv, old.izdavac, old.dodatan_opis);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS igra_fts_au AFTER UPDATE OF naziv, izdavac, dodatan_opis ON igra BEGIN
+        INSERT INTO igra_fts(igra_fts, rowid, naziv, izdavac, dodatan_opis)
+        VALUES ('delete', old.id, old.naziv, old.izdavac, old.dodatan_opis);
+        INSERT INTO igra_fts(rowid, naziv, izdavac, dodatan_opis)
+        VALUES (new.id, new.naziv, new.izdavac, new.dodatan_opis);
+    END""",
+]
+
+
+def create_search_index(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'igra_fts'"
+    ).first() is not None
+    for statement in SEARCH_INDEX_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql("INSERT INTO igra_fts(igra_fts) VALUES ('rebuild')")
+
+
+@event.listens_for(Igra.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(Igra.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS igra_fts")
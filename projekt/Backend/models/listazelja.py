@@ -2,6 +2,9 @@ from database import db
 
 class ListaZelja(db.Model):
     __tablename__ = 'lista_zelja'
+    __table_args__ = (
+        db.Index('ix_lista_zelja_igra', 'id_igra'),
+    )
     id_korisnik = db.Column(db.Integer, db.ForeignKey('korisnik.id'), primary_key=True)
     id_igra = db.Column(db.Integer, db.ForeignKey('igra.id'), primary_key=True)
     
@@ -0,0 +1,25 @@
+from database import db
+from datetime import datetime
+
+
+class Obavijest(db.Model):
+    __tablename__ = 'obavijest'
+    __table_args__ = (
+        db.Index('ix_obavijest_status_sljedeci', 'status', 'sljedeci_pokusaj'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    primatelj = db.Column(db.String(254), nullable=False)
+    predmet = db.Column(db.String(300), nullable=False)
+    html_sadrzaj = db.Column(db.Text, nullable=False)
+    tekst_sadrzaj = db.Column(db.Text, nullable=True)
+
+    # pending -> sending -> sent, or back to pending with backoff, or dead;
+    # skipped when email delivery is disabled; digest rows wait to be
+    # coalesced into one pending message per recipient
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    broj_pokusaja = db.Column(db.Integer, nullable=False, default=0)
+    sljedeci_pokusaj = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    zadnja_greska = db.Column(db.String(500), nullable=True)
+
+    vrijeme_kreiranja = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    vrijeme_slanja = db.Column(db.DateTime, nullable=True)
@@ -3,6 +3,9 @@ from datetime import datetime
 
 class Ponuda(db.Model):
     __tablename__ = 'ponuda'
+    __table_args__ = (
+        db.Index('ix_ponuda_igra_aktivna', 'id_igra', 'jeAktivna'),
+    )
     id_korisnik = db.Column(db.Integer, db.ForeignKey('korisnik.id'), primary_key=True)
     id_igra = db.Column(db.Integer, db.ForeignKey('igra.id'), primary_key=True)
     vrijeme_kreiranja = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -3,6 +3,11 @@ from datetime import datetime
 
 class Zamjena(db.Model):
     __tablename__ = 'zamjena'
+    __table_args__ = (
+        db.Index('ix_zamjena_ponuditelj_vrijeme', 'id_ponuditelj', 'vrijeme_kreiranja'),
+        db.Index('ix_zamjena_primatelj_vrijeme', 'id_primatelj', 'vrijeme_kreiranja'),
+        db.Index('ix_zamjena_primatelj_neprocitane', 'id_primatelj', 'primatelj_vidio', 'status'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     
     id_ponuditelj = db.Column(db.Integer, db.ForeignKey('korisnik.id'), nullable=False)
@@ -11,6 +16,8 @@ class Zamjena(db.Model):
     
     id_trazena_igra = db.Column(db.Integer, db.ForeignKey('igra.id'), nullable=False)
     
+    id_roditelj = db.Column(db.Integer, db.ForeignKey('zamjena.id'), index=True)
+    
     status = db.Column(db.String(20), nullable=False, default='pending')
     
     vrijeme_kreiranja = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
@@ -28,7 +35,7 @@ class Zamjena(db.Model):
 class ZamjenaIgra(db.Model):
     __tablename__ = 'zamjena_igra'
     id = db.Column(db.Integer, primary_key=True)
-    id_zamjena = db.Column(db.Integer, db.ForeignKey('zamjena.id'), nullable=False)
+    id_zamjena = db.Column(db.Integer, db.ForeignKey('zamjena.id'), nullable=False, index=True)
     id_igra = db.Column(db.Integer, db.ForeignKey('igra.id'), nullable=False)
     
     igra = db.relationship('Igra')
@@ -1,25 +1,28 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, g, request, jsonify
 from database import db
 from models.actualUser import Korisnik
 from models.igra import Igra
 from models.ponuda import Ponuda
 from models.listazelja import ListaZelja
 from models.zamjena import Zamjena, ZamjenaIgra
+from utils.trade_counters import reconcile_unread_trades
+from utils.trade_matching import invalidate_trade_graph
+from utils.password_hashing import get_password_hasher
+from utils.current_user import current_admin_id, get_token_state_cache
 
 admin = Blueprint("admin", __name__)
 
 
-def is_admin(email):
-    user = Korisnik.query.filter_by(email=email).first()
-    return user and user.jeAdmin == 1
+@admin.before_request
+def require_admin():
+    admin_email = request.args.get('adminEmail') or (request.get_json(silent=True) or {}).get('adminEmail')
+    g.admin_id = current_admin_id(admin_email)
+    if g.admin_id is None:
+        return jsonify(error="Nemate administratorska prava."), 403
 
 
 @admin.get("/admin/users")
 def get_all_users():
-    admin_email = request.args.get('adminEmail')
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     users = Korisnik.query.all()
     result = []
     
@@ -32,7 +35,7 @@ def get_all_users():
             'email': user.email,
             'isAdmin': user.jeAdmin == 1,
             'gamesCount': games_count,
-            'hasProfilePicture': user.fotografija is not None
+            'hasProfilePicture': user.has_image
         })
     
     return jsonify(result)
@@ -40,16 +43,11 @@ def get_all_users():
 
 @admin.delete("/admin/users/<int:user_id>")
 def delete_user(user_id):
-    admin_email = request.args.get('adminEmail')
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     user = Korisnik.query.get(user_id)
     if not user:
         return jsonify(error="Korisnik nije pronađen."), 404
     
-    admin_user = Korisnik.query.filter_by(email=admin_email).first()
-    if admin_user and admin_user.id == user_id:
+    if g.admin_id == user_id:
         return jsonify(error="Ne možete obrisati vlastiti račun."), 400
     
     ponude = Ponuda.query.filter_by(id_korisnik=user_id).all()
@@ -73,9 +71,12 @@ def delete_user(user_id):
     from models.interes import Interes
     Interes.query.filter_by(id_korisnik=user_id).delete()
     db.session.delete(user)
+    reconcile_unread_trades()
+    invalidate_trade_graph()
     
     try:
         db.session.commit()
+        get_token_state_cache().invalidate(user_id)
         return jsonify(message="Korisnik uspješno obrisan!")
     except Exception as e:
         db.session.rollback()
@@ -85,12 +86,6 @@ def delete_user(user_id):
 
 @admin.put("/admin/users/<int:user_id>/toggle-admin")
 def toggle_admin(user_id):
-    data = request.json or {}
-    admin_email = data.get('adminEmail')
-    
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     user = Korisnik.query.get(user_id)
     if not user:
         return jsonify(error="Korisnik nije pronađen."), 404
@@ -99,6 +94,7 @@ def toggle_admin(user_id):
     
     try:
         db.session.commit()
+        get_token_state_cache().invalidate(user_id)
         return jsonify(message="Admin status ažuriran!", isAdmin=user.jeAdmin == 1)
     except Exception as e:
         db.session.rollback()
@@ -107,10 +103,6 @@ def toggle_admin(user_id):
 
 @admin.get("/admin/listings")
 def get_all_listings():
-    admin_email = request.args.get('adminEmail')
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     games = Igra.query.all()
     result = []
     
@@ -129,7 +121,7 @@ def get_all_listings():
             'isActive': ponuda.jeAktivna == 1 if ponuda else False,
             'ownerName': owner.username if owner else 'Nepoznato',
             'ownerEmail': owner.email if owner else None,
-            'hasImage': game.fotografija is not None
+            'hasImage': game.has_image
         })
     
     return jsonify(result)
@@ -137,10 +129,6 @@ def get_all_listings():
 
 @admin.delete("/admin/listings/<int:game_id>")
 def admin_delete_listing(game_id):
-    admin_email = request.args.get('adminEmail')
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     game = Igra.query.get(game_id)
     if not game:
         return jsonify(error="Igra nije pronađena."), 404
@@ -152,6 +140,8 @@ def admin_delete_listing(game_id):
     Zamjena.query.filter_by(id_trazena_igra=game_id).delete()
     
     db.session.delete(game)
+    reconcile_unread_trades()
+    invalidate_trade_graph()
     
     try:
         db.session.commit()
@@ -163,17 +153,12 @@ def admin_delete_listing(game_id):
 
 @admin.put("/admin/listings/<int:game_id>/toggle-active")
 def toggle_listing_active(game_id):
-    data = request.json or {}
-    admin_email = data.get('adminEmail')
-    
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     ponuda = Ponuda.query.filter_by(id_igra=game_id).first()
     if not ponuda:
         return jsonify(error="Ponuda nije pronađena."), 404
     
     ponuda.jeAktivna = 0 if ponuda.jeAktivna == 1 else 1
+    invalidate_trade_graph()
     
     try:
         db.session.commit()
@@ -186,10 +171,6 @@ def toggle_listing_active(game_id):
 @admin.get("/admin/stats")
 def get_admin_stats():
     """Get platform statistics (admin only)"""
-    admin_email = request.args.get('adminEmail')
-    if not admin_email or not is_admin(admin_email):
-        return jsonify(error="Nemate administratorska prava."), 403
-    
     total_users = Korisnik.query.count()
     total_games = Igra.query.count()
     active_listings = Ponuda.query.filter_by(jeAktivna=1).count()
@@ -203,3 +184,8 @@ def get_admin_stats():
         'completedTrades': completed_trades,
         'pendingTrades': pending_trades
     })
+
+
+@admin.get("/admin/metrics")
+def get_admin_metrics():
+    return jsonify(passwordHashing=get_password_hasher().stats())
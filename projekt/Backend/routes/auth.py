@@ -2,25 +2,21 @@ from flask import Blueprint, request, jsonify
 from database import db
 from models.user import User
 from models.actualUser import Korisnik
-from flask_bcrypt import Bcrypt
-from flask_jwt_extended import create_access_token
+from utils.password_hashing import PasswordHasherBusy, get_password_hasher, unusable_password
+from utils.google_auth import get_google_verifier
+from utils.current_user import current_admin_id, issue_token
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as grequests
-import os
-
-bcrypt = Bcrypt()
 auth = Blueprint("auth", __name__)
 
-GOOGLE_CLIENT_ID = (
-    "908350048308-7gtb4thpdptckllb3hal2jrmctb7a0sl.apps.googleusercontent.com"
-)
+
+@auth.errorhandler(PasswordHasherBusy)
+def hasher_busy(e):
+    return jsonify(error="Poslužitelj je trenutno preopterećen. Pokušajte ponovno."), 503, {"Retry-After": "1"}
 
 
 @auth.post("/signup")
 def signup():
     data = request.json
-    hashed = bcrypt.generate_password_hash(data["password"]).decode("utf-8")
 
     user = Korisnik.query.filter_by(email=data["email"]).first()
     if user:
@@ -34,6 +30,11 @@ def signup():
             401,
         )
 
+    try:
+        hashed = get_password_hasher().hash(data["password"])
+    except ValueError:
+        return jsonify(error="Lozinka je predugačka."), 400
+
     user = Korisnik(email=data["email"], passwordHash=hashed, username="Novi korisnik", jeAdmin=0)
     db.session.add(user)
     try:
@@ -54,10 +55,18 @@ def login():
     if not user:
         return jsonify(error="Prijava nije uspjela. Provjeri upisane podatke."), 401
 
-    if not bcrypt.check_password_hash(user.passwordHash, data["password"]):
+    hasher = get_password_hasher()
+    if not hasher.verify(data["password"], user.passwordHash):
         return jsonify(error="Prijava nije uspjela. Provjeri upisane podatke."), 401
 
-    token = create_access_token(identity=user.id)
+    if hasher.needs_rehash(user.passwordHash):
+        user.passwordHash = hasher.hash(data["password"])
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+    token = issue_token(user)
     return jsonify(token=token)
 
 
@@ -70,9 +79,7 @@ def google_login():
         return jsonify(error="Missing Google credential"), 400
 
     try:
-        idinfo = id_token.verify_oauth2_token(
-            credential, grequests.Request(), GOOGLE_CLIENT_ID
-        )
+        idinfo = get_google_verifier().verify(credential)
 
         email = idinfo.get("email")
         if not email:
@@ -80,15 +87,11 @@ def google_login():
 
         user = Korisnik.query.filter_by(email=email).first()
         if not user:
-            random_password = bcrypt.generate_password_hash(
-                os.urandom(16)
-            ).decode("utf-8")
-
-            user = Korisnik(email=email, passwordHash=random_password, username="Novi korisnik", jeAdmin=0)
+            user = Korisnik(email=email, passwordHash=unusable_password(), username="Novi korisnik", jeAdmin=0)
             db.session.add(user)
             db.session.commit()
 
-        token = create_access_token(identity=user.id)
+        token = issue_token(user)
         return jsonify(token=token, email=email)
 
     except ValueError:
@@ -101,13 +104,4 @@ def google_login():
 @auth.post("/checkAdmin")
 def check_admin():
     data = request.json or {}
-    email = data.get('email')
-    
-    if not email:
-        return jsonify(isAdmin=False)
-    
-    user = Korisnik.query.filter_by(email=email).first()
-    if not user:
-        return jsonify(isAdmin=False)
-    
-    return jsonify(isAdmin=user.jeAdmin == 1)
\ No newline at end of file
+    return jsonify(isAdmin=current_admin_id(data.get('email')) is not None)
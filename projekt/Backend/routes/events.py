@@ -0,0 +1,34 @@
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from database import db
+from utils.current_user import get_current_user_id, has_identity
+from utils.events import DEFAULT_HEARTBEAT_SECONDS, event_stream, get_event_broker
+
+events = Blueprint("events", __name__)
+
+
+@events.get("/events")
+def stream_events():
+    if not current_app.config.get('EVENT_STREAM_ENABLED', False):
+        return jsonify(error="Obavijesti u stvarnom vremenu nisu omogućene."), 404
+    
+    email = request.args.get('email')
+    if not has_identity(email):
+        return jsonify(error="Email je obavezan."), 400
+    
+    user_id = get_current_user_id(email)
+    if user_id is None:
+        return jsonify(error="Korisnik nije pronađen."), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('lastEventId', type=int)
+    
+    subscription = get_event_broker().subscribe(user_id, last_event_id)
+    heartbeat = current_app.config.get('EVENT_HEARTBEAT_SECONDS', DEFAULT_HEARTBEAT_SECONDS)
+    db.session.remove()
+    
+    return Response(
+        stream_with_context(event_stream(subscription, heartbeat)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,148 +1,242 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context, json
 from database import db
 from models.igra import Igra
 from models.zanr import Zanr
 from models.ponuda import Ponuda
 from models.listazelja import ListaZelja
 from models.actualUser import Korisnik
+from sqlalchemy import and_, or_, false, func, literal_column, select, table
+from sqlalchemy.orm import joinedload
 from io import BytesIO
-import base64
+import hashlib
+import re
 from utils.email_service import send_wishlist_available_notification
+from utils.events import publish_event
+from utils.trade_matching import mark_trade_graph_dirty
+from utils.current_user import get_current_user_id, has_identity
+from utils.image_store import (
+    DECOMPRESSION_BOMB_ERRORS,
+    ImageUploadError,
+    apply_image_cache_headers,
+    detect_mimetype,
+    get_image_store,
+    save_base64_upload,
+    save_upload,
+    send_stored_image
+)
+from utils.uploads import finish_upload
+from utils.thumbnails import get_thumbnail_cache, resolve_width
 
 igre = Blueprint("igre", __name__)
 
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 500
+SEARCH_COLUMN_WEIGHTS = (10.0, 3.0, 1.0)
 
-def get_user_id_from_email(email):
-    user = Korisnik.query.filter_by(email=email).first()
-    return user.id if user else None
+
+DIFFICULTY_LEVELS = {
+    'Lagano': 1,
+    'Srednje': 2,
+    'Teško': 3
+}
+DIFFICULTY_NAMES = {level: name for name, level in DIFFICULTY_LEVELS.items()}
+
+
+def users_linked_to_game(game_id):
+    owners = db.session.query(Ponuda.id_korisnik).filter(Ponuda.id_igra == game_id)
+    wishers = db.session.query(ListaZelja.id_korisnik).filter(ListaZelja.id_igra == game_id)
+    return [user_id for (user_id,) in owners.union(wishers)]
 
 
 def difficulty_to_int(difficulty_str):
-    mapping = {
-        'Lagano': 1,
-        'Srednje': 2,
-        'Teško': 3
-    }
-    return mapping.get(difficulty_str, 2)
+    return DIFFICULTY_LEVELS.get(difficulty_str, 2)
 
 
 def int_to_difficulty(difficulty_int):
-    mapping = {
-        1: 'Lagano',
-        2: 'Srednje',
-        3: 'Teško'
+    return DIFFICULTY_NAMES.get(difficulty_int, 'Srednje')
+
+
+def game_to_dict(game, owner_name=None, owner_email=None):
+    return {
+        'id': game.id,
+        'title': game.naziv,
+        'publisher': game.izdavac,
+        'year': game.godina_izdanja,
+        'condition': f"{game.ocjena_ocuvanosti}/5",
+        'players': game.broj_igraca,
+        'playtime': game.vrijeme_igranja,
+        'difficulty': int_to_difficulty(game.procjena_tezine),
+        'description': game.dodatan_opis,
+        'genre': game.zanr.naziv_zanr if game.zanr else None,
+        'genreId': game.id_zanr,
+        'hasImage': game.has_image,
+        'imageHash': game.image_hash,
+        'ownerName': owner_name,
+        'ownerEmail': owner_email
     }
-    return mapping.get(difficulty_int, 'Srednje')
+
+
+def games_with_owner_query(active_only=True):
+    active_offer = and_(Ponuda.id_igra == Igra.id, Ponuda.jeAktivna == 1)
+    games_query = db.session.query(Igra, Korisnik.username, Korisnik.email)
+    if active_only:
+        games_query = games_query.join(Ponuda, active_offer).join(Korisnik, Korisnik.id == Ponuda.id_korisnik)
+    else:
+        games_query = games_query.outerjoin(Ponuda, active_offer).outerjoin(Korisnik, Korisnik.id == Ponuda.id_korisnik)
+    return games_query.options(joinedload(Igra.zanr))
+
+
+def fts_match_expression(text):
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+
+def search_rank_subquery(match_expression):
+    fts = literal_column('igra_fts')
+    return select(
+        literal_column('rowid').label('id'),
+        func.bm25(fts, *SEARCH_COLUMN_WEIGHTS).label('rank')
+    ).select_from(table('igra_fts')).where(fts.op('MATCH')(match_expression)).subquery()
+
+
+def parse_cursor(cursor, ranked):
+    if ranked:
+        rank, game_id = cursor.split(':')
+        return float(rank), int(game_id)
+    return int(cursor)
 
 
 @igre.get("/games")
 def get_all_games():
-    query = request.args.get('query', '').strip().lower()
+    query = request.args.get('query', '').strip()
     difficulty = request.args.get('difficulty', '')
     min_players = request.args.get('minPlayers', type=int)
     max_players = request.args.get('maxPlayers', type=int)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', '')
+    stream = request.args.get('stream', '').lower() in ('1', 'true')
+    
+    games_query = games_with_owner_query()
+    
+    ranked = None
+    if query:
+        match_expression = fts_match_expression(query)
+        if match_expression:
+            ranked = search_rank_subquery(match_expression)
+            games_query = games_query.join(ranked, ranked.c.id == Igra.id).add_columns(ranked.c.rank)
+        else:
+            games_query = games_query.filter(false())
+    
+    if difficulty:
+        games_query = games_query.filter(
+            Igra.procjena_tezine == DIFFICULTY_LEVELS[difficulty]
+            if difficulty in DIFFICULTY_LEVELS else false()
+        )
+    
+    if min_players:
+        games_query = games_query.filter(
+            or_(Igra.max_igraca.is_(None), Igra.max_igraca >= min_players)
+        )
+    if max_players:
+        games_query = games_query.filter(
+            or_(Igra.min_igraca.is_(None), Igra.min_igraca <= max_players)
+        )
     
-    games = Igra.query.all()
-    result = []
+    try:
+        position = parse_cursor(cursor, ranked is not None) if cursor else None
+    except ValueError:
+        return jsonify(error="Neispravan cursor."), 400
+    
+    if ranked is not None:
+        games_query = games_query.order_by(ranked.c.rank, Igra.id)
+        if position:
+            rank, game_id = position
+            games_query = games_query.filter(
+                or_(ranked.c.rank > rank, and_(ranked.c.rank == rank, Igra.id > game_id))
+            )
+    else:
+        games_query = games_query.order_by(Igra.id)
+        if position:
+            games_query = games_query.filter(Igra.id > position)
     
-    for game in games:
-        if query and query not in game.naziv.lower():
-            continue
-        
-        if difficulty:
-            game_difficulty = int_to_difficulty(game.procjena_tezine)
-            if game_difficulty != difficulty:
-                continue
-        
-        if min_players or max_players:
-            players_str = game.broj_igraca
-            try:
-                if '-' in players_str:
-                    parts = players_str.split('-')
-                    game_min = int(parts[0])
-                    game_max = int(parts[1])
-                elif '+' in players_str:
-                    game_min = int(players_str.replace('+', ''))
-                    game_max = 99
-                else:
-                    game_min = game_max = int(players_str)
-                
-                if min_players and game_max < min_players:
-                    continue
-                if max_players and game_min > max_players:
-                    continue
-            except ValueError:
-                pass
-        
-        ponuda = Ponuda.query.filter_by(id_igra=game.id, jeAktivna=1).first()
-        owner_name = None
-        owner_email = None
-        if ponuda:
-            owner = Korisnik.query.get(ponuda.id_korisnik)
-            if owner:
-                owner_name = owner.username
-                owner_email = owner.email
-        
-        game_data = {
-            'id': game.id,
-            'title': game.naziv,
-            'publisher': game.izdavac,
-            'year': game.godina_izdanja,
-            'condition': f"{game.ocjena_ocuvanosti}/5",
-            'players': game.broj_igraca,
-            'playtime': game.vrijeme_igranja,
-            'difficulty': int_to_difficulty(game.procjena_tezine),
-            'description': game.dodatan_opis,
-            'genre': game.zanr.naziv_zanr if game.zanr else None,
-            'genreId': game.id_zanr,
-            'hasImage': game.fotografija is not None,
-            'ownerName': owner_name,
-            'ownerEmail': owner_email
-        }
-        result.append(game_data)
+    if stream:
+        return Response(
+            stream_with_context(stream_games_json(games_query)),
+            mimetype='application/json'
+        )
     
-    return jsonify(result)
+    if limit is None and not cursor:
+        return jsonify([game_to_dict(*row[:3]) for row in games_query.all()])
+    
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    rows = games_query.limit(limit + 1).all()
+    page = [game_to_dict(*row[:3]) for row in rows[:limit]]
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = f"{last.rank!r}:{last[0].id}" if ranked is not None else last[0].id
+    
+    return jsonify(games=page, nextCursor=next_cursor)
+
+
+def stream_games_json(games_query):
+    yield '['
+    separator = ''
+    for row in games_query.yield_per(STREAM_BATCH_SIZE):
+        yield separator + json.dumps(game_to_dict(*row[:3]))
+        separator = ','
+    yield ']'
 
 
 @igre.get("/games/<int:game_id>")
 def get_game(game_id):
-    game = Igra.query.get(game_id)
-    if not game:
+    row = games_with_owner_query(active_only=False).filter(Igra.id == game_id).first()
+    if not row:
         return jsonify(error="Igra nije pronađena."), 404
     
-    ponuda = Ponuda.query.filter_by(id_igra=game.id, jeAktivna=1).first()
-    owner_name = None
-    owner_email = None
-    if ponuda:
-        owner = Korisnik.query.get(ponuda.id_korisnik)
-        if owner:
-            owner_name = owner.username
-            owner_email = owner.email
-    
-    return jsonify({
-        'id': game.id,
-        'title': game.naziv,
-        'publisher': game.izdavac,
-        'year': game.godina_izdanja,
-        'condition': f"{game.ocjena_ocuvanosti}/5",
-        'players': game.broj_igraca,
-        'playtime': game.vrijeme_igranja,
-        'difficulty': int_to_difficulty(game.procjena_tezine),
-        'description': game.dodatan_opis,
-        'genre': game.zanr.naziv_zanr if game.zanr else None,
-        'hasImage': game.fotografija is not None,
-        'ownerName': owner_name,
-        'ownerEmail': owner_email
-    })
+    game, owner_name, owner_email = row
+    return jsonify(game_to_dict(game, owner_name, owner_email))
 
 
 @igre.get("/games/<int:game_id>/image")
 def get_game_image(game_id):
-    game = Igra.query.get(game_id)
-    if not game or not game.fotografija:
+    width = resolve_width(request.args.get('size'), request.args.get('w', type=int))
+    
+    row = db.session.query(Igra.image_hash, Igra.image_mimetype, Igra.has_image).filter(Igra.id == game_id).first()
+    if not row or not row.has_image:
         return jsonify(error="Slika nije pronađena."), 404
     
-    return send_file(BytesIO(game.fotografija), mimetype='image/jpeg')
+    immutable = row.image_hash is not None and request.args.get('v') == row.image_hash
+    if row.image_hash:
+        etag = f"{row.image_hash}-{width}" if width else row.image_hash
+        if request.if_none_match.contains(etag):
+            return apply_image_cache_headers(Response(status=304), etag, immutable)
+    
+    image = None
+    if row.image_hash:
+        digest = row.image_hash
+        source = get_image_store().path(digest)
+    else:
+        image = db.session.query(Igra.fotografija).filter(Igra.id == game_id).scalar()
+        digest = hashlib.sha256(image).hexdigest()
+        source = BytesIO(image)
+    
+    if width:
+        try:
+            response = send_file(get_thumbnail_cache().get(digest, width, source), etag=False)
+            if row.image_hash:
+                apply_image_cache_headers(response, f"{digest}-{width}", immutable)
+            return response
+        except (OSError, *DECOMPRESSION_BOMB_ERRORS) as e:
+            print(f"Thumbnail error for game {game_id}: {e}")
+    
+    if image is None:
+        response = send_stored_image(digest, row.image_mimetype)
+        if response is None:
+            return jsonify(error="Slika nije pronađena."), 404
+        return apply_image_cache_headers(response, digest, immutable)
+    return send_file(BytesIO(image), mimetype=detect_mimetype(image[:16]))
 
 
 @igre.post("/games")
@@ -155,10 +249,12 @@ def add_game():
         image_file = None
     
     required = ['naziv', 'izdavac', 'godina_izdanja', 'ocjena_ocuvanosti', 
-                'broj_igraca', 'vrijeme_igranja', 'zanr', 'email']
+                'broj_igraca', 'vrijeme_igranja', 'zanr']
     for field in required:
         if field not in data or not data[field]:
             return jsonify(error=f"Polje '{field}' je obavezno."), 400
+    if not has_identity(data.get('email')):
+        return jsonify(error="Polje 'email' je obavezno."), 400
     
     genre_name = data['zanr']
     genre = Zanr.query.filter_by(naziv_zanr=genre_name).first()
@@ -167,20 +263,23 @@ def add_game():
         db.session.add(genre)
         db.session.flush()
     
-    user_id = get_user_id_from_email(data['email'])
+    user_id = get_current_user_id(data.get('email'))
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
     difficulty = difficulty_to_int(data.get('procjena_tezine', 'Srednje'))
     
-    image_data = None
-    if image_file:
-        image_data = image_file.read()
-    elif 'image_base64' in data:
-        try:
-            image_data = base64.b64decode(data['image_base64'])
-        except Exception:
-            pass
+    stored_image = None
+    try:
+        if image_file:
+            stored_image = save_upload(image_file.stream)
+        elif data.get('uploadId'):
+            stored_image = finish_upload(data['uploadId'], user_id)
+        elif 'image_base64' in data:
+            stored_image = save_base64_upload(data['image_base64'])
+    except ImageUploadError as e:
+        db.session.rollback()
+        return jsonify(error=str(e)), e.status
     
     new_game = Igra(
         naziv=data['naziv'],
@@ -190,11 +289,13 @@ def add_game():
         broj_igraca=data['broj_igraca'],
         vrijeme_igranja=data['vrijeme_igranja'],
         procjena_tezine=difficulty,
-        fotografija=image_data,
         dodatan_opis=data.get('dodatan_opis', ''),
         id_zanr=genre.id
     )
     
+    if stored_image:
+        new_game.set_stored_image(*stored_image)
+    
     db.session.add(new_game)
     db.session.flush()
     
@@ -206,27 +307,31 @@ def add_game():
     db.session.add(ponuda)
     
     try:
-        db.session.commit()
-        
-        owner = Korisnik.query.get(user_id)
-        game_name_lower = data['naziv'].lower()
+        owner_name = db.session.query(Korisnik.username).filter(Korisnik.id == user_id).scalar()
         
-        all_wishlists = db.session.query(ListaZelja, Igra, Korisnik).join(
-            Igra, ListaZelja.id_igra == Igra.id
+        wishing_users = db.session.query(Korisnik.id, Korisnik.email).join(
+            ListaZelja, ListaZelja.id_korisnik == Korisnik.id
         ).join(
-            Korisnik, ListaZelja.id_korisnik == Korisnik.id
+            Igra, ListaZelja.id_igra == Igra.id
         ).filter(
+            Igra.naziv_normaliziran == new_game.naziv_normaliziran,
             ListaZelja.id_korisnik != user_id
-        ).all()
+        ).distinct().all()
         
-        for wishlist_item, wishlist_game, wishlist_user in all_wishlists:
-            if wishlist_game.naziv.lower() == game_name_lower:
-                send_wishlist_available_notification(
-                    to_email=wishlist_user.email,
-                    game_name=data['naziv'],
-                    owner_name=owner.username if owner else "Nepoznati korisnik"
-                )
+        for wishlist_user_id, wishlist_email in wishing_users:
+            send_wishlist_available_notification(
+                to_email=wishlist_email,
+                game_name=data['naziv'],
+                owner_name=owner_name or "Nepoznati korisnik"
+            )
+            publish_event(wishlist_user_id, 'wishlist_available', {
+                'gameId': new_game.id,
+                'title': new_game.naziv,
+                'owner': owner_name
+            })
+        mark_trade_graph_dirty(user_id)
         
+        db.session.commit()
         return jsonify(message="Igra uspješno dodana!", gameId=new_game.id), 201
     except Exception as e:
         db.session.rollback()
@@ -244,6 +349,7 @@ def update_game(game_id):
     
     if 'naziv' in data:
         game.naziv = data['naziv']
+        mark_trade_graph_dirty(*users_linked_to_game(game_id))
     if 'izdavac' in data:
         game.izdavac = data['izdavac']
     if 'godina_izdanja' in data:
@@ -280,6 +386,7 @@ def delete_game(game_id):
     if not game:
         return jsonify(error="Igra nije pronađena."), 404
     
+    mark_trade_graph_dirty(*users_linked_to_game(game_id))
     Ponuda.query.filter_by(id_igra=game_id).delete()
     ListaZelja.query.filter_by(id_igra=game_id).delete()
     
@@ -296,25 +403,28 @@ def delete_game(game_id):
 @igre.get("/myGames")
 def get_my_games():
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
-    ponude = Ponuda.query.filter_by(id_korisnik=user_id, jeAktivna=1).all()
+    games = Igra.query.join(Ponuda, Ponuda.id_igra == Igra.id).filter(
+        Ponuda.id_korisnik == user_id,
+        Ponuda.jeAktivna == 1
+    ).all()
     result = []
     
-    for ponuda in ponude:
-        game = ponuda.igra
+    for game in games:
         result.append({
             'id': game.id,
             'title': game.naziv,
             'condition': f"{game.ocjena_ocuvanosti}/5",
             'players': game.broj_igraca,
             'playtime': game.vrijeme_igranja,
-            'hasImage': game.fotografija is not None,
+            'hasImage': game.has_image,
+            'imageHash': game.image_hash,
             'ownerEmail': email
         })
     
@@ -324,10 +434,10 @@ def get_my_games():
 @igre.get("/wishlist")
 def get_wishlist():
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
@@ -339,7 +449,7 @@ def get_wishlist():
         result.append({
             'id': game.id,
             'title': game.naziv,
-            'hasImage': game.fotografija is not None
+            'hasImage': game.has_image
         })
     
     return jsonify(result)
@@ -352,10 +462,10 @@ def add_to_wishlist():
     email = data.get('email')
     game_id = data.get('gameId')
     
-    if not email or not game_id:
+    if not has_identity(email) or not game_id:
         return jsonify(error="Email i gameId su obavezni."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
@@ -369,6 +479,7 @@ def add_to_wishlist():
     
     wishlist_item = ListaZelja(id_korisnik=user_id, id_igra=game_id)
     db.session.add(wishlist_item)
+    mark_trade_graph_dirty(user_id)
     
     try:
         db.session.commit()
@@ -381,10 +492,10 @@ def add_to_wishlist():
 @igre.delete("/wishlist/<int:game_id>")
 def remove_from_wishlist(game_id):
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
@@ -393,6 +504,7 @@ def remove_from_wishlist(game_id):
         return jsonify(error="Igra nije na listi želja."), 404
     
     db.session.delete(wishlist_item)
+    mark_trade_graph_dirty(user_id)
     
     try:
         db.session.commit()
@@ -1,28 +1,25 @@
 from flask import Blueprint, request, jsonify, send_file
 from database import db
-from models.actualUser import Korisnik
+from models.actualUser import Korisnik, NOTIFICATION_MODES
 from models.zanr import Zanr
 from models.interes import Interes
 from io import BytesIO
+from utils.image_store import ImageUploadError, detect_mimetype, save_upload, send_stored_image
+from utils.uploads import finish_upload
+from utils.current_user import get_current_user_id, has_identity
 
 profile = Blueprint("profile", __name__)
 
-def getUserIdFromEmail(email):
-    result = db.session.execute(db.select(Korisnik).filter_by(email=email)).scalar_one_or_none()
-    return result.id if result else None
-
-
 @profile.post("/updateProfile")
 def updateProfile():
     dataDict = request.json
     if (dataDict):
-        if ("email" in dataDict):
-            user_email = dataDict["email"]
-        else:
-            Exception("An error has occured: No email!")
+        user_email = dataDict.get("email")
+        if not has_identity(user_email):
+            return jsonify(message="Email is required."), 400
         
         print(dataDict)
-        userid = getUserIdFromEmail(user_email)
+        userid = get_current_user_id(user_email)
         if not userid:
             return jsonify(message="User not found."), 404
         
@@ -32,6 +29,10 @@ def updateProfile():
                 user_to_update.username = dataDict["name"]
             if "bio" in dataDict:
                 user_to_update.opis = dataDict["bio"]
+            if "notificationMode" in dataDict:
+                if dataDict["notificationMode"] not in NOTIFICATION_MODES:
+                    return jsonify(message="Invalid notification mode."), 400
+                user_to_update.nacin_obavijesti = dataDict["notificationMode"]
             if "interests" in dataDict:
                 interests = dataDict["interests"]
                 db.session.query(Interes).filter_by(id_korisnik=userid).delete()
@@ -71,14 +72,14 @@ def findProfileData():
     
     userEmail = dataDict["email"]
     try:
-        userid = getUserIdFromEmail(userEmail)
-        user = db.session.get(Korisnik, userid)
+        user = db.session.execute(db.select(Korisnik).filter_by(email=userEmail)).scalar_one_or_none()
         if user:
             print(user.interesira)
             interest_names = [interes.zanr.naziv_zanr for interes in user.interesira]
             data = {"name":user.username, 
                     "location":"Zagreb, Hrvatska", "bio":user.opis, "email":user.email, 
-                    "interests": interest_names, "imageUrl":'https://placehold.co/128x128/60a5fa/ffffff?text=User&font=inter'
+                    "interests": interest_names, "imageUrl":'https://placehold.co/128x128/60a5fa/ffffff?text=User&font=inter',
+                    "notificationMode": user.nacin_obavijesti
             }
             return jsonify(data)
         else:
@@ -94,13 +95,20 @@ def getProfilePictureBlob():
         return jsonify(error="Email required."), 400
     
     userEmail = dataDict["email"]
-    userid = getUserIdFromEmail(userEmail)
-    if not userid:
+    row = db.session.execute(
+        db.select(Korisnik.id, Korisnik.image_hash, Korisnik.image_mimetype, Korisnik.has_image).filter_by(email=userEmail)
+    ).first()
+    if not row:
         return jsonify(error="User not found."), 404
     
-    user = db.session.get(Korisnik, userid)
-    if user and user.fotografija:
-        return send_file(BytesIO(user.fotografija), mimetype='image/jpeg')
+    if row.image_hash:
+        response = send_stored_image(row.image_hash, row.image_mimetype)
+        if response is None:
+            return jsonify(error="No profile picture found."), 404
+        return response
+    elif row.has_image:
+        image = db.session.execute(db.select(Korisnik.fotografija).filter_by(id=row.id)).scalar()
+        return send_file(BytesIO(image), mimetype=detect_mimetype(image[:16]))
     else:
         return jsonify(error="No profile picture found."), 404
     
@@ -108,22 +116,27 @@ def getProfilePictureBlob():
 
 @profile.post("/setProfilePictureBlob")
 def setProfilePictureBlob():
-    if 'imageBlob' not in request.files or 'email' not in request.form:
+    uploadId = request.form.get('uploadId')
+    userEmail = request.form.get('email')
+    if ('imageBlob' not in request.files and not uploadId) or not has_identity(userEmail):
         return jsonify(error="Missing file or email."), 400
     
-    file = request.files['imageBlob']
-    userEmail = request.form['email']
+    file = request.files.get('imageBlob')
     
-    if file.filename == '':
+    if file and file.filename == '':
         return jsonify(error="No file selected."), 400
     
-    userid = getUserIdFromEmail(userEmail)
+    userid = get_current_user_id(userEmail)
     if not userid:
         return jsonify(error="User not found."), 404
     
     user = db.session.get(Korisnik, userid)
     if user:
-        user.fotografija = file.read()
+        try:
+            stored_image = save_upload(file.stream) if file else finish_upload(uploadId, userid)
+        except ImageUploadError as e:
+            return jsonify(error=str(e)), e.status
+        user.set_stored_image(*stored_image)
         try:
             db.session.commit()
             return jsonify(message="New picture set!")
@@ -136,16 +149,16 @@ def setProfilePictureBlob():
 
 @profile.post("/setLocationBlob")
 def setLocationBlob():
-    if 'locationBlob' not in request.files or 'email' not in request.form:
+    userEmail = request.form.get('email')
+    if 'locationBlob' not in request.files or not has_identity(userEmail):
         return jsonify(error="Missing file or email."), 400
 
     file = request.files['locationBlob']
-    userEmail = request.form['email']
 
     if file.filename == '':
         return jsonify(error="No file selected."), 400
 
-    userid = getUserIdFromEmail(userEmail)
+    userid = get_current_user_id(userEmail)
     if not userid:
         return jsonify(error="User not found."), 404
     
@@ -168,12 +181,11 @@ def getLocationBlob():
         return jsonify(error="Email required."), 400
 
     userEmail = dataDict["email"]
-    userid = getUserIdFromEmail(userEmail)
-    if not userid:
+    row = db.session.execute(db.select(Korisnik.lokacija).filter_by(email=userEmail)).first()
+    if not row:
         return jsonify(error="User not found."), 404
     
-    user = db.session.get(Korisnik, userid)
-    if user and user.lokacija:
-        return send_file(BytesIO(user.lokacija), mimetype='application/json')
+    if row.lokacija:
+        return send_file(BytesIO(row.lokacija), mimetype='application/json')
     else:
         return jsonify(error="No location found."), 404
\ No newline at end of file
@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify
+from utils.current_user import get_current_user_id, has_identity
+from utils.image_store import CHUNK_SIZE, ImageUploadError
+from utils.uploads import UploadOffsetMismatch, append_chunk, create_upload, upload_offset
+
+uploads = Blueprint("uploads", __name__)
+
+
+def _upload_owner(email):
+    if not has_identity(email):
+        return None, (jsonify(error="Email je obavezan."), 400)
+    user_id = get_current_user_id(email)
+    if not user_id:
+        return None, (jsonify(error="Korisnik nije pronađen."), 404)
+    return user_id, None
+
+
+@uploads.post("/uploads")
+def start_upload():
+    data = request.get_json(silent=True) or {}
+    user_id, error = _upload_owner(data.get('email'))
+    if error:
+        return error
+    try:
+        upload_id = create_upload(user_id, data.get('size'))
+    except ImageUploadError as e:
+        return jsonify(error=str(e)), e.status
+    return jsonify(uploadId=upload_id, offset=0, chunkSize=CHUNK_SIZE), 201
+
+
+@uploads.get("/uploads/<upload_id>")
+def get_upload(upload_id):
+    user_id, error = _upload_owner(request.args.get('email'))
+    if error:
+        return error
+    offset = upload_offset(upload_id, user_id)
+    if offset is None:
+        return jsonify(error="Upload nije pronađen."), 404
+    return jsonify(uploadId=upload_id, offset=offset)
+
+
+@uploads.patch("/uploads/<upload_id>")
+def upload_chunk(upload_id):
+    user_id, error = _upload_owner(request.args.get('email'))
+    if error:
+        return error
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify(error="Zaglavlje Upload-Offset je obavezno."), 400
+
+    try:
+        new_offset = append_chunk(upload_id, user_id, offset, request.stream)
+    except KeyError:
+        return jsonify(error="Upload nije pronađen."), 404
+    except UploadOffsetMismatch as e:
+        return jsonify(error="Neispravan offset.", offset=e.offset), 409
+    except ImageUploadError as e:
+        return jsonify(error=str(e), offset=upload_offset(upload_id, user_id)), e.status
+
+    return jsonify(uploadId=upload_id, offset=new_offset)
@@ -5,6 +5,13 @@ from models.igra import Igra
 from models.ponuda import Ponuda
 from models.actualUser import Korisnik
 from datetime import datetime
+from collections import Counter
+from sqlalchemy import insert, or_, tuple_, update
+from sqlalchemy.orm import joinedload, selectinload
+from utils.trade_counters import adjust_unread_trades
+from utils.events import publish_event
+from utils.trade_matching import get_trade_matcher, mark_trade_graph_dirty
+from utils.current_user import current_user_clause, get_current_user_id, has_identity
 from utils.email_service import (
     send_trade_offer_notification,
     send_trade_accepted_notification,
@@ -14,10 +21,104 @@ from utils.email_service import (
 
 zamjene = Blueprint("zamjene", __name__)
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+TRADE_DIRECTIONS = ('incoming', 'outgoing')
+DEFAULT_SUGGESTIONS = 10
 
-def get_user_id_from_email(email):
-    user = Korisnik.query.filter_by(email=email).first()
-    return user.id if user else None
+
+RESPONSE_STATUSES = {'accept': 'completed', 'reject': 'rejected', 'counter': 'counter'}
+
+
+def claim_pending_trade(trade, status):
+    result = db.session.execute(
+        update(Zamjena)
+        .where(Zamjena.id == trade.id, Zamjena.status == 'pending')
+        .values(status=status, ponuditelj_vidio=False, primatelj_vidio=True)
+    )
+    return result.rowcount == 1
+
+
+def mark_seen_by_recipient(trade_id):
+    """True only for the request that flips an unread pending trade to seen."""
+    result = db.session.execute(
+        update(Zamjena)
+        .where(Zamjena.id == trade_id, Zamjena.primatelj_vidio.is_(False), Zamjena.status == 'pending')
+        .values(primatelj_vidio=True)
+    )
+    return result.rowcount == 1
+
+
+def cancel_conflicting_trades(trade_id, game_ids):
+    offering_trades = db.select(ZamjenaIgra.id_zamjena).where(ZamjenaIgra.id_igra.in_(game_ids))
+    cancelled = db.session.execute(
+        update(Zamjena)
+        .where(
+            Zamjena.status == 'pending',
+            Zamjena.id != trade_id,
+            or_(Zamjena.id_trazena_igra.in_(game_ids), Zamjena.id.in_(offering_trades))
+        )
+        .values(status='cancelled', ponuditelj_vidio=False)
+        .returning(Zamjena.id, Zamjena.id_ponuditelj, Zamjena.id_primatelj, Zamjena.primatelj_vidio)
+        .execution_options(synchronize_session=False)
+    ).all()
+    
+    unread = Counter(row.id_primatelj for row in cancelled if not row.primatelj_vidio)
+    for user_id, count in unread.items():
+        adjust_unread_trades(user_id, -count)
+    for row in cancelled:
+        for party_id in (row.id_ponuditelj, row.id_primatelj):
+            publish_event(party_id, 'trade_responded', {'tradeId': row.id, 'status': 'cancelled'})
+    return cancelled
+
+
+def trade_graph_options():
+    return (
+        joinedload(Zamjena.ponuditelj),
+        joinedload(Zamjena.primatelj),
+        joinedload(Zamjena.trazena_igra),
+        selectinload(Zamjena.ponudjene_igre).joinedload(ZamjenaIgra.igra)
+    )
+
+
+def trade_thread_ids(trade_id):
+    ancestors = db.select(Zamjena.id, Zamjena.id_roditelj).where(Zamjena.id == trade_id).cte(
+        'predci', recursive=True
+    )
+    ancestors = ancestors.union_all(
+        db.select(Zamjena.id, Zamjena.id_roditelj).join(ancestors, Zamjena.id == ancestors.c.id_roditelj)
+    )
+    thread = db.select(ancestors.c.id).cte('nit', recursive=True)
+    thread = thread.union(
+        db.select(Zamjena.id).join(thread, Zamjena.id_roditelj == thread.c.id)
+    )
+    return db.select(thread.c.id)
+
+
+def trade_to_dict(trade, user_id):
+    return {
+        'id': trade.id,
+        'parentId': trade.id_roditelj,
+        'status': trade.status,
+        'date': trade.vrijeme_kreiranja.strftime('%Y-%m-%d'),
+        'trazenaIgra': {
+            'id': trade.trazena_igra.id,
+            'title': trade.trazena_igra.naziv
+        },
+        'ponudjeneIgre': [{'id': zi.igra.id, 'title': zi.igra.naziv} for zi in trade.ponudjene_igre],
+        'ponuditelj': {
+            'id': trade.ponuditelj.id,
+            'name': trade.ponuditelj.username,
+            'email': trade.ponuditelj.email
+        },
+        'primatelj': {
+            'id': trade.primatelj.id,
+            'name': trade.primatelj.username,
+            'email': trade.primatelj.email
+        },
+        'isIncoming': trade.id_primatelj == user_id,
+        'seen': trade.primatelj_vidio if trade.id_primatelj == user_id else trade.ponuditelj_vidio
+    }
 
 
 @zamjene.post("/trades")
@@ -28,30 +129,40 @@ def create_trade():
     trazena_igra_id = data.get('trazenaIgraId')
     ponudjene_igre_ids = data.get('ponudjeneIgreIds', [])
     
-    if not email or not trazena_igra_id or not ponudjene_igre_ids:
+    if not has_identity(email) or not trazena_igra_id or not ponudjene_igre_ids:
         return jsonify(error="Email, trazenaIgraId i ponudjeneIgreIds su obavezni."), 400
     
-    ponuditelj_id = get_user_id_from_email(email)
+    ponuditelj_id = get_current_user_id(email)
     if not ponuditelj_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
-    trazena_igra = Igra.query.get(trazena_igra_id)
-    if not trazena_igra:
+    requested = db.session.query(Igra, Ponuda.id_korisnik).outerjoin(
+        Ponuda, (Ponuda.id_igra == Igra.id) & (Ponuda.jeAktivna == 1)
+    ).filter(Igra.id == trazena_igra_id).first()
+    if not requested:
         return jsonify(error="Tražena igra nije pronađena."), 404
     
-    ponuda = Ponuda.query.filter_by(id_igra=trazena_igra_id, jeAktivna=1).first()
-    if not ponuda:
+    trazena_igra, primatelj_id = requested
+    if primatelj_id is None:
         return jsonify(error="Igra nije dostupna za zamjenu."), 400
     
-    primatelj_id = ponuda.id_korisnik
-    
     if ponuditelj_id == primatelj_id:
         return jsonify(error="Ne možete ponuditi zamjenu za vlastitu igru."), 400
     
-    for igra_id in ponudjene_igre_ids:
-        user_ponuda = Ponuda.query.filter_by(id_igra=igra_id, id_korisnik=ponuditelj_id, jeAktivna=1).first()
-        if not user_ponuda:
-            return jsonify(error=f"Igra {igra_id} vam ne pripada ili nije aktivna."), 400
+    offered_ids = list(dict.fromkeys(ponudjene_igre_ids))
+    offered_names = dict(db.session.query(Igra.id, Igra.naziv).join(
+        Ponuda, Ponuda.id_igra == Igra.id
+    ).filter(
+        Igra.id.in_(offered_ids),
+        Ponuda.id_korisnik == ponuditelj_id,
+        Ponuda.jeAktivna == 1
+    ).all())
+    invalid_ids = [igra_id for igra_id in offered_ids if igra_id not in offered_names]
+    if invalid_ids:
+        return jsonify(
+            error=f"Igre {', '.join(map(str, invalid_ids))} vam ne pripadaju ili nisu aktivne.",
+            invalidIds=invalid_ids
+        ), 400
     
     zamjena = Zamjena(
         id_ponuditelj=ponuditelj_id,
@@ -64,25 +175,30 @@ def create_trade():
     db.session.add(zamjena)
     db.session.flush()
     
-    for igra_id in ponudjene_igre_ids:
-        zamjena_igra = ZamjenaIgra(id_zamjena=zamjena.id, id_igra=igra_id)
-        db.session.add(zamjena_igra)
+    db.session.execute(insert(ZamjenaIgra), [
+        {'id_zamjena': zamjena.id, 'id_igra': igra_id} for igra_id in offered_ids
+    ])
+    adjust_unread_trades(primatelj_id, 1)
     
     try:
-        db.session.commit()
+        users = {user.id: user for user in Korisnik.query.filter(Korisnik.id.in_((ponuditelj_id, primatelj_id)))}
+        ponuditelj, primatelj = users.get(ponuditelj_id), users.get(primatelj_id)
+        offerer_name = ponuditelj.username if ponuditelj else None
         
-        primatelj = Korisnik.query.get(primatelj_id)
-        ponuditelj = Korisnik.query.get(ponuditelj_id)
-        offered_game_names = [Igra.query.get(gid).naziv for gid in ponudjene_igre_ids]
-        
-        if primatelj and ponuditelj:
+        if primatelj:
             send_trade_offer_notification(
                 to_email=primatelj.email,
-                offerer_name=ponuditelj.username,
+                offerer_name=offerer_name,
                 requested_game=trazena_igra.naziv,
-                offered_games=offered_game_names
+                offered_games=[offered_names[igra_id] for igra_id in offered_ids]
             )
+        publish_event(primatelj_id, 'trade_created', {
+            'tradeId': zamjena.id,
+            'requestedGame': trazena_igra.naziv,
+            'from': offerer_name
+        })
         
+        db.session.commit()
         return jsonify(message="Ponuda za zamjenu uspješno poslana!", tradeId=zamjena.id), 201
     except Exception as e:
         db.session.rollback()
@@ -93,54 +209,86 @@ def create_trade():
 @zamjene.get("/trades")
 def get_trades():
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
-    trades = Zamjena.query.filter(
-        (Zamjena.id_ponuditelj == user_id) | (Zamjena.id_primatelj == user_id)
-    ).order_by(Zamjena.vrijeme_kreiranja.desc()).all()
+    direction = request.args.get('direction', '')
+    statuses = [status for status in request.args.get('status', '').split(',') if status]
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor', type=int)
     
-    result = []
-    for trade in trades:
-        ponudjene = [{'id': zi.igra.id, 'title': zi.igra.naziv} for zi in trade.ponudjene_igre]
-        
-        result.append({
-            'id': trade.id,
-            'status': trade.status,
-            'date': trade.vrijeme_kreiranja.strftime('%Y-%m-%d'),
-            'trazenaIgra': {
-                'id': trade.trazena_igra.id,
-                'title': trade.trazena_igra.naziv
-            },
-            'ponudjeneIgre': ponudjene,
-            'ponuditelj': {
-                'id': trade.ponuditelj.id,
-                'name': trade.ponuditelj.username,
-                'email': trade.ponuditelj.email
-            },
-            'primatelj': {
-                'id': trade.primatelj.id,
-                'name': trade.primatelj.username,
-                'email': trade.primatelj.email
-            },
-            'isIncoming': trade.id_primatelj == user_id,
-            'seen': trade.primatelj_vidio if trade.id_primatelj == user_id else trade.ponuditelj_vidio
-        })
+    if direction and direction not in TRADE_DIRECTIONS:
+        return jsonify(error="Neispravan smjer."), 400
     
-    return jsonify(result)
+    if direction == 'incoming':
+        trades_query = Zamjena.query.filter(Zamjena.id_primatelj == user_id)
+    elif direction == 'outgoing':
+        trades_query = Zamjena.query.filter(Zamjena.id_ponuditelj == user_id)
+    else:
+        trades_query = Zamjena.query.filter(
+            (Zamjena.id_ponuditelj == user_id) | (Zamjena.id_primatelj == user_id)
+        )
+    if statuses:
+        trades_query = trades_query.filter(Zamjena.status.in_(statuses))
+    if cursor is not None:
+        cursor_time = db.select(Zamjena.vrijeme_kreiranja).where(Zamjena.id == cursor).scalar_subquery()
+        trades_query = trades_query.filter(
+            tuple_(Zamjena.vrijeme_kreiranja, Zamjena.id) < tuple_(cursor_time, cursor)
+        )
+    
+    trades_query = trades_query.options(*trade_graph_options()).order_by(
+        Zamjena.vrijeme_kreiranja.desc(), Zamjena.id.desc()
+    )
+    
+    if limit is None and cursor is None:
+        return jsonify([trade_to_dict(trade, user_id) for trade in trades_query.all()])
+    
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    trades = trades_query.limit(limit + 1).all()
+    next_cursor = trades[limit - 1].id if len(trades) > limit else None
+    
+    return jsonify(trades=[trade_to_dict(trade, user_id) for trade in trades[:limit]], nextCursor=next_cursor)
+
+
+@zamjene.get("/trades/suggestions")
+def get_trade_suggestions():
+    email = request.args.get('email')
+    if not has_identity(email):
+        return jsonify(error="Email je obavezan."), 400
+    
+    user_id = get_current_user_id(email)
+    if not user_id:
+        return jsonify(error="Korisnik nije pronađen."), 404
+    
+    limit = max(1, min(request.args.get('limit', DEFAULT_SUGGESTIONS, type=int), MAX_PAGE_SIZE))
+    suggestions = get_trade_matcher().suggest(user_id, limit)
+    
+    user_ids = {user for steps in suggestions for step in steps for user in step[:2]}
+    game_ids = {step[2] for steps in suggestions for step in steps}
+    names = dict(db.session.query(Korisnik.id, Korisnik.username).filter(Korisnik.id.in_(user_ids)))
+    titles = dict(db.session.query(Igra.id, Igra.naziv).filter(Igra.id.in_(game_ids)))
+    
+    return jsonify([{
+        'participants': [{'id': receiver_id, 'name': names.get(receiver_id)} for _, receiver_id, _ in steps],
+        'steps': [{
+            'fromUserId': giver_id,
+            'toUserId': receiver_id,
+            'game': {'id': game_id, 'title': titles.get(game_id)}
+        } for giver_id, receiver_id, game_id in steps]
+    } for steps in suggestions])
 
 
 @zamjene.get("/trades/<int:trade_id>/offerer-games")
 def get_offerer_games(trade_id):
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
@@ -159,28 +307,52 @@ def get_offerer_games(trade_id):
         result.append({
             'id': game.id,
             'title': game.naziv,
-            'hasImage': game.fotografija is not None
+            'hasImage': game.has_image
         })
     
     return jsonify(result)
 
-@zamjene.get("/trades/pending-count")
-def get_pending_count():
+@zamjene.get("/trades/<int:trade_id>/thread")
+def get_trade_thread(trade_id):
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
-    count = Zamjena.query.filter(
-        Zamjena.id_primatelj == user_id,
-        Zamjena.primatelj_vidio == False,
-        Zamjena.status == 'pending'
-    ).count()
+    trades = Zamjena.query.options(
+        joinedload(Zamjena.ponuditelj),
+        joinedload(Zamjena.primatelj),
+        joinedload(Zamjena.trazena_igra),
+        joinedload(Zamjena.ponudjene_igre).joinedload(ZamjenaIgra.igra)
+    ).filter(Zamjena.id.in_(trade_thread_ids(trade_id))).order_by(
+        Zamjena.vrijeme_kreiranja, Zamjena.id
+    ).all()
+    
+    if not trades:
+        return jsonify(error="Zamjena nije pronađena."), 404
+    
+    if not any(user_id in (trade.id_ponuditelj, trade.id_primatelj) for trade in trades):
+        return jsonify(error="Nemate pristup."), 403
     
-    return jsonify(count=count)
+    return jsonify([trade_to_dict(trade, user_id) for trade in trades])
+
+
+@zamjene.get("/trades/pending-count")
+def get_pending_count():
+    email = request.args.get('email')
+    if not has_identity(email):
+        return jsonify(error="Email je obavezan."), 400
+    
+    row = db.session.execute(
+        db.select(Korisnik.broj_novih_zamjena).where(current_user_clause(email))
+    ).first()
+    if row is None:
+        return jsonify(error="Korisnik nije pronađen."), 404
+    
+    return jsonify(count=max(row.broj_novih_zamjena, 0))
 
 
 @zamjene.post("/trades/<int:trade_id>/respond")
@@ -191,10 +363,10 @@ def respond_to_trade(trade_id):
     action = data.get('action')
     counter_games = data.get('counterGames', [])
     
-    if not email or not action:
+    if not has_identity(email) or not action:
         return jsonify(error="Email i action su obavezni."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
@@ -208,24 +380,36 @@ def respond_to_trade(trade_id):
     if trade.status != 'pending':
         return jsonify(error="Na ovu ponudu je već odgovoreno."), 400
     
+    if action not in RESPONSE_STATUSES:
+        return jsonify(error="Nepoznata akcija."), 400
+    if action == 'counter' and not counter_games:
+        return jsonify(error="Morate odabrati igre za protupundu."), 400
+    
+    was_unread = mark_seen_by_recipient(trade.id)
+    if not claim_pending_trade(trade, RESPONSE_STATUSES[action]):
+        db.session.rollback()
+        return jsonify(error="Na ovu ponudu je već odgovoreno."), 409
+    
     if action == 'accept':
-        trade.status = 'completed'
-        Ponuda.query.filter_by(id_igra=trade.id_trazena_igra).update({'jeAktivna': 0}, synchronize_session='fetch')
-        for zi in trade.ponudjene_igre:
-            Ponuda.query.filter_by(id_igra=zi.id_igra).update({'jeAktivna': 0}, synchronize_session='fetch')
-        trade.ponuditelj_vidio = False
-        
-    elif action == 'reject':
-        trade.status = 'rejected'
-        trade.ponuditelj_vidio = False
+        game_ids = {trade.id_trazena_igra} | {zi.id_igra for zi in trade.ponudjene_igre}
+        deactivated = db.session.execute(
+            update(Ponuda)
+            .where(Ponuda.id_igra.in_(game_ids), Ponuda.jeAktivna == 1)
+            .values(jeAktivna=0)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if deactivated < len(game_ids):
+            db.session.rollback()
+            return jsonify(error="Neka od igara više nije dostupna za zamjenu."), 409
+        cancel_conflicting_trades(trade.id, game_ids)
+        mark_trade_graph_dirty(trade.id_ponuditelj, trade.id_primatelj)
         
     elif action == 'counter':
-        if not counter_games:
-            return jsonify(error="Morate odabrati igre za protupundu."), 400
         new_trade = Zamjena(
             id_ponuditelj=user_id,
             id_primatelj=trade.id_ponuditelj,
             id_trazena_igra=trade.ponudjene_igre[0].id_igra if trade.ponudjene_igre else None,
+            id_roditelj=trade.id,
             status='pending',
             ponuditelj_vidio=True,
             primatelj_vidio=False
@@ -236,17 +420,12 @@ def respond_to_trade(trade_id):
         for igra_id in counter_games:
             zi = ZamjenaIgra(id_zamjena=new_trade.id, id_igra=igra_id)
             db.session.add(zi)
-        
-        trade.status = 'counter'
-        trade.ponuditelj_vidio = False
-    else:
-        return jsonify(error="Nepoznata akcija."), 400
+        adjust_unread_trades(new_trade.id_primatelj, 1)
     
-    trade.primatelj_vidio = True
+    if was_unread:
+        adjust_unread_trades(trade.id_primatelj, -1)
     
     try:
-        db.session.commit()
-        
         primatelj = Korisnik.query.get(trade.id_primatelj)
         ponuditelj = Korisnik.query.get(trade.id_ponuditelj)
         
@@ -274,6 +453,15 @@ def respond_to_trade(trade_id):
                 counter_games=counter_game_names
             )
         
+        publish_event(trade.id_ponuditelj, 'trade_responded', {'tradeId': trade.id, 'status': trade.status})
+        if action == 'counter':
+            publish_event(new_trade.id_primatelj, 'trade_created', {
+                'tradeId': new_trade.id,
+                'requestedGame': new_trade.trazena_igra.naziv if new_trade.trazena_igra else None,
+                'from': primatelj.username if primatelj else None
+            })
+        
+        db.session.commit()
         return jsonify(message="Odgovor uspješno poslan!")
     except Exception as e:
         db.session.rollback()
@@ -286,10 +474,10 @@ def mark_trade_seen(trade_id):
     data = request.json or {}
     email = data.get('email')
     
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
@@ -298,6 +486,8 @@ def mark_trade_seen(trade_id):
         return jsonify(error="Zamjena nije pronađena."), 404
     
     if trade.id_primatelj == user_id:
+        if mark_seen_by_recipient(trade.id):
+            adjust_unread_trades(user_id, -1)
         trade.primatelj_vidio = True
     elif trade.id_ponuditelj == user_id:
         trade.ponuditelj_vidio = True
@@ -313,14 +503,14 @@ def mark_trade_seen(trade_id):
 @zamjene.get("/trades/history")
 def get_trade_history():
     email = request.args.get('email')
-    if not email:
+    if not has_identity(email):
         return jsonify(error="Email je obavezan."), 400
     
-    user_id = get_user_id_from_email(email)
+    user_id = get_current_user_id(email)
     if not user_id:
         return jsonify(error="Korisnik nije pronađen."), 404
     
-    trades = Zamjena.query.filter(
+    trades = Zamjena.query.options(*trade_graph_options()).filter(
         ((Zamjena.id_ponuditelj == user_id) | (Zamjena.id_primatelj == user_id)),
         Zamjena.status == 'completed'
     ).order_by(Zamjena.vrijeme_azuriranja.desc()).all()
@@ -1,7 +1,8 @@
 import pytest
 from flask import Flask
+from sqlalchemy import event
 from flask_bcrypt import Bcrypt
-from flask_jwt_extended import JWTManager, create_access_token
+from flask_jwt_extended import JWTManager
 from database import db
 from models.actualUser import Korisnik
 from models.zanr import Zanr
@@ -10,10 +11,12 @@ from models.igra import Igra
 from models.ponuda import Ponuda
 from models.listazelja import ListaZelja
 from models.zamjena import Zamjena, ZamjenaIgra
+from models.obavijest import Obavijest
+from utils.current_user import issue_token
 
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     app = Flask(__name__)
     app.config['TESTING'] = True
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
@@ -21,6 +24,10 @@ def app():
     app.config['JWT_SECRET_KEY'] = 'test-secret-key'
     app.config['SECRET_KEY'] = 'test-secret-key'
     app.config['PROPAGATE_EXCEPTIONS'] = False
+    app.config['BCRYPT_LOG_ROUNDS'] = 4
+    app.config['IMAGE_STORE_DIR'] = str(tmp_path / 'images')
+    app.config['THUMBNAIL_CACHE_DIR'] = str(tmp_path / 'thumbnails')
+    app.config['UPLOAD_TMP_DIR'] = str(tmp_path / 'uploads')
     
     db.init_app(app)
     JWTManager(app)
@@ -31,12 +38,16 @@ def app():
     from routes.igre import igre
     from routes.zamjene import zamjene
     from routes.admin import admin
+    from routes.uploads import uploads
+    from routes.events import events
     
     app.register_blueprint(auth, url_prefix="/api")
     app.register_blueprint(profile, url_prefix="/api")
     app.register_blueprint(igre, url_prefix="/api")
     app.register_blueprint(zamjene, url_prefix="/api")
     app.register_blueprint(admin, url_prefix="/api")
+    app.register_blueprint(uploads, url_prefix="/api")
+    app.register_blueprint(events, url_prefix="/api")
     
     with app.app_context():
         db.create_all()
@@ -141,15 +152,52 @@ def sample_game(app, sample_user, sample_genre):
         }
 
 
+@pytest.fixture
+def add_listing(app, sample_genre):
+    """Factory that creates an Igra with an active Ponuda for `owner_id` and returns the game id."""
+    def create(owner_id, naziv, **fields):
+        with app.app_context():
+            game = Igra(**{
+                'naziv': naziv,
+                'izdavac': "Publisher",
+                'godina_izdanja': 2020,
+                'ocjena_ocuvanosti': 4,
+                'broj_igraca': "2-4",
+                'vrijeme_igranja': "30 min",
+                'procjena_tezine': 2,
+                'id_zanr': sample_genre['id'],
+                **fields
+            })
+            db.session.add(game)
+            db.session.flush()
+            db.session.add(Ponuda(id_korisnik=owner_id, id_igra=game.id, jeAktivna=1))
+            db.session.commit()
+            return game.id
+    return create
+
+
 @pytest.fixture
 def auth_token(app, sample_user):
     with app.app_context():
-        token = create_access_token(identity=sample_user['id'])
+        token = issue_token(db.session.get(Korisnik, sample_user['id']))
         return token
 
 
 @pytest.fixture
 def admin_token(app, admin_user):
     with app.app_context():
-        token = create_access_token(identity=admin_user['id'])
+        token = issue_token(db.session.get(Korisnik, admin_user['id']))
         return token
+
+
+@pytest.fixture
+def count_queries(app):
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
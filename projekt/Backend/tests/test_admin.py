@@ -1,6 +1,7 @@
 import pytest
 from models.actualUser import Korisnik
 from database import db
+from utils.current_user import issue_token
 
 
 class TestAdminAccess:
@@ -105,6 +106,18 @@ class TestAdminDeleteUser:
         
         assert response.status_code == 404
     
+    def test_delete_user_removes_games_from_search(self, client, admin_user, sample_game):
+        response = client.delete(
+            f'/api/admin/users/{sample_game["owner_id"]}?adminEmail={admin_user["email"]}'
+        )
+        
+        assert response.status_code == 200
+        with db.engine.connect() as connection:
+            matches = connection.exec_driver_sql(
+                "SELECT rowid FROM igra_fts WHERE igra_fts MATCH 'catan'"
+            ).all()
+        assert matches == []
+    
     def test_admin_cannot_delete_self(self, client, admin_user):
         response = client.delete(
             f'/api/admin/users/{admin_user["id"]}?adminEmail={admin_user["email"]}'
@@ -136,6 +149,7 @@ class TestAdminDeleteListing:
         )
         
         assert response.status_code == 200
+        assert client.get('/api/games?query=catan').get_json() == []
     
     def test_regular_user_cannot_admin_delete(self, client, sample_user, sample_game):
         response = client.delete(
@@ -143,3 +157,73 @@ class TestAdminDeleteListing:
         )
         
         assert response.status_code == 403
+
+
+class TestAdminRoleClaims:
+    
+    def test_admin_token_needs_no_email(self, client, admin_token, sample_user):
+        response = client.get('/api/admin/users', headers={'Authorization': f'Bearer {admin_token}'})
+        
+        assert response.status_code == 200
+        assert len(response.get_json()) == 2
+    
+    def test_cached_admin_check_runs_no_query(self, client, admin_token, count_queries):
+        headers = {'Authorization': f'Bearer {admin_token}'}
+        client.get('/api/admin/metrics', headers=headers)
+        count_queries.clear()
+        
+        assert client.get('/api/admin/metrics', headers=headers).status_code == 200
+        assert count_queries == []
+    
+    def test_regular_token_rejected(self, client, auth_token):
+        response = client.get('/api/admin/stats', headers={'Authorization': f'Bearer {auth_token}'})
+        assert response.status_code == 403
+    
+    def test_check_admin_from_token(self, client, admin_token, auth_token):
+        for token, expected in ((admin_token, True), (auth_token, False)):
+            response = client.post('/api/checkAdmin', json={}, headers={'Authorization': f'Bearer {token}'})
+            assert response.get_json()['isAdmin'] is expected
+    
+    def test_demotion_takes_effect_immediately(self, app, client, admin_token):
+        headers = {'Authorization': f'Bearer {admin_token}'}
+        assert client.get('/api/admin/stats', headers=headers).status_code == 200
+        
+        with app.app_context():
+            other = Korisnik(email='second-admin@example.com', passwordHash='x', username='Other', jeAdmin=1)
+            db.session.add(other)
+            db.session.commit()
+            other_token = issue_token(other)
+        
+        admin_id = Korisnik.query.filter_by(email='admin@example.com').one().id
+        response = client.put(f'/api/admin/users/{admin_id}/toggle-admin', json={},
+                              headers={'Authorization': f'Bearer {other_token}'})
+        
+        assert response.get_json()['isAdmin'] is False
+        assert client.get('/api/admin/stats', headers=headers).status_code == 403
+    
+    def test_revoked_token_rejected_after_ttl(self, app, client, admin_token):
+        from utils.current_user import revoke_tokens_command
+        
+        headers = {'Authorization': f'Bearer {admin_token}'}
+        assert client.get('/api/admin/stats', headers=headers).status_code == 200
+        
+        result = app.test_cli_runner().invoke(revoke_tokens_command, ['admin@example.com'])
+        
+        assert result.exit_code == 0
+        assert client.get('/api/admin/stats', headers=headers).status_code == 403
+    
+    def test_other_process_changes_seen_after_ttl(self, app, client, admin_token):
+        headers = {'Authorization': f'Bearer {admin_token}'}
+        app.config['AUTH_CLAIMS_CACHE_SECONDS'] = 0
+        app.extensions.pop('token_state_cache', None)
+        assert client.get('/api/admin/stats', headers=headers).status_code == 200
+        
+        Korisnik.query.filter_by(email='admin@example.com').update({'jeAdmin': 0})
+        db.session.commit()
+        
+        assert client.get('/api/admin/stats', headers=headers).status_code == 403
+    
+    def test_admin_cannot_delete_self_with_token(self, client, admin_user, admin_token):
+        response = client.delete(f'/api/admin/users/{admin_user["id"]}',
+                                 headers={'Authorization': f'Bearer {admin_token}'})
+        assert response.status_code == 400
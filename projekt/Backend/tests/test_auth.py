@@ -72,3 +72,47 @@ class TestLogin:
             'password': ''
         })
         assert response.status_code == 401
+
+
+class TestCurrentUser:
+    def test_login_token_identifies_user(self, client, sample_user):
+        token = client.post('/api/login', json={
+            'email': sample_user['email'],
+            'password': sample_user['password']
+        }).get_json()['token']
+        
+        response = client.get('/api/trades/pending-count', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 200
+        assert response.get_json() == {'count': 0}
+
+    def test_token_skips_email_lookup(self, client, auth_token, sample_game, count_queries):
+        count_queries.clear()
+        response = client.get('/api/myGames', headers={'Authorization': f'Bearer {auth_token}'})
+        
+        assert response.status_code == 200
+        assert [game['id'] for game in response.get_json()] == [sample_game['id']]
+        assert not any('korisnik.email' in statement for statement in count_queries)
+
+    def test_token_wins_over_email(self, client, auth_token, admin_user):
+        response = client.get(f'/api/admin/users?adminEmail={admin_user["email"]}',
+                              headers={'Authorization': f'Bearer {auth_token}'})
+        assert response.status_code == 403
+
+    def test_invalid_token_rejected(self, client, sample_user):
+        response = client.get(f'/api/wishlist?email={sample_user["email"]}',
+                              headers={'Authorization': 'Bearer not-a-token'})
+        assert response.status_code in (401, 422)
+
+    def test_email_fallback_can_be_disabled(self, app, client, sample_user, auth_token):
+        app.config['AUTH_EMAIL_FALLBACK'] = False
+        
+        assert client.get(f'/api/wishlist?email={sample_user["email"]}').status_code == 404
+        assert client.get('/api/wishlist', headers={'Authorization': f'Bearer {auth_token}'}).status_code == 200
+
+    def test_email_is_unique(self, app, sample_user):
+        from sqlalchemy.exc import IntegrityError
+        
+        db.session.add(Korisnik(email=sample_user['email'], passwordHash='x', username='Copy', jeAdmin=0))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
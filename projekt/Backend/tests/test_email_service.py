@@ -133,3 +133,83 @@ class TestEmailContent:
             
             assert 'TestOfferer' in html_content or mock_send.called
             assert 'TestGame' in html_content or mock_send.called
+
+
+class FakeSMTP:
+    instances = []
+    
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.fail_next = None
+        self.closed = False
+        FakeSMTP.instances.append(self)
+    
+    def starttls(self):
+        pass
+    
+    def login(self, username, password):
+        pass
+    
+    def noop(self):
+        return (250, b'OK')
+    
+    def sendmail(self, from_addr, to_addr, message):
+        if self.fail_next:
+            error, self.fail_next = self.fail_next, None
+            raise error
+        self.sent.append(to_addr)
+    
+    def quit(self):
+        self.closed = True
+    
+    def close(self):
+        self.closed = True
+
+
+class TestSMTPConnectionPool:
+    
+    @pytest.fixture
+    def pool(self):
+        from utils.email_service import SMTPConnectionPool
+        FakeSMTP.instances = []
+        return SMTPConnectionPool('localhost', 25, 'user', 'secret', size=2, max_messages=3, smtp_class=FakeSMTP)
+    
+    def test_reuses_connection_across_batches(self, pool):
+        pool.send_many('from@example.com', [('a@example.com', 'msg'), ('b@example.com', 'msg')])
+        pool.send_many('from@example.com', [('c@example.com', 'msg')])
+        
+        assert len(FakeSMTP.instances) == 1
+        assert FakeSMTP.instances[0].sent == ['a@example.com', 'b@example.com', 'c@example.com']
+        assert pool.stats()['messagesSent'] == 3
+        assert pool.stats()['connectionsOpened'] == 1
+    
+    def test_rotates_after_max_messages(self, pool):
+        errors = pool.send_many('from@example.com', [(f'{i}@example.com', 'msg') for i in range(5)])
+        
+        assert errors == [None] * 5
+        assert [len(s.sent) for s in FakeSMTP.instances] == [3, 2]
+        assert FakeSMTP.instances[0].closed
+    
+    def test_replaces_dead_connection(self, pool):
+        import smtplib
+        pool.send_many('from@example.com', [('a@example.com', 'msg')])
+        FakeSMTP.instances[0].fail_next = smtplib.SMTPServerDisconnected('gone')
+        
+        errors = pool.send_many('from@example.com', [('b@example.com', 'msg')])
+        
+        assert errors == [None]
+        assert FakeSMTP.instances[0].closed
+        assert FakeSMTP.instances[1].sent == ['b@example.com']
+        assert pool.stats()['reconnects'] == 1
+    
+    def test_refused_recipient_keeps_connection(self, pool):
+        import smtplib
+        pool.send_many('from@example.com', [('a@example.com', 'msg')])
+        FakeSMTP.instances[0].fail_next = smtplib.SMTPRecipientsRefused({'bad@example.com': (550, b'no')})
+        
+        errors = pool.send_many('from@example.com', [('bad@example.com', 'msg'), ('c@example.com', 'msg')])
+        
+        assert isinstance(errors[0], smtplib.SMTPRecipientsRefused)
+        assert errors[1] is None
+        assert len(FakeSMTP.instances) == 1
+        assert pool.stats()['messagesFailed'] == 1
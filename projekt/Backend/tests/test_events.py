@@ -0,0 +1,136 @@
+import pytest
+from database import db
+from models.actualUser import Korisnik
+from utils.events import InProcessBroker, SubscriptionOverflow, get_event_broker, publish_event
+
+
+class TestInProcessBroker:
+    
+    def test_delivers_only_to_target_user(self):
+        broker = InProcessBroker()
+        mine = broker.subscribe(1)
+        other = broker.subscribe(2)
+        
+        broker.publish(1, 'trade_created', {'tradeId': 5})
+        
+        assert mine.get(timeout=0.1)[2:] == ('trade_created', {'tradeId': 5})
+        assert other.get(timeout=0.01) is None
+    
+    def test_replays_after_last_event_id(self):
+        broker = InProcessBroker()
+        first = broker.publish(1, 'trade_created', {'tradeId': 1})
+        broker.publish(2, 'trade_created', {'tradeId': 2})
+        broker.publish(1, 'trade_responded', {'tradeId': 1})
+        
+        subscription = broker.subscribe(1, last_event_id=first)
+        
+        assert subscription.get(timeout=0.1)[2] == 'trade_responded'
+        assert subscription.get(timeout=0.01) is None
+    
+    def test_resync_when_history_was_truncated(self):
+        broker = InProcessBroker(history_size=2)
+        for trade_id in range(4):
+            broker.publish(1, 'trade_created', {'tradeId': trade_id})
+        
+        subscription = broker.subscribe(1, last_event_id=1)
+        
+        assert subscription.get(timeout=0.1)[2] == 'resync'
+        assert [subscription.get(timeout=0.1)[3]['tradeId'] for _ in range(2)] == [2, 3]
+    
+    def test_slow_subscriber_overflows(self):
+        broker = InProcessBroker(buffer_size=2)
+        subscription = broker.subscribe(1)
+        for trade_id in range(3):
+            broker.publish(1, 'trade_created', {'tradeId': trade_id})
+        
+        with pytest.raises(SubscriptionOverflow):
+            subscription.get(timeout=0.1)
+    
+    def test_ids_are_ordered_timestamps(self):
+        broker = InProcessBroker()
+        ids = [broker.publish(1, 'trade_created', {}) for _ in range(3)]
+        
+        assert ids == sorted(set(ids))
+        assert ids[0] > 1_000_000_000_000_000
+    
+    def test_resync_when_last_id_predates_broker(self):
+        broker = InProcessBroker()
+        broker.publish(1, 'trade_created', {'tradeId': 1})
+        
+        subscription = broker.subscribe(1, last_event_id=5)
+        
+        assert subscription.get(timeout=0.1)[2] == 'resync'
+        assert subscription.get(timeout=0.1)[3] == {'tradeId': 1}
+    
+    def test_unsubscribe(self):
+        broker = InProcessBroker()
+        subscription = broker.subscribe(1)
+        subscription.close()
+        
+        broker.publish(1, 'trade_created', {})
+        
+        assert subscription.get(timeout=0.01) is None
+
+
+class TestEventPublishing:
+    
+    def test_published_only_after_commit(self, app, sample_user):
+        with app.app_context():
+            subscription = get_event_broker().subscribe(1)
+            
+            db.session.get(Korisnik, sample_user['id']).opis = 'changed'
+            publish_event(1, 'trade_created', {'tradeId': 1})
+            assert subscription.get(timeout=0.01) is None
+            db.session.rollback()
+            
+            publish_event(1, 'trade_created', {'tradeId': 2})
+            db.session.commit()
+            assert subscription.get(timeout=0.1)[3] == {'tradeId': 2}
+            assert subscription.get(timeout=0.01) is None
+    
+    def test_wishlist_match_publishes_event(self, app, client, sample_user, sample_game, admin_user):
+        client.post('/api/wishlist', json={'email': admin_user['email'], 'gameId': sample_game['id']})
+        with app.app_context():
+            subscription = get_event_broker().subscribe(admin_user['id'])
+        
+        response = client.post('/api/games', json={
+            'email': sample_user['email'], 'naziv': 'catan', 'izdavac': 'Kosmos',
+            'godina_izdanja': '1995', 'ocjena_ocuvanosti': '4', 'broj_igraca': '3-4',
+            'vrijeme_igranja': '60 min', 'zanr': 'Strategija'
+        })
+        
+        assert response.status_code == 201
+        _, _, event_type, data = subscription.get(timeout=0.1)
+        assert event_type == 'wishlist_available'
+        assert data['gameId'] == response.get_json()['gameId']
+
+
+class TestEventStream:
+    
+    @pytest.fixture(autouse=True)
+    def stream_enabled(self, app):
+        app.config['EVENT_STREAM_ENABLED'] = True
+    
+    def test_stream_replays_and_heartbeats(self, app, client, sample_user):
+        app.config['EVENT_HEARTBEAT_SECONDS'] = 0.05
+        with app.app_context():
+            event_id = get_event_broker().publish(sample_user['id'], 'trade_created', {'tradeId': 7})
+        
+        response = client.get(f'/api/events?email={sample_user["email"]}',
+                              headers={'Last-Event-ID': str(event_id - 1)}, buffered=False)
+        chunks = iter(response.response)
+        
+        assert response.mimetype == 'text/event-stream'
+        assert next(chunks) == b'retry: 3000\n\n'
+        assert next(chunks) == f'id: {event_id}\nevent: trade_created\ndata: {{"tradeId": 7}}\n\n'.encode()
+        assert next(chunks) == b': heartbeat\n\n'
+        response.close()
+    
+    def test_stream_requires_known_user(self, client):
+        assert client.get('/api/events').status_code == 400
+        assert client.get('/api/events?email=nobody@example.com').status_code == 404
+    
+    def test_stream_disabled_by_default(self, app, client, sample_user):
+        app.config.pop('EVENT_STREAM_ENABLED')
+        
+        assert client.get(f'/api/events?email={sample_user["email"]}').status_code == 404
@@ -1,6 +1,6 @@
 import pytest
+from unittest.mock import patch
 from models.igra import Igra
-from models.ponuda import Ponuda
 from models.listazelja import ListaZelja
 from database import db
 
@@ -23,6 +23,209 @@ class TestGetGames:
         assert isinstance(data, list)
 
 
+@pytest.fixture
+def filter_games(sample_user, add_listing):
+    specs = [
+        ("Azul", "2-4", 1),
+        ("Gloomhaven", "1-4", 3),
+        ("Codenames", "4+", 1),
+        ("Patchwork", "2", 2),
+    ]
+    for naziv, players, difficulty in specs:
+        add_listing(sample_user['id'], naziv, broj_igraca=players, procjena_tezine=difficulty, godina_izdanja=2018)
+
+
+class TestGameFilters:
+    
+    def _titles(self, client, params):
+        response = client.get(f'/api/games?{params}')
+        assert response.status_code == 200
+        return sorted(g['title'] for g in response.get_json())
+    
+    def test_filter_by_query(self, client, filter_games):
+        assert self._titles(client, 'query=gLoOm') == ['Gloomhaven']
+    
+    def test_filter_by_difficulty(self, client, filter_games):
+        assert self._titles(client, 'difficulty=Lagano') == ['Azul', 'Codenames']
+        assert self._titles(client, 'difficulty=Nepoznato') == []
+    
+    def test_filter_by_player_range(self, client, filter_games):
+        assert self._titles(client, 'minPlayers=5') == ['Codenames']
+        assert self._titles(client, 'maxPlayers=1') == ['Gloomhaven']
+        assert self._titles(client, 'minPlayers=2&maxPlayers=2') == ['Azul', 'Gloomhaven', 'Patchwork']
+
+
+class TestGameSearch:
+    
+    def _titles(self, client, params):
+        response = client.get(f'/api/games?{params}')
+        assert response.status_code == 200
+        return [g['title'] for g in response.get_json()]
+    
+    def test_search_publisher_and_description(self, client, sample_game, add_listing):
+        add_listing(sample_game['owner_id'], "Pandemic", izdavac="Z-Man Games")
+        add_listing(sample_game['owner_id'], "Terraforming Mars", dodatan_opis="Kolonizacija crvenog planeta")
+        
+        assert self._titles(client, 'query=kosmos') == ['Catan']
+        assert self._titles(client, 'query=z-man') == ['Pandemic']
+        assert self._titles(client, 'query=planet') == ['Terraforming Mars']
+    
+    def test_search_ranks_title_matches_first(self, client, sample_game, add_listing):
+        add_listing(sample_game['owner_id'], "Dominion", dodatan_opis="Deckbuilding, sličan Catan igrama")
+        add_listing(sample_game['owner_id'], "Catan: Seafarers")
+        
+        titles = self._titles(client, 'query=catan')
+        assert titles[-1] == 'Dominion'
+        assert set(titles[:2]) == {'Catan', 'Catan: Seafarers'}
+    
+    def test_search_ignores_diacritics(self, client, sample_game, add_listing):
+        add_listing(sample_game['owner_id'], "Čovječe ne ljuti se")
+        
+        assert self._titles(client, 'query=covjece') == ['Čovječe ne ljuti se']
+    
+    def test_search_index_follows_update_and_delete(self, app, client, sample_game):
+        client.put(f'/api/games/{sample_game["id"]}', json={'naziv': 'Carcassonne'})
+        assert self._titles(client, 'query=catan') == []
+        assert self._titles(client, 'query=carcas') == ['Carcassonne']
+        
+        client.delete(f'/api/games/{sample_game["id"]}')
+        assert self._titles(client, 'query=carcas') == []
+    
+    def test_search_pagination(self, client, sample_game, add_listing):
+        for i in range(4):
+            add_listing(sample_game['owner_id'], f"Catan Expansion {i}")
+        
+        seen = []
+        cursor = ''
+        while True:
+            data = client.get(f'/api/games?query=catan&limit=2{cursor}').get_json()
+            seen.extend(g['title'] for g in data['games'])
+            if data['nextCursor'] is None:
+                break
+            cursor = f"&cursor={data['nextCursor']}"
+        
+        assert seen == self._titles(client, 'query=catan')
+        assert len(seen) == 5
+    
+    def test_search_invalid_cursor(self, client, sample_game):
+        response = client.get('/api/games?query=catan&cursor=abc')
+        
+        assert response.status_code == 400
+
+
+class TestGamePagination:
+    
+    def test_keyset_pages_cover_catalog(self, client, filter_games, sample_game):
+        seen = []
+        cursor = ''
+        while True:
+            response = client.get(f'/api/games?limit=2{cursor}')
+            assert response.status_code == 200
+            data = response.get_json()
+            assert len(data['games']) <= 2
+            seen.extend(g['id'] for g in data['games'])
+            if data['nextCursor'] is None:
+                break
+            cursor = f"&cursor={data['nextCursor']}"
+        
+        all_ids = [g['id'] for g in client.get('/api/games').get_json()]
+        assert seen == sorted(all_ids)
+        assert len(seen) == 5
+    
+    def test_pagination_respects_filters(self, client, filter_games):
+        data = client.get('/api/games?limit=1&difficulty=Lagano').get_json()
+        assert [g['title'] for g in data['games']] == ['Azul']
+        
+        data = client.get(f'/api/games?limit=1&difficulty=Lagano&cursor={data["nextCursor"]}').get_json()
+        assert [g['title'] for g in data['games']] == ['Codenames']
+        assert data['nextCursor'] is None
+    
+    def test_stream_matches_full_listing(self, client, filter_games):
+        streamed = client.get('/api/games?stream=1')
+        
+        assert streamed.status_code == 200
+        assert streamed.is_streamed
+        assert streamed.get_json() == client.get('/api/games').get_json()
+    
+    def test_stream_empty_catalog(self, client):
+        assert client.get('/api/games?stream=1').get_json() == []
+
+
+class TestGameQueryCount:
+    
+    def _queries_for(self, client, count_queries, url):
+        count_queries.clear()
+        response = client.get(url)
+        assert response.status_code == 200
+        return len(count_queries)
+    
+    def test_catalog_query_count_independent_of_size(self, client, sample_game, add_listing, count_queries):
+        for i in range(2):
+            add_listing(sample_game['owner_id'], f"Bulk {i}")
+        small = self._queries_for(client, count_queries, '/api/games')
+        
+        for i in range(2, 12):
+            add_listing(sample_game['owner_id'], f"Bulk {i}")
+        large = self._queries_for(client, count_queries, '/api/games')
+        
+        assert small == large
+    
+    def test_my_games_query_count_independent_of_size(self, client, sample_game, add_listing, count_queries):
+        url = f'/api/myGames?email={sample_game["owner_email"]}'
+        for i in range(2):
+            add_listing(sample_game['owner_id'], f"Bulk {i}")
+        small = self._queries_for(client, count_queries, url)
+        
+        for i in range(2, 12):
+            add_listing(sample_game['owner_id'], f"Bulk {i}")
+        large = self._queries_for(client, count_queries, url)
+        
+        assert small == large
+    
+    def test_game_detail_includes_owner(self, client, sample_game, count_queries):
+        count_queries.clear()
+        response = client.get(f'/api/games/{sample_game["id"]}')
+        
+        data = response.get_json()
+        assert data['ownerEmail'] == sample_game['owner_email']
+        assert data['genre'] == 'Strategija'
+        assert len(count_queries) == 1
+
+
+class TestGameImages:
+    
+    def test_listings_do_not_load_image_bytes(self, app, client, sample_game, count_queries):
+        with app.app_context():
+            game = db.session.get(Igra, sample_game['id'])
+            game.fotografija = b'\x89PNG' + b'0' * 100
+            db.session.commit()
+        
+        count_queries.clear()
+        data = client.get('/api/games').get_json()
+        client.get(f'/api/myGames?email={sample_game["owner_email"]}')
+        client.get(f'/api/games/{sample_game["id"]}')
+        
+        assert data[0]['hasImage'] is True
+        assert not any('fotografija' in statement for statement in count_queries)
+    
+    def test_get_game_image(self, app, client, sample_game):
+        with app.app_context():
+            game = db.session.get(Igra, sample_game['id'])
+            game.fotografija = b'image-bytes'
+            db.session.commit()
+            assert game.image_size == len(b'image-bytes')
+        
+        response = client.get(f'/api/games/{sample_game["id"]}/image')
+        
+        assert response.status_code == 200
+        assert response.data == b'image-bytes'
+    
+    def test_get_game_image_missing(self, client, sample_game):
+        response = client.get(f'/api/games/{sample_game["id"]}/image')
+        
+        assert response.status_code == 404
+
+
 class TestGetMyGames:
     
     def test_get_my_games_success(self, client, sample_game, sample_user):
@@ -156,3 +359,57 @@ class TestDeleteGame:
 
 
 from models.actualUser import Korisnik
+
+
+class TestWishlistNotifications:
+    
+    def _add_wisher(self, app, email, game_ids):
+        with app.app_context():
+            user = Korisnik(email=email, passwordHash="hash", username=email.split('@')[0], jeAdmin=0)
+            db.session.add(user)
+            db.session.flush()
+            for game_id in game_ids:
+                db.session.add(ListaZelja(id_korisnik=user.id, id_igra=game_id))
+            db.session.commit()
+    
+    def test_notifies_only_users_wishing_same_title(self, app, client, sample_game, filter_games):
+        with app.app_context():
+            azul_id = Igra.query.filter_by(naziv="Azul").first().id
+        self._add_wisher(app, "catan.fan@example.com", [sample_game['id']])
+        self._add_wisher(app, "azul.fan@example.com", [azul_id])
+        
+        with patch('routes.igre.send_wishlist_available_notification') as notify:
+            response = client.post('/api/games', json={
+                'naziv': '  CATAN ',
+                'izdavac': 'Kosmos',
+                'godina_izdanja': 2015,
+                'ocjena_ocuvanosti': 3,
+                'broj_igraca': '3-4',
+                'vrijeme_igranja': '60 min',
+                'zanr': 'Strategija',
+                'email': sample_game['owner_email']
+            })
+        
+        assert response.status_code == 201
+        notify.assert_called_once()
+        assert notify.call_args.kwargs['to_email'] == "catan.fan@example.com"
+        assert notify.call_args.kwargs['owner_name'] == "TestUser"
+    
+    def test_owner_not_notified_for_own_wishlist(self, app, client, sample_game, sample_user):
+        with app.app_context():
+            db.session.add(ListaZelja(id_korisnik=sample_user['id'], id_igra=sample_game['id']))
+            db.session.commit()
+        
+        with patch('routes.igre.send_wishlist_available_notification') as notify:
+            client.post('/api/games', json={
+                'naziv': 'Catan',
+                'izdavac': 'Kosmos',
+                'godina_izdanja': 2015,
+                'ocjena_ocuvanosti': 3,
+                'broj_igraca': '3-4',
+                'vrijeme_igranja': '60 min',
+                'zanr': 'Strategija',
+                'email': sample_user['email']
+            })
+        
+        notify.assert_not_called()
@@ -0,0 +1,164 @@
+import time
+import pytest
+import requests
+import rsa
+from google.auth import crypt, jwt
+from models.actualUser import Korisnik
+from utils.google_auth import (
+    GoogleCertSource,
+    GoogleTokenVerifier,
+    StaticKeySource,
+    cache_max_age
+)
+
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+@pytest.fixture(scope='module')
+def keys():
+    public_key, private_key = rsa.newkeys(1024)
+    return public_key.save_pkcs1().decode(), private_key.save_pkcs1().decode()
+
+
+def make_token(private_pem, key_id='k1', **claims):
+    now = int(time.time())
+    payload = {
+        'iss': 'https://accounts.google.com',
+        'aud': CLIENT_ID,
+        'sub': '1234',
+        'email': 'google@example.com',
+        'iat': now,
+        'exp': now + 600
+    }
+    payload.update(claims)
+    return jwt.encode(crypt.RSASigner.from_string(private_pem, key_id), payload).decode()
+
+
+class FakeResponse:
+    def __init__(self, certs, headers):
+        self.certs = certs
+        self.headers = headers
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.certs
+
+
+class FakeSession:
+    def __init__(self, certs, cache_control='public, max-age=3600'):
+        self.certs = certs
+        self.cache_control = cache_control
+        self.calls = 0
+        self.fail = False
+
+    def get(self, url, timeout):
+        self.calls += 1
+        if self.fail:
+            raise requests.ConnectionError("offline")
+        return FakeResponse(dict(self.certs), {'Cache-Control': self.cache_control})
+
+
+class TestGoogleLogin:
+
+    @pytest.fixture
+    def google(self, app, keys):
+        app.config['GOOGLE_KEY_SOURCE'] = StaticKeySource({'k1': keys[0]})
+        app.config['GOOGLE_CLIENT_ID'] = CLIENT_ID
+        return keys[1]
+
+    def test_login_with_local_key_set(self, client, google):
+        response = client.post('/api/google-login', json={'credential': make_token(google)})
+
+        assert response.status_code == 200
+        assert response.get_json()['email'] == 'google@example.com'
+        user = Korisnik.query.filter_by(email='google@example.com').one()
+        assert client.post('/api/login', json={
+            'email': 'google@example.com', 'password': user.passwordHash
+        }).status_code == 401
+
+    @pytest.mark.parametrize('claims', [
+        {'aud': 'someone-else'},
+        {'iss': 'https://evil.example.com'},
+        {'exp': int(time.time()) - 60},
+    ])
+    def test_invalid_tokens_rejected(self, client, google, claims):
+        response = client.post('/api/google-login', json={'credential': make_token(google, **claims)})
+        assert response.status_code == 401
+
+    def test_unknown_key_rejected(self, client, google):
+        response = client.post('/api/google-login', json={'credential': make_token(google, key_id='k2')})
+        assert response.status_code == 401
+
+    def test_garbage_rejected(self, client, google):
+        assert client.post('/api/google-login', json={'credential': 'not.a.token'}).status_code == 401
+
+
+class TestGoogleCertSource:
+
+    def test_max_age(self):
+        assert cache_max_age({'Cache-Control': 'public, max-age=20000, must-revalidate'}) == 20000
+        assert cache_max_age({'Cache-Control': 'max-age=100', 'Age': '30'}) == 70
+        assert cache_max_age({}) == 300
+
+    def test_certs_cached_until_max_age(self, keys, monkeypatch):
+        session = FakeSession({'k1': keys[0]}, cache_control='max-age=100')
+        source = GoogleCertSource(session=session)
+
+        source.get_certs()
+        source.get_certs()
+        assert session.calls == 1
+
+        later = time.time() + 101
+        monkeypatch.setattr(time, 'time', lambda: later)
+        source.get_certs()
+        assert session.calls == 2
+
+    def test_disk_cache_survives_restart(self, keys, tmp_path):
+        path = str(tmp_path / 'certs' / 'google.json')
+        first = FakeSession({'k1': keys[0]})
+        GoogleCertSource(session=first, cache_path=path).get_certs()
+
+        second = FakeSession({})
+        assert GoogleCertSource(session=second, cache_path=path).get_certs() == {'k1': keys[0]}
+        assert second.calls == 0
+
+    def test_unknown_key_refetches_once(self, keys, monkeypatch):
+        session = FakeSession({'old': keys[0]})
+        source = GoogleCertSource(session=session)
+        source.get_certs()
+        verifier = GoogleTokenVerifier(source, CLIENT_ID)
+        session.certs = {'k1': keys[0]}
+        rotated, unknown = make_token(keys[1]), make_token(keys[1], key_id='k9')
+        later = time.time() + 61
+        monkeypatch.setattr(time, 'time', lambda: later)
+
+        assert verifier.verify(rotated)['email'] == 'google@example.com'
+        assert session.calls == 2
+
+        with pytest.raises(ValueError):
+            verifier.verify(unknown)
+        assert session.calls == 2
+
+    def test_stale_certs_used_when_fetch_fails(self, keys, monkeypatch):
+        session = FakeSession({'k1': keys[0]}, cache_control='max-age=0')
+        source = GoogleCertSource(session=session)
+        source.get_certs()
+
+        session.fail = True
+        assert source.get_certs() == {'k1': keys[0]}
+
+        with pytest.raises(requests.ConnectionError):
+            GoogleCertSource(session=session).get_certs()
+
+    def test_unwritable_cache_keeps_certs_in_memory(self, keys, tmp_path):
+        blocker = tmp_path / 'not-a-dir'
+        blocker.write_text('')
+        session = FakeSession({'k1': keys[0]})
+        source = GoogleCertSource(session=session, cache_path=str(blocker / 'google.json'))
+
+        assert source.get_certs() == {'k1': keys[0]}
+        assert source.get_certs() == {'k1': keys[0]}
+        assert session.calls == 1
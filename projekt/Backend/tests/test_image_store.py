@@ -0,0 +1,204 @@
+import hashlib
+import os
+import pytest
+from io import BytesIO
+from PIL import Image
+from models.igra import Igra
+from models.actualUser import Korisnik
+from database import db
+from utils.image_store import LocalImageStore, cleanup_images_command, get_image_store, migrate_images_command
+
+
+IMAGE_BYTES = b'\xff\xd8\xff' + b'image-data' * 100
+
+
+def add_game_with_upload(client, email, image=IMAGE_BYTES):
+    return client.post('/api/games', data={
+        'naziv': 'Azul',
+        'izdavac': 'Plan B',
+        'godina_izdanja': '2017',
+        'ocjena_ocuvanosti': '5',
+        'broj_igraca': '2-4',
+        'vrijeme_igranja': '45 min',
+        'zanr': 'Apstraktna',
+        'email': email,
+        'image': (BytesIO(image), 'azul.jpg')
+    }, content_type='multipart/form-data')
+
+
+class TestLocalImageStore:
+
+    def test_save_is_content_addressed(self, tmp_path):
+        store = LocalImageStore(str(tmp_path))
+
+        digest, size = store.save(IMAGE_BYTES)
+
+        assert digest == hashlib.sha256(IMAGE_BYTES).hexdigest()
+        assert size == len(IMAGE_BYTES)
+        assert store.path(digest).startswith(os.path.join(str(tmp_path), digest[:2], digest[2:4]))
+        with open(store.path(digest), 'rb') as f:
+            assert f.read() == IMAGE_BYTES
+
+    def test_save_deduplicates(self, tmp_path):
+        store = LocalImageStore(str(tmp_path))
+
+        first, _ = store.save(IMAGE_BYTES)
+        second, _ = store.save_stream([IMAGE_BYTES[:5], IMAGE_BYTES[5:]])
+
+        assert first == second
+        assert not [name for name in os.listdir(tmp_path) if name.startswith('.upload-')]
+
+
+class TestGameImageUpload:
+
+    def test_upload_writes_to_store_not_database(self, app, client, sample_user):
+        response = add_game_with_upload(client, sample_user['email'])
+
+        assert response.status_code == 201
+        with app.app_context():
+            game = db.session.get(Igra, response.get_json()['gameId'])
+            assert game.fotografija is None
+            assert game.has_image is True
+            assert game.image_size == len(IMAGE_BYTES)
+            assert get_image_store().exists(game.image_hash)
+
+    def test_serve_supports_range_requests(self, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+
+        full = client.get(f'/api/games/{game_id}/image')
+        partial = client.get(f'/api/games/{game_id}/image', headers={'Range': 'bytes=0-2'})
+
+        assert full.data == IMAGE_BYTES
+        assert partial.status_code == 206
+        assert partial.data == IMAGE_BYTES[:3]
+
+    def test_accel_redirect_offload(self, app, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+        app.config['IMAGE_ACCEL_REDIRECT_PREFIX'] = '/protected-images/'
+
+        response = client.get(f'/api/games/{game_id}/image')
+
+        digest = hashlib.sha256(IMAGE_BYTES).hexdigest()
+        assert response.headers['X-Accel-Redirect'] == f'/protected-images/{digest[:2]}/{digest[2:4]}/{digest}'
+        assert response.data == b''
+
+
+    def test_mimetype_stored_with_row(self, app, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+
+        with app.app_context():
+            assert db.session.get(Igra, game_id).image_mimetype == 'image/jpeg'
+        assert client.get(f'/api/games/{game_id}/image').mimetype == 'image/jpeg'
+
+    def test_oversized_dimensions_rejected(self, app, client, sample_user):
+        app.config['MAX_IMAGE_PIXELS'] = 100
+        output = BytesIO()
+        Image.new('RGB', (20, 20)).save(output, format='PNG')
+
+        response = add_game_with_upload(client, sample_user['email'], output.getvalue())
+
+        assert response.status_code == 413
+        with app.app_context():
+            assert not get_image_store().exists(hashlib.sha256(output.getvalue()).hexdigest())
+
+    def test_missing_blob_returns_404(self, app, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+        with app.app_context():
+            os.remove(get_image_store().path(hashlib.sha256(IMAGE_BYTES).hexdigest()))
+
+        assert client.get(f'/api/games/{game_id}/image').status_code == 404
+
+
+class TestImageCaching:
+
+    def test_response_carries_stored_hash_as_etag(self, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+        digest = hashlib.sha256(IMAGE_BYTES).hexdigest()
+
+        response = client.get(f'/api/games/{game_id}/image')
+
+        assert response.headers['ETag'] == f'"{digest}"'
+        assert response.cache_control.no_cache
+        assert client.get(f'/api/games/{game_id}').get_json()['imageHash'] == digest
+
+    def test_if_none_match_returns_304_without_reading_image(self, app, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+        digest = hashlib.sha256(IMAGE_BYTES).hexdigest()
+        with app.app_context():
+            os.remove(get_image_store().path(digest))
+
+        response = client.get(f'/api/games/{game_id}/image', headers={'If-None-Match': f'"{digest}"'})
+
+        assert response.status_code == 304
+        assert response.data == b''
+
+    def test_hashed_url_is_immutable(self, client, sample_user):
+        game_id = add_game_with_upload(client, sample_user['email']).get_json()['gameId']
+        digest = hashlib.sha256(IMAGE_BYTES).hexdigest()
+
+        response = client.get(f'/api/games/{game_id}/image?v={digest}')
+
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == 365 * 24 * 60 * 60
+
+    def test_thumbnail_etag_includes_width(self, client, sample_user):
+        from tests.test_thumbnails import make_image
+        game_id = add_game_with_upload(client, sample_user['email'], make_image()).get_json()['gameId']
+
+        response = client.get(f'/api/games/{game_id}/image?size=thumb')
+        etag = response.headers['ETag']
+        repeat = client.get(f'/api/games/{game_id}/image?size=thumb', headers={'If-None-Match': etag})
+
+        assert etag.endswith('-160"')
+        assert repeat.status_code == 304
+
+
+class TestMigrateImages:
+
+    def test_migrate_moves_blobs_out_of_database(self, app, sample_game, sample_user):
+        with app.app_context():
+            db.session.get(Igra, sample_game['id']).fotografija = IMAGE_BYTES
+            db.session.get(Korisnik, sample_user['id']).fotografija = b'avatar'
+            db.session.commit()
+
+        result = app.test_cli_runner().invoke(migrate_images_command)
+
+        assert result.exit_code == 0, result.output
+        with app.app_context():
+            game = db.session.get(Igra, sample_game['id'])
+            user = db.session.get(Korisnik, sample_user['id'])
+            assert game.fotografija is None
+            assert game.image_hash == hashlib.sha256(IMAGE_BYTES).hexdigest()
+            assert user.image_hash == hashlib.sha256(b'avatar').hexdigest()
+            assert user.has_image is True
+
+    def test_legacy_blob_still_served(self, app, client, sample_game):
+        with app.app_context():
+            db.session.get(Igra, sample_game['id']).fotografija = IMAGE_BYTES
+            db.session.commit()
+
+        response = client.get(f'/api/games/{sample_game["id"]}/image')
+
+        assert response.status_code == 200
+        assert response.data == IMAGE_BYTES
+
+
+class TestCleanupImages:
+
+    def test_removes_only_old_unreferenced_blobs(self, app, client, sample_user):
+        add_game_with_upload(client, sample_user['email'])
+        with app.app_context():
+            store = get_image_store()
+            orphan, _ = store.save(b'\x89PNG\r\n\x1a\norphan')
+            fresh, _ = store.save(b'\x89PNG\r\n\x1a\nfresh')
+            os.utime(store.path(orphan), (0, 0))
+            os.utime(store.path(hashlib.sha256(IMAGE_BYTES).hexdigest()), (0, 0))
+
+        result = app.test_cli_runner().invoke(cleanup_images_command, ['--min-age', '60'])
+
+        assert result.exit_code == 0, result.output
+        assert '1 orphaned images removed' in result.output
+        with app.app_context():
+            assert not store.exists(orphan)
+            assert store.exists(fresh)
+            assert store.exists(hashlib.sha256(IMAGE_BYTES).hexdigest())
@@ -99,6 +99,47 @@ class TestIgraModel:
             assert len(games) == 3
 
 
+    def test_player_range_synced_from_string(self, app, sample_genre):
+        with app.app_context():
+            game = Igra(
+                naziv='Range Game',
+                izdavac='Publisher',
+                godina_izdanja=2020,
+                ocjena_ocuvanosti=3,
+                broj_igraca='2-5',
+                vrijeme_igranja='30 min',
+                procjena_tezine=2,
+                id_zanr=sample_genre['id']
+            )
+            assert (game.min_igraca, game.max_igraca) == (2, 5)
+            
+            game.broj_igraca = '3+'
+            assert (game.min_igraca, game.max_igraca) == (3, 99)
+            
+            game.broj_igraca = 'puno'
+            assert (game.min_igraca, game.max_igraca) == (None, None)
+    
+    def test_upgrade_schema_backfills_player_range(self, app, sample_game):
+        with app.app_context():
+            from utils.schema import upgrade_schema
+            db.session.execute(db.text("UPDATE igra SET min_igraca = NULL, max_igraca = NULL"))
+            db.session.commit()
+            
+            upgrade_schema()
+            
+            game = db.session.get(Igra, sample_game['id'])
+            db.session.refresh(game)
+            assert (game.min_igraca, game.max_igraca) == (3, 4)
+    
+    def test_upgrade_db_command_can_rerun(self, app, sample_game):
+        from utils.schema import upgrade_db_command
+        runner = app.test_cli_runner()
+        
+        for _ in range(2):
+            result = runner.invoke(upgrade_db_command)
+            assert result.exit_code == 0, result.output
+
+
 class TestZanrModel:
     
     def test_create_genre(self, app):
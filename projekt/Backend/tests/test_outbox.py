@@ -0,0 +1,177 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from models.obavijest import Obavijest
+from models.actualUser import Korisnik
+from database import db
+from utils.email_service import send_email, send_trade_offer_notification, send_wishlist_available_notification
+from utils.outbox import coalesce_digests, process_outbox_batch
+
+
+@pytest.fixture(autouse=True)
+def email_configured():
+    with patch('utils.email_service.delivery_configured', return_value=True):
+        yield
+
+
+def delivery(error=None):
+    return patch('utils.email_service.deliver_batch', side_effect=lambda messages: [error] * len(messages))
+
+
+def queue(app, to_email='user@example.com'):
+    with app.app_context():
+        send_email(to_email, 'Predmet', '<p>Sadržaj</p>', 'Sadržaj')
+        db.session.commit()
+
+
+class TestOutbox:
+
+    def test_send_email_queues_inside_app_context(self, app):
+        with patch('utils.email_service.deliver_batch') as deliver:
+            queue(app)
+
+        deliver.assert_not_called()
+        with app.app_context():
+            assert Obavijest.query.one().status == 'pending'
+
+    def test_rollback_discards_queued_email(self, app):
+        with app.app_context():
+            send_email('user@example.com', 'Predmet', '<p>Sadržaj</p>')
+            db.session.rollback()
+            assert Obavijest.query.count() == 0
+
+    def test_outbox_disabled_sends_directly(self, app):
+        app.config['EMAIL_OUTBOX_ENABLED'] = False
+        with patch('utils.email_service.deliver_email', return_value=True) as deliver:
+            queue(app)
+
+        deliver.assert_called_once()
+        with app.app_context():
+            assert Obavijest.query.count() == 0
+
+    def test_process_batch_marks_sent(self, app):
+        queue(app, 'a@example.com')
+        queue(app, 'b@example.com')
+
+        with app.app_context(), delivery() as deliver:
+            assert process_outbox_batch() == 2
+            assert process_outbox_batch() == 0
+
+            deliver.assert_called_once()
+            assert len(deliver.call_args.args[0]) == 2
+            assert {o.status for o in Obavijest.query} == {'sent'}
+            assert all(o.vrijeme_slanja for o in Obavijest.query)
+
+    def test_failure_retries_with_backoff(self, app):
+        queue(app)
+
+        with app.app_context(), delivery(OSError('down')):
+            process_outbox_batch()
+
+            message = Obavijest.query.one()
+            assert message.status == 'pending'
+            assert message.broj_pokusaja == 1
+            assert message.zadnja_greska == 'down'
+            assert message.sljedeci_pokusaj > datetime.utcnow()
+            assert process_outbox_batch() == 0
+
+    def test_gives_up_after_max_attempts(self, app):
+        app.config['EMAIL_OUTBOX_MAX_ATTEMPTS'] = 2
+        queue(app)
+
+        with app.app_context(), delivery(OSError('down')):
+            for _ in range(2):
+                Obavijest.query.update({'sljedeci_pokusaj': datetime.utcnow() - timedelta(seconds=1)})
+                db.session.commit()
+                process_outbox_batch()
+
+            message = Obavijest.query.one()
+            assert message.status == 'dead'
+            assert message.broj_pokusaja == 2
+
+    def test_disabled_delivery_marks_messages_skipped(self, app):
+        queue(app)
+
+        with app.app_context(), delivery() as deliver, \
+                patch('utils.email_service.delivery_configured', return_value=False):
+            assert process_outbox_batch() == 1
+            assert process_outbox_batch() == 0
+
+            deliver.assert_not_called()
+            message = Obavijest.query.one()
+            assert message.status == 'skipped'
+            assert message.broj_pokusaja == 0
+
+    def test_expired_lease_is_reclaimed(self, app):
+        queue(app)
+        with app.app_context():
+            Obavijest.query.update({'status': 'sending', 'sljedeci_pokusaj': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+
+            with delivery() as deliver:
+                assert process_outbox_batch() == 1
+            deliver.assert_called_once()
+
+
+class TestDigests:
+
+    @pytest.fixture
+    def digest_user(self, app, sample_user):
+        app.config['EMAIL_DIGEST_WINDOW_SECONDS'] = 60
+        with app.app_context():
+            Korisnik.query.filter_by(email=sample_user['email']).update({'nacin_obavijesti': 'digest'})
+            db.session.commit()
+        return sample_user
+
+    def age_held(self, seconds):
+        Obavijest.query.filter_by(status='digest').update(
+            {'vrijeme_kreiranja': datetime.utcnow() - timedelta(seconds=seconds)}
+        )
+        db.session.commit()
+
+    def test_digest_user_notifications_are_held(self, app, digest_user):
+        queue(app, digest_user['email'])
+        queue(app, 'someone@example.com')
+
+        with app.app_context(), delivery() as deliver:
+            process_outbox_batch()
+
+            assert [m[0] for m in deliver.call_args.args[0]] == ['someone@example.com']
+            assert Obavijest.query.filter_by(primatelj=digest_user['email']).one().status == 'digest'
+
+    def test_coalesces_into_one_digest(self, app, digest_user):
+        with app.app_context():
+            send_wishlist_available_notification(digest_user['email'], 'Catan', 'Ana')
+            send_wishlist_available_notification(digest_user['email'], 'Azul', 'Ivo')
+            send_trade_offer_notification(digest_user['email'], 'Marko', 'Carcassonne', ['Dixit'])
+            db.session.commit()
+            self.age_held(61)
+
+            with delivery() as deliver:
+                assert coalesce_digests() == 1
+                process_outbox_batch()
+
+            (to_email, subject, html, text), = deliver.call_args.args[0]
+            assert to_email == digest_user['email']
+            assert '3 novih obavijesti' in subject
+            assert 'Catan' in html and 'Azul' in html and 'Carcassonne' in html
+            assert 'Vlasnik: Ana' in html and 'U zamjenu nudi: Dixit' in text
+            assert Obavijest.query.filter_by(status='coalesced').count() == 3
+
+    def test_single_held_notification_sent_as_is(self, app, digest_user):
+        queue(app, digest_user['email'])
+
+        with app.app_context():
+            self.age_held(61)
+            with delivery() as deliver:
+                process_outbox_batch()
+
+            assert deliver.call_args.args[0][0][1] == 'Predmet'
+            assert Obavijest.query.one().status == 'sent'
+
+    def test_window_not_elapsed(self, app, digest_user):
+        queue(app, digest_user['email'])
+
+        with app.app_context():
+            assert coalesce_digests() == 0
+            assert Obavijest.query.one().status == 'digest'
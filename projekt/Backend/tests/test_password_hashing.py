@@ -0,0 +1,119 @@
+import threading
+import pytest
+from models.actualUser import Korisnik
+from database import db
+from utils.password_hashing import (
+    PasswordHasher,
+    PasswordHasherBusy,
+    get_password_hasher,
+    hash_rounds,
+    unusable_password
+)
+
+
+class TestPasswordHasher:
+
+    def test_hash_and_verify(self):
+        hasher = PasswordHasher(rounds=4, workers=1, queue_size=0)
+        password_hash = hasher.hash("lozinka123")
+
+        assert hash_rounds(password_hash) == 4
+        assert hasher.verify("lozinka123", password_hash)
+        assert not hasher.verify("kriva", password_hash)
+        assert not hasher.verify("lozinka123", unusable_password())
+        assert not hasher.verify("x" * 100, password_hash)
+
+    def test_needs_rehash_when_cost_changes(self):
+        old = PasswordHasher(rounds=4).hash("lozinka123")
+
+        assert not PasswordHasher(rounds=4).needs_rehash(old)
+        assert PasswordHasher(rounds=5).needs_rehash(old)
+
+    def test_rejects_beyond_queue_limit(self):
+        hasher = PasswordHasher(rounds=4, workers=1, queue_size=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocked(*args):
+            started.set()
+            release.wait(5)
+            return True
+
+        first = threading.Thread(target=hasher._run, args=('verify', blocked))
+        second = threading.Thread(target=hasher._run, args=('verify', blocked))
+        first.start()
+        started.wait(5)
+        second.start()
+        while hasher.stats()['inFlight'] < 2:
+            pass
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher.verify("lozinka123", PasswordHasher(rounds=4).hash("lozinka123"))
+
+        release.set()
+        first.join()
+        second.join()
+        stats = hasher.stats()
+        assert stats['rejected'] == 1
+        assert stats['inFlight'] == 0
+        assert stats['verify']['count'] == 2
+
+    def test_timeout_reports_busy(self):
+        hasher = PasswordHasher(rounds=4, workers=1, queue_size=0, timeout=0.01)
+        release = threading.Event()
+
+        with pytest.raises(PasswordHasherBusy):
+            hasher._run('hash', release.wait, 5)
+        release.set()
+
+
+class TestLoginHashing:
+
+    def test_login_upgrades_hash_cost(self, app, client, sample_user):
+        app.config['BCRYPT_LOG_ROUNDS'] = 5
+        app.extensions.pop('password_hasher', None)
+
+        response = client.post('/api/login', json={
+            'email': sample_user['email'],
+            'password': sample_user['password']
+        })
+
+        assert response.status_code == 200
+        upgraded = db.session.get(Korisnik, sample_user['id']).passwordHash
+        assert hash_rounds(upgraded) == 5
+        assert get_password_hasher().stats()['hash']['count'] == 1
+
+        again = client.post('/api/login', json={
+            'email': sample_user['email'],
+            'password': sample_user['password']
+        })
+        assert again.status_code == 200
+        assert db.session.get(Korisnik, sample_user['id']).passwordHash == upgraded
+
+    def test_busy_hasher_returns_503(self, app, client, sample_user, monkeypatch):
+        def busy(*args):
+            raise PasswordHasherBusy()
+
+        monkeypatch.setattr(get_password_hasher(), 'verify', busy)
+        response = client.post('/api/login', json={
+            'email': sample_user['email'],
+            'password': sample_user['password']
+        })
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+    def test_signup_hashes_with_configured_cost(self, app, client):
+        response = client.post('/api/signup', json={'email': 'novi@example.com', 'password': 'lozinka123'})
+
+        assert response.status_code == 200
+        user = Korisnik.query.filter_by(email='novi@example.com').one()
+        assert hash_rounds(user.passwordHash) == 4
+
+    def test_metrics_are_admin_only(self, client, sample_user, admin_user):
+        client.post('/api/login', json={'email': sample_user['email'], 'password': sample_user['password']})
+
+        assert client.get(f'/api/admin/metrics?adminEmail={sample_user["email"]}').status_code == 403
+        metrics = client.get(f'/api/admin/metrics?adminEmail={admin_user["email"]}').get_json()
+        assert metrics['passwordHashing']['verify']['count'] == 1
+        assert metrics['passwordHashing']['rounds'] == 4
@@ -44,6 +44,24 @@ class TestUpdateProfileData:
         data = response.get_json()
         assert 'message' in data
     
+    def test_update_notification_mode(self, client, sample_user):
+        response = client.post('/api/updateProfile', json={
+            'email': sample_user['email'],
+            'notificationMode': 'digest'
+        })
+        
+        assert response.status_code == 200
+        data = client.post('/api/getProfileData', json={'email': sample_user['email']}).get_json()
+        assert data['notificationMode'] == 'digest'
+    
+    def test_update_notification_mode_invalid(self, client, sample_user):
+        response = client.post('/api/updateProfile', json={
+            'email': sample_user['email'],
+            'notificationMode': 'hourly'
+        })
+        
+        assert response.status_code == 400
+    
     def test_update_profile_missing_email(self, client):
         response = client.post('/api/updateProfile', json={
             'name': 'NewName'
@@ -80,3 +98,22 @@ class TestProfilePicture:
         })
         
         assert response.status_code == 404
+    
+    def test_set_and_get_profile_picture(self, app, client, sample_user):
+        from io import BytesIO
+        response = client.post('/api/setProfilePictureBlob', data={
+            'email': sample_user['email'],
+            'imageBlob': (BytesIO(b'\xff\xd8\xffprofile'), 'me.jpg')
+        }, content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        with app.app_context():
+            user = db.session.get(Korisnik, sample_user['id'])
+            assert user.has_image is True
+            assert user.image_size == 10
+        
+        response = client.post('/api/getProfilePictureBlob', json={
+            'email': sample_user['email']
+        })
+        assert response.status_code == 200
+        assert response.data == b'\xff\xd8\xffprofile'
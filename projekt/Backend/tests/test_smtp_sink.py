@@ -0,0 +1,75 @@
+import smtplib
+import socket
+import pytest
+from utils.email_service import SMTPConnectionPool
+from utils.smtp_sink import SMTPSink
+
+
+@pytest.fixture
+def sink():
+    with SMTPSink(seed=1) as sink:
+        yield sink
+
+
+def make_pool(sink, **kwargs):
+    return SMTPConnectionPool(sink.host, sink.port, 'user', 'secret', use_tls=False, **kwargs)
+
+
+class TestSMTPSink:
+
+    def test_records_messages_over_one_connection(self, sink):
+        pool = make_pool(sink)
+
+        errors = pool.send_many('from@example.com', [
+            ('a@example.com', 'Subject: A\r\n\r\n.leading dot'),
+            ('b@example.com', 'Subject: B\r\n\r\nbody'),
+        ])
+        pool.close()
+
+        assert errors == [None, None]
+        assert [m[1] for m in sink.messages] == [['a@example.com'], ['b@example.com']]
+        assert b'\r\n.leading dot' in sink.messages[0][2]
+        assert sink.connections == 1
+
+    def test_injected_failure_reported_per_message(self, sink):
+        sink.failure_rate = 1.0
+        pool = make_pool(sink)
+
+        errors = pool.send_many('from@example.com', [('a@example.com', 'body'), ('b@example.com', 'body')])
+        pool.close()
+
+        assert all(isinstance(error, smtplib.SMTPDataError) for error in errors)
+        assert sink.messages == []
+        assert sink.connections == 1
+
+    def test_dropped_connection_is_retried(self, sink):
+        pool = make_pool(sink)
+        sink.outcome = lambda: 'drop' if sink.connections == 1 else 'ok'
+
+        errors = pool.send_many('from@example.com', [('a@example.com', 'body')])
+        pool.close()
+
+        assert errors == [None]
+        assert sink.connections == 2
+        assert pool.stats()['reconnects'] == 1
+
+    def test_unreachable_server_fails_rest_of_batch(self):
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            port = closed.getsockname()[1]
+        connects = []
+
+        class CountingSMTP(smtplib.SMTP):
+            def connect(self, *args, **kwargs):
+                connects.append(args)
+                return super().connect(*args, **kwargs)
+
+        pool = SMTPConnectionPool('127.0.0.1', port, 'user', 'secret', use_tls=False,
+                                  timeout=1, smtp_class=CountingSMTP)
+
+        errors = pool.send_many('from@example.com', [(f'{i}@example.com', 'body') for i in range(3)])
+
+        assert all(isinstance(error, ConnectionRefusedError) for error in errors)
+        assert len(errors) == 3
+        assert len(connects) == 1
+        assert pool.stats()['messagesFailed'] == 3
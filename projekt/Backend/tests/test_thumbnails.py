@@ -0,0 +1,118 @@
+import os
+import pytest
+from io import BytesIO
+from PIL import Image
+from models.igra import Igra
+from database import db
+from utils.thumbnails import ThumbnailCache, resolve_width
+
+
+def make_image(format='JPEG', size=(1000, 600), mode='RGB'):
+    output = BytesIO()
+    Image.new(mode, size, color=(200, 30, 30, 255)[:len(mode)]).save(output, format=format)
+    return output.getvalue()
+
+
+@pytest.fixture
+def game_with_image(app, sample_game):
+    def attach(data):
+        with app.app_context():
+            game = db.session.get(Igra, sample_game['id'])
+            game.fotografija = data
+            db.session.commit()
+        return sample_game['id']
+    return attach
+
+
+class TestResolveWidth:
+
+    def test_named_sizes(self):
+        assert resolve_width('thumb') == 160
+        assert resolve_width('card') == 480
+        assert resolve_width('full') is None
+        assert resolve_width('unknown') is None
+
+    def test_width_snaps_to_allowed_step(self):
+        assert resolve_width(width=100) == 160
+        assert resolve_width(width=300) == 320
+        assert resolve_width(width=5000) is None
+
+
+class TestGameImageRenditions:
+
+    def test_full_image_has_real_content_type(self, client, game_with_image):
+        game_id = game_with_image(make_image('PNG'))
+
+        response = client.get(f'/api/games/{game_id}/image')
+
+        assert response.mimetype == 'image/png'
+
+    def test_thumbnail_is_resized(self, client, game_with_image):
+        game_id = game_with_image(make_image())
+
+        response = client.get(f'/api/games/{game_id}/image?size=thumb')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'image/jpeg'
+        assert Image.open(BytesIO(response.data)).size == (160, 96)
+
+    def test_transparent_image_stays_png(self, client, game_with_image):
+        game_id = game_with_image(make_image('PNG', mode='RGBA'))
+
+        response = client.get(f'/api/games/{game_id}/image?w=300')
+
+        assert response.mimetype == 'image/png'
+        assert Image.open(BytesIO(response.data)).width == 320
+
+    def test_non_image_falls_back_to_original(self, client, game_with_image):
+        game_id = game_with_image(b'not an image')
+
+        response = client.get(f'/api/games/{game_id}/image?size=thumb')
+
+        assert response.status_code == 200
+        assert response.data == b'not an image'
+
+    def test_oversized_image_falls_back_to_original(self, app, client, game_with_image):
+        image = make_image('PNG', size=(20, 20))
+        game_id = game_with_image(image)
+        app.config['MAX_IMAGE_PIXELS'] = 100
+        app.extensions.pop('thumbnail_cache', None)
+
+        response = client.get(f'/api/games/{game_id}/image?size=thumb')
+
+        assert response.status_code == 200
+        assert response.data == image
+
+
+class TestThumbnailCache:
+
+    def test_cache_hit_reuses_file(self, tmp_path):
+        cache = ThumbnailCache(str(tmp_path), max_bytes=10 ** 6)
+        source = BytesIO(make_image())
+
+        first = cache.get('abc', 160, source)
+        second = cache.get('abc', 160, BytesIO(b'ignored'))
+
+        assert first == second
+        assert os.path.exists(first)
+
+    def test_jpeg_decoded_at_reduced_scale(self, tmp_path):
+        cache = ThumbnailCache(str(tmp_path), max_bytes=10 ** 6, max_pixels=4000 * 2400)
+
+        path = cache.get('big', 160, BytesIO(make_image(size=(4000, 2400))))
+
+        assert Image.open(path).size == (160, 96)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        image = make_image()
+        probe = ThumbnailCache(str(tmp_path / 'probe'), max_bytes=10 ** 6)
+        size = os.path.getsize(probe.get('probe', 160, BytesIO(image)))
+        cache = ThumbnailCache(str(tmp_path / 'cache'), max_bytes=size * 2)
+
+        oldest = cache.get('a', 160, BytesIO(image))
+        os.utime(oldest, (0, 0))
+        cache.get('b', 160, BytesIO(image))
+        cache.get('c', 160, BytesIO(image))
+
+        assert not os.path.exists(oldest)
+        assert cache.total_bytes <= size * 2
@@ -0,0 +1,126 @@
+import pytest
+from models.actualUser import Korisnik
+from models.ponuda import Ponuda
+from models.listazelja import ListaZelja
+from database import db
+from utils.trade_matching import TradeGraph, get_trade_matcher
+
+
+def ring(graph, size, offset=0):
+    for i in range(size):
+        user = offset + i
+        graph.add_listing(user, 100 + user, f"game {user}")
+        graph.add_wish(user, f"game {offset + (i + 1) % size}")
+
+
+class TestTradeGraph:
+    
+    @pytest.mark.parametrize('size', [2, 3, 4])
+    def test_finds_cycle_of_each_length(self, size):
+        graph = TradeGraph()
+        ring(graph, size)
+        
+        assert graph.cycles_for(0) == [list(range(size))]
+        assert graph.find_cycles() == [list(range(size))]
+    
+    def test_ignores_cycles_longer_than_four(self):
+        graph = TradeGraph()
+        ring(graph, 5)
+        
+        assert graph.cycles_for(0) == []
+    
+    def test_incremental_updates(self):
+        graph = TradeGraph()
+        ring(graph, 3)
+        
+        graph.remove_listing(1, 101, "game 1")
+        assert graph.cycles_for(0) == []
+        
+        graph.add_listing(1, 201, "game 1")
+        assert graph.cycles_for(0) == [[0, 1, 2]]
+        assert graph.games_between(0, 1) == [201]
+        
+        graph.set_user(2, [(102, "game 2")], [])
+        assert graph.cycles_for(0) == []
+    
+    def test_own_listing_is_not_an_edge(self):
+        graph = TradeGraph()
+        graph.add_listing(1, 10, "catan")
+        graph.add_wish(1, "catan")
+        
+        assert graph.find_cycles() == []
+    
+    def test_global_search_reports_each_cycle_once(self):
+        graph = TradeGraph()
+        ring(graph, 3)
+        ring(graph, 2, offset=10)
+        
+        assert sorted(graph.find_cycles()) == [[0, 1, 2], [10, 11]]
+        assert len(graph.find_cycles(limit=1)) == 1
+
+
+class TestTradeSuggestions:
+    
+    @pytest.fixture
+    def three_way(self, app, add_listing):
+        with app.app_context():
+            users = [Korisnik(email=f"user{i}@example.com", passwordHash="x", username=f"User{i}", jeAdmin=0)
+                     for i in range(3)]
+            db.session.add_all(users)
+            db.session.commit()
+            users = [user.id for user in users]
+        games = [add_listing(user_id, title) for user_id, title in zip(users, ["Catan", "Azul", "Dixit"])]
+        with app.app_context():
+            for i, user_id in enumerate(users):
+                db.session.add(ListaZelja(id_korisnik=user_id, id_igra=games[(i + 1) % 3]))
+            db.session.commit()
+            return users, games
+    
+    def test_suggests_three_way_trade(self, client, three_way):
+        users, games = three_way
+        
+        data = client.get('/api/trades/suggestions?email=user0@example.com').get_json()
+        
+        assert len(data) == 1
+        assert [p['name'] for p in data[0]['participants']] == ['User0', 'User1', 'User2']
+        assert data[0]['steps'][0] == {
+            'fromUserId': users[1], 'toUserId': users[0], 'game': {'id': games[1], 'title': 'Azul'}
+        }
+    
+    def test_wishlist_change_updates_suggestions(self, client, three_way):
+        users, games = three_way
+        assert len(client.get('/api/trades/suggestions?email=user0@example.com').get_json()) == 1
+        
+        client.delete(f'/api/wishlist/{games[0]}?email=user2@example.com')
+        assert client.get('/api/trades/suggestions?email=user0@example.com').get_json() == []
+        
+        client.post('/api/wishlist', json={'email': 'user2@example.com', 'gameId': games[0]})
+        assert len(client.get('/api/trades/suggestions?email=user0@example.com').get_json()) == 1
+    
+    def test_listing_removed_by_another_worker_is_not_suggested(self, app, client, three_way):
+        users, games = three_way
+        assert len(client.get('/api/trades/suggestions?email=user0@example.com').get_json()) == 1
+        
+        with app.app_context():
+            db.session.execute(db.update(Ponuda).where(Ponuda.id_korisnik == users[1]).values(jeAktivna=0))
+            db.session.commit()
+        
+        assert client.get('/api/trades/suggestions?email=user0@example.com').get_json() == []
+    
+    def test_graph_reloads_after_max_age(self, app, client, three_way):
+        users, games = three_way
+        with app.app_context():
+            db.session.execute(db.delete(ListaZelja).where(ListaZelja.id_korisnik == users[2]))
+            db.session.commit()
+        assert client.get('/api/trades/suggestions?email=user0@example.com').get_json() == []
+        
+        with app.app_context():
+            db.session.add(ListaZelja(id_korisnik=users[2], id_igra=games[0]))
+            db.session.commit()
+            get_trade_matcher().max_age = 0
+        
+        assert len(client.get('/api/trades/suggestions?email=user0@example.com').get_json()) == 1
+    
+    def test_suggestions_require_user(self, client):
+        assert client.get('/api/trades/suggestions').status_code == 400
+        assert client.get('/api/trades/suggestions?email=nobody@example.com').status_code == 404
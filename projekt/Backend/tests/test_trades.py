@@ -4,6 +4,7 @@ from models.igra import Igra
 from models.ponuda import Ponuda
 from models.actualUser import Korisnik
 from models.zanr import Zanr
+from models.obavijest import Obavijest
 from database import db
 from flask_bcrypt import Bcrypt
 
@@ -67,6 +68,48 @@ class TestCreateTrade:
         data = response.get_json()
         assert 'tradeId' in data
     
+    def test_create_trade_queues_notification(self, app, client, sample_user, sample_game, second_user_with_game):
+        response = client.post('/api/trades', json={
+            'email': second_user_with_game['email'],
+            'trazenaIgraId': sample_game['id'],
+            'ponudjeneIgreIds': [second_user_with_game['game_id']]
+        })
+        
+        assert response.status_code == 201
+        with app.app_context():
+            queued = Obavijest.query.all()
+            assert [o.primatelj for o in queued] == [sample_user['email']]
+            assert queued[0].status == 'pending'
+    
+    def test_create_trade_query_count_independent_of_offer_size(self, app, client, sample_game, add_listing,
+                                                                     second_user_with_game, count_queries):
+        extra = [add_listing(second_user_with_game['user_id'], f"Extra {i}") for i in range(5)]
+        
+        def queries_for(offered):
+            count_queries.clear()
+            response = client.post('/api/trades', json={
+                'email': second_user_with_game['email'],
+                'trazenaIgraId': sample_game['id'],
+                'ponudjeneIgreIds': offered
+            })
+            assert response.status_code == 201
+            return len(count_queries)
+        
+        assert queries_for([second_user_with_game['game_id']]) == queries_for(extra)
+        with app.app_context():
+            trade = Zamjena.query.order_by(Zamjena.id.desc()).first()
+            assert sorted(zi.id_igra for zi in trade.ponudjene_igre) == sorted(extra)
+    
+    def test_create_trade_reports_all_invalid_games(self, client, sample_user, sample_game, second_user_with_game):
+        response = client.post('/api/trades', json={
+            'email': second_user_with_game['email'],
+            'trazenaIgraId': sample_game['id'],
+            'ponudjeneIgreIds': [second_user_with_game['game_id'], sample_game['id'], 99999]
+        })
+        
+        assert response.status_code == 400
+        assert response.get_json()['invalidIds'] == [sample_game['id'], 99999]
+    
     def test_create_trade_missing_params(self, client):
         response = client.post('/api/trades', json={})
         
@@ -118,6 +161,73 @@ class TestGetTrades:
         assert response.status_code == 404
 
 
+def add_trades(app, offerer_id, receiver_id, requested_id, offered_id, count, status='pending'):
+    with app.app_context():
+        for _ in range(count):
+            trade = Zamjena(
+                id_ponuditelj=offerer_id,
+                id_primatelj=receiver_id,
+                id_trazena_igra=requested_id,
+                status=status
+            )
+            trade.ponudjene_igre.append(ZamjenaIgra(id_igra=offered_id))
+            db.session.add(trade)
+        db.session.commit()
+
+
+class TestTradeListing:
+    
+    @pytest.fixture
+    def trades(self, app, sample_user, sample_game, second_user_with_game):
+        add_trades(app, second_user_with_game['user_id'], sample_user['id'],
+                   sample_game['id'], second_user_with_game['game_id'], 3)
+        add_trades(app, sample_user['id'], second_user_with_game['user_id'],
+                   second_user_with_game['game_id'], sample_game['id'], 2, status='rejected')
+        return sample_user
+    
+    def test_keyset_pages_cover_all_trades(self, client, trades):
+        seen = []
+        cursor = ''
+        while True:
+            data = client.get(f'/api/trades?email={trades["email"]}&limit=2{cursor}').get_json()
+            assert len(data['trades']) <= 2
+            seen.extend(t['id'] for t in data['trades'])
+            if data['nextCursor'] is None:
+                break
+            cursor = f"&cursor={data['nextCursor']}"
+        
+        full = client.get(f'/api/trades?email={trades["email"]}').get_json()
+        assert seen == [t['id'] for t in full]
+        assert len(seen) == 5
+    
+    def test_filter_by_direction_and_status(self, client, trades):
+        url = f'/api/trades?email={trades["email"]}'
+        
+        incoming = client.get(f'{url}&direction=incoming').get_json()
+        outgoing = client.get(f'{url}&direction=outgoing&status=rejected').get_json()
+        
+        assert len(incoming) == 3 and all(t['isIncoming'] for t in incoming)
+        assert len(outgoing) == 2 and all(t['status'] == 'rejected' for t in outgoing)
+        assert client.get(f'{url}&direction=incoming&status=rejected').get_json() == []
+        assert client.get(f'{url}&direction=sideways').status_code == 400
+    
+    def test_query_count_independent_of_trade_count(self, app, client, trades, sample_game,
+                                                    second_user_with_game, count_queries):
+        url = f'/api/trades?email={trades["email"]}'
+        count_queries.clear()
+        client.get(url)
+        small = len(count_queries)
+        
+        add_trades(app, second_user_with_game['user_id'], trades['id'],
+                   sample_game['id'], second_user_with_game['game_id'], 20)
+        count_queries.clear()
+        data = client.get(url).get_json()
+        
+        assert len(data) == 25
+        assert len(count_queries) == small
+        assert data[0]['ponudjeneIgre'][0]['title'] == 'Ticket to Ride'
+
+
 class TestRespondToTrade:
     
     def test_respond_accept_success(self, app, client, sample_user, sample_game, second_user_with_game):
@@ -174,6 +284,133 @@ class TestRespondToTrade:
         assert response.status_code == 404
 
 
+class TestTradeAcceptanceConflicts:
+    
+    @pytest.fixture
+    def competing_trades(self, app, client, sample_user, sample_game, add_listing, second_user_with_game):
+        with app.app_context():
+            third = Korisnik(email="third@example.com", passwordHash="x", username="Third", jeAdmin=0)
+            db.session.add(third)
+            db.session.commit()
+            third_id = third.id
+        third_game_id = add_listing(third_id, "Azul")
+        
+        trade_ids = [
+            client.post('/api/trades', json={
+                'email': email,
+                'trazenaIgraId': sample_game['id'],
+                'ponudjeneIgreIds': [game_id]
+            }).get_json()['tradeId']
+            for email, game_id in ((second_user_with_game['email'], second_user_with_game['game_id']),
+                                   ('third@example.com', third_game_id))
+        ]
+        return trade_ids
+    
+    def test_accept_cancels_conflicting_pending_trades(self, app, client, sample_user, competing_trades):
+        winner, loser = competing_trades
+        
+        response = client.post(f'/api/trades/{winner}/respond', json={
+            'email': sample_user['email'], 'action': 'accept'
+        })
+        
+        assert response.status_code == 200
+        with app.app_context():
+            assert db.session.get(Zamjena, winner).status == 'completed'
+            assert db.session.get(Zamjena, loser).status == 'cancelled'
+            assert Ponuda.query.filter_by(jeAktivna=1).count() == 1
+        assert client.get(f'/api/trades/pending-count?email={sample_user["email"]}').get_json()['count'] == 0
+        
+        late = client.post(f'/api/trades/{loser}/respond', json={
+            'email': sample_user['email'], 'action': 'accept'
+        })
+        assert late.status_code == 400
+    
+    def test_accept_only_wins_while_pending(self, app, competing_trades):
+        from routes.zamjene import claim_pending_trade
+        
+        with app.app_context():
+            trade = db.session.get(Zamjena, competing_trades[0])
+            db.session.execute(
+                db.update(Zamjena).where(Zamjena.id == trade.id).values(status='cancelled')
+                .execution_options(synchronize_session=False)
+            )
+            
+            assert trade.status == 'pending'
+            assert claim_pending_trade(trade, 'completed') is False
+    
+    def test_accept_fails_when_listing_gone(self, app, client, sample_user, second_user_with_game, competing_trades):
+        with app.app_context():
+            Ponuda.query.filter_by(id_igra=second_user_with_game['game_id']).update({'jeAktivna': 0})
+            db.session.commit()
+        
+        response = client.post(f'/api/trades/{competing_trades[0]}/respond', json={
+            'email': sample_user['email'], 'action': 'accept'
+        })
+        
+        assert response.status_code == 409
+        with app.app_context():
+            assert db.session.get(Zamjena, competing_trades[0]).status == 'pending'
+            assert db.session.get(Zamjena, competing_trades[1]).status == 'pending'
+
+
+class TestTradeThread:
+    
+    @staticmethod
+    def negotiate(client, sample_user, sample_game, second_user_with_game, rounds):
+        trade_id = client.post('/api/trades', json={
+            'email': second_user_with_game['email'],
+            'trazenaIgraId': sample_game['id'],
+            'ponudjeneIgreIds': [second_user_with_game['game_id']]
+        }).get_json()['tradeId']
+        trade_ids = [trade_id]
+        responders = [
+            (sample_user['email'], sample_game['id']),
+            (second_user_with_game['email'], second_user_with_game['game_id'])
+        ]
+        for i in range(rounds):
+            email, game_id = responders[i % 2]
+            response = client.post(f'/api/trades/{trade_ids[-1]}/respond', json={
+                'email': email, 'action': 'counter', 'counterGames': [game_id]
+            })
+            assert response.status_code == 200
+            incoming = client.get(f'/api/trades?email={responders[(i + 1) % 2][0]}&direction=incoming').get_json()
+            trade_ids.append(max(t['id'] for t in incoming))
+        return trade_ids
+    
+    def test_thread_returns_whole_chain_from_any_trade(self, client, sample_user, sample_game, second_user_with_game):
+        trade_ids = self.negotiate(client, sample_user, sample_game, second_user_with_game, 3)
+        
+        for trade_id in (trade_ids[0], trade_ids[2], trade_ids[-1]):
+            response = client.get(f'/api/trades/{trade_id}/thread?email={sample_user["email"]}')
+            assert response.status_code == 200
+            thread = response.get_json()
+            assert [t['id'] for t in thread] == trade_ids
+        
+        assert [t['parentId'] for t in thread] == [None] + trade_ids[:-1]
+        assert [t['status'] for t in thread] == ['counter', 'counter', 'counter', 'pending']
+        assert thread[1]['ponudjeneIgre'][0]['title'] == 'Catan'
+    
+    def test_thread_is_single_query(self, client, sample_user, sample_game, second_user_with_game, count_queries):
+        trade_ids = self.negotiate(client, sample_user, sample_game, second_user_with_game, 1)
+        count_queries.clear()
+        client.get(f'/api/trades/{trade_ids[-1]}/thread?email={sample_user["email"]}')
+        short = len(count_queries)
+        
+        trade_ids = self.negotiate(client, sample_user, sample_game, second_user_with_game, 4)
+        count_queries.clear()
+        thread = client.get(f'/api/trades/{trade_ids[-1]}/thread?email={sample_user["email"]}').get_json()
+        
+        assert len(thread) == 5
+        assert len(count_queries) == short == 2
+    
+    def test_thread_access(self, client, sample_user, admin_user, sample_game, second_user_with_game):
+        trade_ids = self.negotiate(client, sample_user, sample_game, second_user_with_game, 1)
+        
+        assert client.get(f'/api/trades/{trade_ids[0]}/thread?email={admin_user["email"]}').status_code == 403
+        assert client.get(f'/api/trades/99999/thread?email={sample_user["email"]}').status_code == 404
+        assert client.get(f'/api/trades/{trade_ids[0]}/thread').status_code == 400
+
+
 class TestGetPendingCount:
     
     def test_get_pending_count(self, client, sample_user):
@@ -190,6 +427,63 @@ class TestGetPendingCount:
         assert response.status_code == 400
 
 
+    def test_pending_count_follows_trade_lifecycle(self, client, sample_user, sample_game, second_user_with_game):
+        def count(email):
+            return client.get(f'/api/trades/pending-count?email={email}').get_json()['count']
+        
+        trade_ids = []
+        for _ in range(2):
+            trade_ids.append(client.post('/api/trades', json={
+                'email': second_user_with_game['email'],
+                'trazenaIgraId': sample_game['id'],
+                'ponudjeneIgreIds': [second_user_with_game['game_id']]
+            }).get_json()['tradeId'])
+        assert count(sample_user['email']) == 2
+        
+        client.post(f'/api/trades/{trade_ids[0]}/mark-seen', json={'email': sample_user['email']})
+        client.post(f'/api/trades/{trade_ids[0]}/mark-seen', json={'email': sample_user['email']})
+        assert count(sample_user['email']) == 1
+        
+        client.post(f'/api/trades/{trade_ids[1]}/respond', json={
+            'email': sample_user['email'],
+            'action': 'counter',
+            'counterGames': [sample_game['id']]
+        })
+        assert count(sample_user['email']) == 0
+        assert count(second_user_with_game['email']) == 1
+    
+    def test_only_one_mark_seen_decrements(self, app, sample_user, sample_game, second_user_with_game):
+        from routes.zamjene import mark_seen_by_recipient
+        add_trades(app, second_user_with_game['user_id'], sample_user['id'],
+                   sample_game['id'], second_user_with_game['game_id'], 1)
+        
+        with app.app_context():
+            trade_id = db.session.query(Zamjena.id).scalar()
+            assert mark_seen_by_recipient(trade_id)
+            assert not mark_seen_by_recipient(trade_id)
+            db.session.commit()
+    
+    def test_pending_count_is_single_query(self, client, sample_user, count_queries):
+        count_queries.clear()
+        client.get(f'/api/trades/pending-count?email={sample_user["email"]}')
+        
+        assert len(count_queries) == 1
+    
+    def test_reconcile_repairs_drift(self, app, sample_user, sample_game, second_user_with_game):
+        from utils.trade_counters import reconcile_unread_trades
+        add_trades(app, second_user_with_game['user_id'], sample_user['id'],
+                   sample_game['id'], second_user_with_game['game_id'], 3)
+        
+        with app.app_context():
+            Korisnik.query.update({'broj_novih_zamjena': 7})
+            db.session.commit()
+            
+            assert reconcile_unread_trades() == 2
+            db.session.commit()
+            assert db.session.get(Korisnik, sample_user['id']).broj_novih_zamjena == 3
+            assert db.session.get(Korisnik, second_user_with_game['user_id']).broj_novih_zamjena == 0
+
+
 class TestTradedGamesFiltering:
     
     def test_traded_games_not_shown_in_games_list(self, app, client, sample_user, sample_game, second_user_with_game):
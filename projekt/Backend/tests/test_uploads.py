@@ -0,0 +1,152 @@
+import hashlib
+import pytest
+from io import BytesIO
+from models.igra import Igra
+from database import db
+
+
+IMAGE_BYTES = b'\x89PNG\r\n\x1a\n' + b'chunk-data' * 50
+
+GAME_FIELDS = {
+    'naziv': 'Azul',
+    'izdavac': 'Plan B',
+    'godina_izdanja': '2017',
+    'ocjena_ocuvanosti': '5',
+    'broj_igraca': '2-4',
+    'vrijeme_igranja': '45 min',
+    'zanr': 'Apstraktna',
+}
+
+
+def start_upload(client, email, **body):
+    return client.post('/api/uploads', json={'email': email, **body})
+
+
+def patch_chunk(client, upload_id, offset, data, email='test@example.com'):
+    return client.patch(
+        f'/api/uploads/{upload_id}?email={email}',
+        data=data,
+        headers={'Upload-Offset': str(offset)},
+        content_type='application/offset+octet-stream'
+    )
+
+
+class TestResumableUpload:
+
+    def test_chunked_upload_then_add_game(self, app, client, sample_user):
+        upload_id = start_upload(client, sample_user['email'], size=len(IMAGE_BYTES)).get_json()['uploadId']
+
+        first = patch_chunk(client, upload_id, 0, IMAGE_BYTES[:100])
+        assert first.get_json()['offset'] == 100
+        assert client.get(f'/api/uploads/{upload_id}?email={sample_user["email"]}').get_json()['offset'] == 100
+
+        stale = patch_chunk(client, upload_id, 0, IMAGE_BYTES[:100])
+        assert stale.status_code == 409
+        assert stale.get_json()['offset'] == 100
+
+        second = patch_chunk(client, upload_id, 100, IMAGE_BYTES[100:])
+        assert second.get_json()['offset'] == len(IMAGE_BYTES)
+
+        response = client.post('/api/games', json={
+            **GAME_FIELDS, 'email': sample_user['email'], 'uploadId': upload_id
+        })
+
+        assert response.status_code == 201
+        with app.app_context():
+            game = db.session.get(Igra, response.get_json()['gameId'])
+            assert game.image_hash == hashlib.sha256(IMAGE_BYTES).hexdigest()
+        assert client.get(f'/api/uploads/{upload_id}?email={sample_user["email"]}').status_code == 404
+
+    def test_header_checked_across_short_chunks(self, client, sample_user):
+        upload_id = start_upload(client, sample_user['email']).get_json()['uploadId']
+
+        assert patch_chunk(client, upload_id, 0, IMAGE_BYTES[:4]).status_code == 200
+        assert patch_chunk(client, upload_id, 4, IMAGE_BYTES[4:]).get_json()['offset'] == len(IMAGE_BYTES)
+
+        other = start_upload(client, sample_user['email']).get_json()['uploadId']
+        assert patch_chunk(client, other, 0, b'<htm').status_code == 200
+        assert patch_chunk(client, other, 4, b'l>not an image</html>').status_code == 415
+
+    def test_first_chunk_must_be_an_image(self, client, sample_user):
+        upload_id = start_upload(client, sample_user['email']).get_json()['uploadId']
+
+        response = patch_chunk(client, upload_id, 0, b'<html>not an image</html>')
+
+        assert response.status_code == 415
+        assert response.get_json()['offset'] == 0
+
+    def test_declared_size_over_limit(self, app, client, sample_user):
+        app.config['MAX_IMAGE_SIZE'] = 100
+
+        response = start_upload(client, sample_user['email'], size=101)
+
+        assert response.status_code == 413
+
+    def test_chunks_over_limit_rejected(self, app, client, sample_user):
+        app.config['MAX_IMAGE_SIZE'] = 100
+        upload_id = start_upload(client, sample_user['email']).get_json()['uploadId']
+
+        response = patch_chunk(client, upload_id, 0, IMAGE_BYTES)
+
+        assert response.status_code == 413
+
+    def test_unknown_upload(self, client, sample_user):
+        assert client.get(f'/api/uploads/../../etc?email={sample_user["email"]}').status_code == 404
+        assert patch_chunk(client, 'f' * 32, 0, IMAGE_BYTES).status_code == 404
+
+    def test_requires_identity_and_owner(self, client, sample_user, admin_user):
+        assert client.post('/api/uploads', json={}).status_code == 400
+        upload_id = start_upload(client, sample_user['email']).get_json()['uploadId']
+
+        assert patch_chunk(client, upload_id, 0, IMAGE_BYTES, email=admin_user['email']).status_code == 404
+        assert client.get(f'/api/uploads/{upload_id}').status_code == 400
+
+    def test_open_sessions_capped_per_user(self, app, client, sample_user, admin_user):
+        app.config['UPLOAD_MAX_SESSIONS'] = 2
+        for _ in range(2):
+            assert start_upload(client, sample_user['email']).status_code == 201
+
+        assert start_upload(client, sample_user['email']).status_code == 429
+        assert start_upload(client, admin_user['email']).status_code == 201
+
+
+class TestUploadLimits:
+
+    def test_multipart_image_over_limit(self, app, client, sample_user):
+        app.config['MAX_IMAGE_SIZE'] = 100
+
+        response = client.post('/api/games', data={
+            **GAME_FIELDS, 'email': sample_user['email'],
+            'image': (BytesIO(IMAGE_BYTES), 'azul.png')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 413
+        with app.app_context():
+            assert Igra.query.count() == 0
+
+    def test_multipart_non_image_rejected(self, client, sample_user):
+        response = client.post('/api/games', data={
+            **GAME_FIELDS, 'email': sample_user['email'],
+            'image': (BytesIO(b'MZ\x90\x00executable'), 'azul.png')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 415
+
+    def test_base64_image_checked(self, client, sample_user):
+        import base64
+        response = client.post('/api/games', json={
+            **GAME_FIELDS, 'email': sample_user['email'],
+            'image_base64': base64.b64encode(b'plain text').decode()
+        })
+
+        assert response.status_code == 415
+
+    def test_request_over_max_content_length(self, app, client, sample_user):
+        app.config['MAX_CONTENT_LENGTH'] = 200
+
+        response = client.post('/api/games', data={
+            **GAME_FIELDS, 'email': sample_user['email'],
+            'image': (BytesIO(IMAGE_BYTES), 'azul.png')
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 413
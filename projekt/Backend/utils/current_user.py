@@ -0,0 +1,126 @@
+import threading
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import false, update
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+from database import db
+from models.actualUser import Korisnik
+
+DEFAULT_CLAIMS_CACHE_SECONDS = 30
+
+
+def issue_token(user):
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={'admin': user.jeAdmin == 1, 'ver': user.verzija_tokena or 0}
+    )
+
+
+def token_user_id():
+    verify_jwt_in_request(optional=True)
+    identity = get_jwt_identity()
+    return int(identity) if identity is not None else None
+
+
+def current_user_clause(email=None):
+    user_id = token_user_id()
+    if user_id is not None:
+        return Korisnik.id == user_id
+    if email and current_app.config.get('AUTH_EMAIL_FALLBACK', True):
+        return Korisnik.email == email
+    return false()
+
+
+def get_current_user_id(email=None):
+    """Id of the requesting user, taken from a verified bearer token.
+
+    Clients that only send their email (the current frontend) still resolve
+    through one indexed lookup unless AUTH_EMAIL_FALLBACK is turned off.
+    """
+    user_id = token_user_id()
+    if user_id is None and email:
+        user_id = db.session.execute(db.select(Korisnik.id).where(current_user_clause(email))).scalar()
+    return user_id
+
+
+def has_identity(email):
+    return bool(email) or token_user_id() is not None
+
+
+class TokenStateCache:
+    """Short-lived copy of each user's (token version, is admin) pair.
+
+    Role claims are trusted only while they match this state, so a role
+    change or revocation takes effect here at once and in other processes
+    within `ttl` seconds.
+    """
+
+    def __init__(self, ttl=DEFAULT_CLAIMS_CACHE_SECONDS):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+        row = db.session.execute(
+            db.select(Korisnik.verzija_tokena, Korisnik.jeAdmin).filter_by(id=user_id)
+        ).first()
+        state = (row.verzija_tokena, row.jeAdmin == 1) if row else None
+        with self._lock:
+            self._entries[user_id] = (now, state)
+        return state
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def get_token_state_cache():
+    cache = current_app.extensions.get('token_state_cache')
+    if cache is None:
+        cache = current_app.extensions['token_state_cache'] = TokenStateCache(
+            current_app.config.get('AUTH_CLAIMS_CACHE_SECONDS', DEFAULT_CLAIMS_CACHE_SECONDS)
+        )
+    return cache
+
+
+def current_admin_id(email=None):
+    user_id = token_user_id()
+    if user_id is not None:
+        claims = get_jwt()
+        if not claims.get('admin'):
+            return None
+        return user_id if get_token_state_cache().get(user_id) == (claims.get('ver', 0), True) else None
+    if email and current_app.config.get('AUTH_EMAIL_FALLBACK', True):
+        return db.session.execute(db.select(Korisnik.id).filter_by(email=email, jeAdmin=1)).scalar()
+    return None
+
+
+def revoke_tokens(user_id):
+    db.session.execute(
+        update(Korisnik)
+        .where(Korisnik.id == user_id)
+        .values(verzija_tokena=Korisnik.verzija_tokena + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@click.command('revoke-tokens')
+@click.argument('email')
+@with_appcontext
+def revoke_tokens_command(email):
+    """Invalidate every token issued to EMAIL so far."""
+    user_id = db.session.execute(db.select(Korisnik.id).filter_by(email=email)).scalar()
+    if user_id is None:
+        raise click.ClickException(f"No user with email {email}")
+    revoke_tokens(user_id)
+    db.session.commit()
+    get_token_state_cache().invalidate(user_id)
+    click.echo(f"Tokens for {email} revoked")
@@ -1,7 +1,12 @@
+import re
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
+from html import escape
+from flask import current_app, has_app_context
 
 SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
 SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
@@ -9,9 +14,180 @@ SMTP_USERNAME = os.environ.get('SMTP_USERNAME', '')
 SMTP_PASSWORD = os.environ.get('SMTP_PASSWORD', '')
 FROM_EMAIL = os.environ.get('FROM_EMAIL', 'playtrade@example.com')
 EMAIL_ENABLED = os.environ.get('EMAIL_ENABLED', 'false').lower() == 'true'
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 4))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 30))
+SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
+SMTP_NOOP_AFTER_SECONDS = 30
+DIGEST_SUMMARY_CHARS = 300
 
+# Failures that concern a single message; the session itself is still usable.
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
 
-def send_email(to_email, subject, html_content, text_content=None):
+
+class _PooledConnection:
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    def __init__(self, host, port, username, password, size=SMTP_POOL_SIZE,
+                 max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION, timeout=SMTP_TIMEOUT,
+                 use_tls=True, smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.smtp_class = smtp_class
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._counters = {'sent': 0, 'failed': 0, 'connections_opened': 0, 'reconnects': 0, 'send_seconds': 0.0}
+
+    def _count(self, **amounts):
+        with self._lock:
+            for key, amount in amounts.items():
+                self._counters[key] += amount
+
+    def _open(self):
+        server = self.smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._count(connections_opened=1)
+        return _PooledConnection(server)
+
+    def _discard(self, conn):
+        try:
+            conn.server.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.server.close()
+
+    def _is_usable(self, conn):
+        if conn.sent >= self.max_messages:
+            return False
+        if time.monotonic() - conn.last_used < SMTP_NOOP_AFTER_SECONDS:
+            return True
+        try:
+            return conn.server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._open()
+            if self._is_usable(conn):
+                return conn
+            self._discard(conn)
+
+    def _checkin(self, conn):
+        if conn.sent >= self.max_messages:
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(conn)
+
+    def _send_one(self, conn, from_addr, to_email, message):
+        """Connect failures propagate so send_many can give up on the rest of the batch."""
+        for attempt in range(2):
+            if conn is None:
+                conn = self._checkout()
+            try:
+                conn.server.sendmail(from_addr, to_email, message)
+                conn.sent += 1
+                if conn.sent >= self.max_messages:
+                    self._discard(conn)
+                    conn = None
+                return conn, None
+            except MESSAGE_ERRORS as e:
+                return conn, e
+            except (smtplib.SMTPException, OSError) as e:
+                self._discard(conn)
+                conn = None
+                if attempt:
+                    return None, e
+                self._count(reconnects=1)
+
+    def send_many(self, from_addr, messages):
+        errors = []
+        started = time.perf_counter()
+        with self._slots:
+            conn = None
+            try:
+                for i, (to_email, message) in enumerate(messages):
+                    try:
+                        conn, error = self._send_one(conn, from_addr, to_email, message)
+                    except (smtplib.SMTPException, OSError) as e:
+                        errors.extend([e] * (len(messages) - i))
+                        break
+                    errors.append(error)
+            finally:
+                if conn is not None:
+                    self._checkin(conn)
+        failed = sum(1 for error in errors if error is not None)
+        self._count(sent=len(errors) - failed, failed=failed, send_seconds=time.perf_counter() - started)
+        return errors
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            idle = len(self._idle)
+        seconds = counters.pop('send_seconds')
+        return {
+            'messagesSent': counters['sent'],
+            'messagesFailed': counters['failed'],
+            'connectionsOpened': counters['connections_opened'],
+            'reconnects': counters['reconnects'],
+            'idleConnections': idle,
+            'messagesPerSecond': round(counters['sent'] / seconds, 2) if seconds else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def reset_smtp_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def get_smtp_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPConnectionPool(SMTP_SERVER, SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD, use_tls=SMTP_USE_TLS)
+        return _pool
+
+
+def delivery_configured():
+    return EMAIL_ENABLED and bool(SMTP_USERNAME and SMTP_PASSWORD)
+
+
+def _delivery_skipped(to_email, subject):
     if not EMAIL_ENABLED:
         print(f"[EMAIL DISABLED] Would send to {to_email}: {subject}")
         return True
@@ -19,32 +195,118 @@ def send_email(to_email, subject, html_content, text_content=None):
     if not SMTP_USERNAME or not SMTP_PASSWORD:
         print(f"[EMAIL NOT CONFIGURED] Would send to {to_email}: {subject}")
         return True
+    return False
+
+
+def build_message(to_email, subject, html_content, text_content=None):
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = FROM_EMAIL
+    msg['To'] = to_email
+    
+    if text_content:
+        part1 = MIMEText(text_content, 'plain')
+        msg.attach(part1)
+    
+    part2 = MIMEText(html_content, 'html')
+    msg.attach(part2)
+    return msg
+
+
+def deliver_batch(messages):
+    results = [None] * len(messages)
+    pending = [i for i, message in enumerate(messages) if not _delivery_skipped(message[0], message[1])]
+    if not pending:
+        return results
     
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = FROM_EMAIL
-        msg['To'] = to_email
-        
-        if text_content:
-            part1 = MIMEText(text_content, 'plain')
-            msg.attach(part1)
-        
-        part2 = MIMEText(html_content, 'html')
-        msg.attach(part2)
-        
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(FROM_EMAIL, to_email, msg.as_string())
-        
-        print(f"[EMAIL SENT] To: {to_email}, Subject: {subject}")
+        errors = get_smtp_pool().send_many(
+            FROM_EMAIL, [(messages[i][0], build_message(*messages[i]).as_string()) for i in pending]
+        )
+    except (smtplib.SMTPException, OSError) as e:
+        errors = [e] * len(pending)
+    
+    for i, error in zip(pending, errors):
+        results[i] = error
+        if error is None:
+            print(f"[EMAIL SENT] To: {messages[i][0]}, Subject: {messages[i][1]}")
+    return results
+
+
+def deliver_email(to_email, subject, html_content, text_content=None):
+    error = deliver_batch([(to_email, subject, html_content, text_content)])[0]
+    if error is not None:
+        raise error
+    return True
+
+
+def send_email(to_email, subject, html_content, text_content=None):
+    if has_app_context() and current_app.config.get('EMAIL_OUTBOX_ENABLED', True):
+        from utils.outbox import queue_email
+        queue_email(to_email, subject, html_content, text_content)
         return True
+    
+    try:
+        return deliver_email(to_email, subject, html_content, text_content)
     except Exception as e:
         print(f"[EMAIL ERROR] Failed to send email to {to_email}: {e}")
         return False
 
 
+def message_summary(html_content, text_content=None, limit=DIGEST_SUMMARY_CHARS):
+    """Plain-text summary of one message: its text part, or its HTML with the markup stripped."""
+    summary = text_content or re.sub(r'<[^>]+>', ' ', re.sub(r'<h1.*?</h1>', '', html_content, flags=re.S))
+    summary = ' '.join(summary.split())
+    return summary if len(summary) <= limit else summary[:limit - 1].rstrip() + '…'
+
+
+def render_digest(messages):
+    """Digest of (subject, html_content, text_content) messages, each with a summary of its body."""
+    items = [(subject, message_summary(html_content, text_content)) for subject, html_content, text_content in messages]
+    subject = f"PlayTrade - {len(items)} novih obavijesti"
+    
+    items_html = "".join(
+        f'<li style="margin-bottom: 12px;"><strong>{escape(item_subject)}</strong><br>'
+        f'<span style="color: #6b7280;">{escape(summary)}</span></li>'
+        for item_subject, summary in items
+    )
+    html_content = f"""
+    <html>
+    <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 20px; border-radius: 10px 10px 0 0;">
+            <h1 style="color: white; margin: 0;">PlayTrade</h1>
+        </div>
+        <div style="background: #f9fafb; padding: 20px; border: 1px solid #e5e7eb; border-top: none;">
+            <h2 style="color: #1f2937;">Imate {len(items)} novih obavijesti</h2>
+            <ul style="color: #4b5563; padding-left: 20px;">
+                {items_html}
+            </ul>
+            <div style="margin-top: 20px; text-align: center;">
+                <a href="https://test.bloodlust-rp.com/profile"
+                   style="background: #7c3aed; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
+                    Otvori PlayTrade
+                </a>
+            </div>
+            <p style="color: #9ca3af; font-size: 12px; margin-top: 20px;">
+                Obavijesti primate skupno. Način primanja možete promijeniti na svom profilu.
+            </p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    items_text = "\n".join(f"    - {item_subject}\n      {summary}" for item_subject, summary in items)
+    text_content = f"""
+    Imate {len(items)} novih obavijesti na PlayTrade:
+    
+{items_text}
+    
+    Prijavite se na PlayTrade kako biste ih pregledali.
+    """
+    
+    return subject, html_content, text_content
+
+
 def send_trade_offer_notification(to_email, offerer_name, requested_game, offered_games):
     subject = f"Nova ponuda za zamjenu - {requested_game}"
     
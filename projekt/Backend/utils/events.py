@@ -0,0 +1,146 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+from sqlalchemy import event
+from werkzeug.utils import import_string
+from database import db
+
+DEFAULT_BUFFER_SIZE = 100
+DEFAULT_HISTORY_SIZE = 1000
+DEFAULT_HEARTBEAT_SECONDS = 15
+
+
+class SubscriptionOverflow(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, broker, user_id, buffer_size):
+        self.broker = broker
+        self.user_id = user_id
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=buffer_size)
+
+    def push(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        if self.overflowed:
+            raise SubscriptionOverflow()
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans events out to subscribers in this process.
+
+    Delivery and Last-Event-ID replay only cover events published by this
+    process, so it suits a single worker process (threads are fine). Event
+    ids are microsecond timestamps, so they stay ordered across restarts and
+    workers; a client whose last id predates what this broker still holds
+    gets a `resync` event. Multi-process deployments need a shared broker
+    (e.g. Redis pub/sub) with the same publish/subscribe/unsubscribe
+    methods; set EVENT_BROKER to its import path.
+    """
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, history_size=DEFAULT_HISTORY_SIZE):
+        self.buffer_size = buffer_size
+        self._last_id = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._known_since = self._next_id()
+
+    def _next_id(self):
+        self._last_id = max(time.time_ns() // 1000, self._last_id + 1)
+        return self._last_id
+
+    def publish(self, user_id, event_type, data):
+        with self._lock:
+            item = (self._next_id(), user_id, event_type, data)
+            if len(self._history) == self._history.maxlen:
+                self._known_since = self._history[0][0]
+            self._history.append(item)
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.push(item)
+        return item[0]
+
+    def subscribe(self, user_id, last_event_id=None):
+        subscription = Subscription(self, user_id, self.buffer_size)
+        with self._lock:
+            if last_event_id is not None:
+                if last_event_id < self._known_since:
+                    subscription.push((None, user_id, 'resync', {}))
+                for item in self._history:
+                    if item[0] > last_event_id and item[1] == user_id:
+                        subscription.push(item)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+def get_event_broker():
+    broker = current_app.extensions.get('event_broker')
+    if broker is None:
+        broker_class = import_string(current_app.config.get('EVENT_BROKER', 'utils.events.InProcessBroker'))
+        broker = current_app.extensions['event_broker'] = broker_class(
+            buffer_size=current_app.config.get('EVENT_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+        )
+    return broker
+
+
+def publish_event(user_id, event_type, data):
+    db.session.info.setdefault('pending_events', []).append(
+        (get_event_broker(), user_id, event_type, data)
+    )
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_committed(session):
+    for broker, user_id, event_type, data in session.info.pop('pending_events', ()):
+        broker.publish(user_id, event_type, data)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_uncommitted(session):
+    session.info.pop('pending_events', None)
+
+
+def format_event(item):
+    event_id, _, event_type, data = item
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(subscription, heartbeat):
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                item = subscription.get(timeout=heartbeat)
+            except SubscriptionOverflow:
+                return
+            yield ": heartbeat\n\n" if item is None else format_event(item)
+    finally:
+        subscription.close()
@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+from flask import current_app
+from google.auth import jwt
+from werkzeug.utils import import_string
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_MAX_AGE = 300
+MIN_REFRESH_SECONDS = 60
+FETCH_TIMEOUT_SECONDS = 5
+
+
+def cache_max_age(headers):
+    match = re.search(r'max-age=(\d+)', headers.get('Cache-Control', ''))
+    if not match:
+        return DEFAULT_MAX_AGE
+    return max(0, int(match.group(1)) - int(headers.get('Age') or 0))
+
+
+class StaticKeySource:
+    def __init__(self, certs):
+        self.certs = dict(certs)
+
+    def get_certs(self, refresh=False):
+        return self.certs
+
+
+class GoogleCertSource:
+    """Google's PEM signing certificates, cached in memory and on disk for their max-age.
+
+    A token signed with an unknown key id forces one refetch (keys rotate),
+    at most once per MIN_REFRESH_SECONDS. If a refetch fails the expired
+    certificates stay in use.
+    """
+
+    def __init__(self, url=GOOGLE_CERTS_URL, cache_path=None, session=None):
+        self.url = url
+        self.cache_path = cache_path
+        self.session = session or requests.Session()
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expires = 0
+        self._last_fetch = 0
+        self._load_cached()
+
+    def _load_cached(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path) as f:
+                cached = json.load(f)
+            self._certs, self._expires = cached['certs'], cached['expires']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _store_cached(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            temp_path = f"{self.cache_path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({'certs': self._certs, 'expires': self._expires}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"[GOOGLE AUTH] Could not write certificate cache {self.cache_path}: {e}")
+
+    def _fetch(self):
+        self._last_fetch = time.time()
+        response = self.session.get(self.url, timeout=FETCH_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        self._certs = response.json()
+        self._expires = time.time() + cache_max_age(response.headers)
+        self.fetches += 1
+        self._store_cached()
+
+    def get_certs(self, refresh=False):
+        with self._lock:
+            now = time.time()
+            expired = self._certs is None or now >= self._expires
+            if expired or (refresh and now - self._last_fetch >= MIN_REFRESH_SECONDS):
+                try:
+                    self._fetch()
+                except (requests.RequestException, ValueError):
+                    if self._certs is None:
+                        raise
+            return self._certs
+
+
+class GoogleTokenVerifier:
+    def __init__(self, key_source, client_id, clock_skew=0):
+        self.key_source = key_source
+        self.client_id = client_id
+        self.clock_skew = clock_skew
+
+    def verify(self, token):
+        key_id = jwt.decode_header(token).get('kid')
+        certs = self.key_source.get_certs()
+        if key_id not in certs:
+            certs = self.key_source.get_certs(refresh=True)
+        idinfo = jwt.decode(token, certs=certs, audience=self.client_id, clock_skew_in_seconds=self.clock_skew)
+        if idinfo.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError("Wrong issuer.")
+        return idinfo
+
+
+def get_google_verifier():
+    """GOOGLE_KEY_SOURCE is an import path (built with url and cache_path) or a key source instance."""
+    verifier = current_app.extensions.get('google_verifier')
+    if verifier is None:
+        key_source = current_app.config.get('GOOGLE_KEY_SOURCE', 'utils.google_auth.GoogleCertSource')
+        if isinstance(key_source, str):
+            key_source = import_string(key_source)(
+                url=current_app.config.get('GOOGLE_CERTS_URL', GOOGLE_CERTS_URL),
+                cache_path=current_app.config.get('GOOGLE_CERTS_CACHE_PATH')
+            )
+        verifier = current_app.extensions['google_verifier'] = GoogleTokenVerifier(
+            key_source,
+            current_app.config['GOOGLE_CLIENT_ID'],
+            current_app.config.get('GOOGLE_CLOCK_SKEW_SECONDS', 0)
+        )
+    return verifier
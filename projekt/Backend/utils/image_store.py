@@ -0,0 +1,294 @@
+import base64
+import binascii
+import hashlib
+import itertools
+import os
+import tempfile
+import time
+import warnings
+from io import BytesIO
+
+import click
+from flask import current_app, send_file, Response
+from flask.cli import with_appcontext
+from PIL import Image
+from database import db
+from models.igra import Igra
+from models.actualUser import Korisnik
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_MAX_IMAGE_SIZE = 10 * 1024 * 1024
+DEFAULT_MAX_IMAGE_PIXELS = 40 * 1000 * 1000
+ALLOWED_IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+# Pillow only warns between MAX_IMAGE_PIXELS and twice that; treat it as the
+# error it is so callers can catch both in one place.
+warnings.simplefilter('error', Image.DecompressionBombWarning)
+DECOMPRESSION_BOMB_ERRORS = (Image.DecompressionBombError, Image.DecompressionBombWarning)
+
+
+def detect_mimetype(header):
+    for signature, mimetype in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mimetype
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+class LocalImageStore:
+    def __init__(self, root):
+        self.root = root
+
+    def relative_path(self, digest):
+        return os.path.join(digest[:2], digest[2:4], digest)
+
+    def path(self, digest):
+        return os.path.join(self.root, self.relative_path(digest))
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def read_header(self, digest, size=16):
+        with open(self.path(digest), 'rb') as f:
+            return f.read(size)
+
+    def digests(self):
+        """Yields (digest, mtime) for every stored blob."""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if not name.startswith('.upload-'):
+                    yield name, os.path.getmtime(os.path.join(directory, name))
+
+    def remove(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+    def save(self, data):
+        return self.save_stream([data])
+
+    def save_stream(self, chunks, validate=None):
+        """`validate` gets the temporary file's path before the blob is stored and may raise."""
+        os.makedirs(self.root, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            if validate is not None:
+                validate(temp_path)
+            digest = sha256.hexdigest()
+            target = self.path(digest)
+            if os.path.exists(target):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return digest, size
+
+
+class ImageUploadError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def max_image_size():
+    return current_app.config.get('MAX_IMAGE_SIZE', DEFAULT_MAX_IMAGE_SIZE)
+
+
+def max_image_pixels():
+    return current_app.config.get('MAX_IMAGE_PIXELS', DEFAULT_MAX_IMAGE_PIXELS)
+
+
+def image_too_large(image, max_pixels):
+    return image.width * image.height > max_pixels
+
+
+def dimension_check(max_pixels):
+    """Rejects images whose header declares more than `max_pixels` pixels without decoding them.
+
+    Files Pillow cannot identify pass; they are served as uploaded and never thumbnailed.
+    """
+    def check(path):
+        try:
+            with Image.open(path) as image:
+                too_large = image_too_large(image, max_pixels)
+        except DECOMPRESSION_BOMB_ERRORS:
+            too_large = True
+        except OSError:
+            return
+        if too_large:
+            raise ImageUploadError("Dimenzije slike su prevelike.", 413)
+    return check
+
+
+def check_image_header(header):
+    if detect_mimetype(header[:16]) not in ALLOWED_IMAGE_TYPES:
+        raise ImageUploadError("Nepodržani format slike.", 415)
+
+
+def validated_chunks(chunks, max_bytes):
+    size = 0
+    for chunk in chunks:
+        if size == 0:
+            check_image_header(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            raise ImageUploadError("Slika je prevelika.", 413)
+        yield chunk
+    if size == 0:
+        raise ImageUploadError("Slika je prazna.")
+
+
+def save_upload(stream):
+    """Returns (digest, size, mimetype) so the mimetype is stored with the row."""
+    chunks = read_chunks(stream)
+    first = next(chunks, b'')
+    digest, size = get_image_store().save_stream(
+        validated_chunks(itertools.chain([first], chunks), max_image_size()),
+        validate=dimension_check(max_image_pixels())
+    )
+    return digest, size, detect_mimetype(first[:16])
+
+
+def save_base64_upload(encoded):
+    if len(encoded) * 3 // 4 > max_image_size():
+        raise ImageUploadError("Slika je prevelika.", 413)
+    try:
+        data = base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        raise ImageUploadError("Neispravan base64 zapis slike.")
+    return save_upload(BytesIO(data))
+
+
+def read_chunks(stream, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def get_image_store():
+    store = current_app.extensions.get('image_store')
+    if store is None:
+        root = current_app.config.get('IMAGE_STORE_DIR') or os.path.join(current_app.instance_path, 'images')
+        store = current_app.extensions['image_store'] = LocalImageStore(root)
+    return store
+
+
+def send_stored_image(digest, mimetype=None):
+    """Returns None when the blob is missing from the store.
+
+    Rows saved before image_mimetype existed fall back to sniffing the header.
+    """
+    store = get_image_store()
+    try:
+        mimetype = mimetype or detect_mimetype(store.read_header(digest))
+        accel_prefix = current_app.config.get('IMAGE_ACCEL_REDIRECT_PREFIX')
+        if accel_prefix:
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + store.relative_path(digest).replace(os.sep, '/')
+            return response
+        return send_file(store.path(digest), mimetype=mimetype, conditional=True, etag=False)
+    except FileNotFoundError:
+        return None
+
+
+def apply_image_cache_headers(response, etag, immutable=False):
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def _migrate_model_images(model, batch_size):
+    store = get_image_store()
+    moved = 0
+    while True:
+        ids = db.session.scalars(
+            db.select(model.id)
+            .where(model.fotografija.is_not(None), model.image_hash.is_(None))
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return moved
+        for row_id in ids:
+            image = db.session.execute(
+                db.select(model.fotografija).where(model.id == row_id)
+            ).scalar()
+            digest, size = store.save(image)
+            db.session.execute(
+                db.update(model).where(model.id == row_id).values(
+                    image_hash=digest, image_mimetype=detect_mimetype(image[:16]),
+                    fotografija=None, has_image=True, image_size=size
+                )
+            )
+        db.session.commit()
+        moved += len(ids)
+
+
+@click.command('migrate-images')
+@click.option('--batch-size', default=100, show_default=True)
+@click.option('--vacuum', is_flag=True, help='Run VACUUM afterwards to shrink the database file.')
+@with_appcontext
+def migrate_images_command(batch_size, vacuum):
+    """Move image BLOBs from the database into the image store."""
+    for model in (Igra, Korisnik):
+        moved = _migrate_model_images(model, batch_size)
+        click.echo(f"{model.__name__}: {moved} images moved")
+
+    if vacuum:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('VACUUM')
+
+
+def remove_orphaned_images(min_age):
+    """Deletes blobs no row references, e.g. uploads whose commit failed.
+
+    Blobs newer than `min_age` seconds are kept, since their row may still be
+    about to commit.
+    """
+    store = get_image_store()
+    referenced = set()
+    for model in (Igra, Korisnik):
+        referenced.update(db.session.scalars(db.select(model.image_hash).where(model.image_hash.is_not(None))))
+    cutoff = time.time() - min_age
+    removed = 0
+    for digest, mtime in list(store.digests()):
+        if digest not in referenced and mtime < cutoff:
+            store.remove(digest)
+            removed += 1
+    return removed
+
+
+@click.command('cleanup-images')
+@click.option('--min-age', default=60 * 60, show_default=True, help='Keep unreferenced blobs newer than this many seconds.')
+@with_appcontext
+def cleanup_images_command(min_age):
+    """Delete stored images that no game or profile references."""
+    click.echo(f"{remove_orphaned_images(min_age)} orphaned images removed")
@@ -0,0 +1,201 @@
+import random
+import threading
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, update
+from database import db
+from models.obavijest import Obavijest
+from models.actualUser import Korisnik
+from utils import email_service
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 60 * 60
+LEASE_SECONDS = 5 * 60
+DEFAULT_DIGEST_WINDOW_SECONDS = 15 * 60
+
+_wakeup = threading.Event()
+
+
+def queue_email(to_email, subject, html_content, text_content=None):
+    mode = db.session.query(Korisnik.nacin_obavijesti).filter(Korisnik.email == to_email).limit(1).scalar()
+    db.session.add(Obavijest(
+        primatelj=to_email,
+        predmet=subject,
+        html_sadrzaj=html_content,
+        tekst_sadrzaj=text_content,
+        status='digest' if mode == 'digest' else 'pending'
+    ))
+    db.session.info['outbox_dirty'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _wake_workers(session):
+    if session.info.pop('outbox_dirty', False):
+        _wakeup.set()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_queued(session):
+    session.info.pop('outbox_dirty', None)
+
+
+def lease_seconds(batch_size):
+    """Long enough for every message in the batch to use its connect and send timeouts."""
+    return max(LEASE_SECONDS, 2 * batch_size * email_service.SMTP_TIMEOUT)
+
+
+def claim_batch(batch_size=DEFAULT_BATCH_SIZE):
+    now = datetime.utcnow()
+    due = db.select(Obavijest.id).where(
+        Obavijest.status.in_(('pending', 'sending')),
+        Obavijest.sljedeci_pokusaj <= now
+    ).order_by(Obavijest.sljedeci_pokusaj).limit(batch_size).scalar_subquery()
+
+    claimed = db.session.execute(
+        update(Obavijest)
+        .where(Obavijest.id.in_(due))
+        .values(status='sending', sljedeci_pokusaj=now + timedelta(seconds=lease_seconds(batch_size)))
+        .returning(Obavijest.id, Obavijest.primatelj, Obavijest.predmet,
+                   Obavijest.html_sadrzaj, Obavijest.tekst_sadrzaj, Obavijest.broj_pokusaja)
+    ).all()
+    db.session.commit()
+    return claimed
+
+
+def coalesce_digests():
+    window = current_app.config.get('EMAIL_DIGEST_WINDOW_SECONDS', DEFAULT_DIGEST_WINDOW_SECONDS)
+    now = datetime.utcnow()
+    recipients = db.session.execute(
+        db.select(Obavijest.primatelj)
+        .where(Obavijest.status == 'digest')
+        .group_by(Obavijest.primatelj)
+        .having(func.min(Obavijest.vrijeme_kreiranja) <= now - timedelta(seconds=window))
+    ).scalars().all()
+
+    for recipient in recipients:
+        held = db.session.execute(
+            update(Obavijest)
+            .where(Obavijest.primatelj == recipient, Obavijest.status == 'digest')
+            .values(status='coalesced')
+            .returning(Obavijest.id, Obavijest.predmet, Obavijest.html_sadrzaj,
+                       Obavijest.tekst_sadrzaj, Obavijest.vrijeme_kreiranja)
+        ).all()
+        if len(held) == 1:
+            db.session.execute(
+                update(Obavijest).where(Obavijest.id == held[0].id)
+                .values(status='pending', sljedeci_pokusaj=now)
+            )
+        elif held:
+            held.sort(key=lambda row: (row.vrijeme_kreiranja, row.id))
+            subject, html_content, text_content = email_service.render_digest(
+                [(row.predmet, row.html_sadrzaj, row.tekst_sadrzaj) for row in held]
+            )
+            db.session.add(Obavijest(
+                primatelj=recipient,
+                predmet=subject,
+                html_sadrzaj=html_content,
+                tekst_sadrzaj=text_content
+            ))
+    db.session.commit()
+    return len(recipients)
+
+
+def backoff_delay(attempts):
+    base = current_app.config.get('EMAIL_OUTBOX_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS)
+    delay = min(base * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _record_result(row, error):
+    now = datetime.utcnow()
+    if error is None:
+        values = {'status': 'sent', 'vrijeme_slanja': now, 'broj_pokusaja': row.broj_pokusaja + 1}
+    else:
+        attempts = row.broj_pokusaja + 1
+        max_attempts = current_app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        values = {
+            'status': 'dead' if attempts >= max_attempts else 'pending',
+            'broj_pokusaja': attempts,
+            'sljedeci_pokusaj': now + backoff_delay(attempts),
+            'zadnja_greska': str(error)[:500]
+        }
+    db.session.execute(update(Obavijest).where(Obavijest.id == row.id).values(**values))
+    db.session.commit()
+
+
+def _skip_batch(claimed):
+    for row in claimed:
+        print(f"[EMAIL DISABLED] Skipped email to {row.primatelj}: {row.predmet}")
+    db.session.execute(
+        update(Obavijest)
+        .where(Obavijest.id.in_([row.id for row in claimed]))
+        .values(status='skipped', vrijeme_slanja=datetime.utcnow())
+    )
+    db.session.commit()
+
+
+def process_outbox_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """Messages claimed while email delivery is disabled or unconfigured are marked skipped."""
+    coalesce_digests()
+    claimed = claim_batch(batch_size)
+    if not claimed:
+        return 0
+    if not email_service.delivery_configured():
+        _skip_batch(claimed)
+        return len(claimed)
+    errors = email_service.deliver_batch([
+        (row.primatelj, row.predmet, row.html_sadrzaj, row.tekst_sadrzaj) for row in claimed
+    ])
+    for row, error in zip(claimed, errors):
+        if error is not None:
+            print(f"[EMAIL ERROR] Failed to send email to {row.primatelj}: {error}")
+        _record_result(row, error)
+    return len(claimed)
+
+
+def _worker_loop(app, stop_event):
+    poll_interval = app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 5)
+    batch_size = app.config.get('EMAIL_OUTBOX_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    while not stop_event.is_set():
+        with app.app_context():
+            try:
+                processed = process_outbox_batch(batch_size)
+            except Exception as e:
+                db.session.rollback()
+                print(f"[OUTBOX ERROR] {e}")
+                processed = 0
+            finally:
+                db.session.remove()
+        if not processed:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+
+
+def start_outbox_workers(app, count=None):
+    count = app.config.get('EMAIL_OUTBOX_WORKERS', 2) if count is None else count
+    stop_event = threading.Event()
+    for i in range(count):
+        threading.Thread(
+            target=_worker_loop, args=(app, stop_event), name=f'outbox-worker-{i}', daemon=True
+        ).start()
+    return stop_event
+
+
+@click.command('outbox-worker')
+@click.option('--once', is_flag=True, help='Process due messages once and exit.')
+@with_appcontext
+def outbox_worker_command(once):
+    """Deliver queued notification emails."""
+    if once:
+        total = 0
+        while processed := process_outbox_batch():
+            total += processed
+        click.echo(f"{total} messages processed")
+        click.echo(f"SMTP pool: {email_service.get_smtp_pool().stats()}")
+        return
+    _worker_loop(current_app._get_current_object(), threading.Event())
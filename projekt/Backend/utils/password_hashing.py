@@ -0,0 +1,124 @@
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+from flask import current_app
+
+DEFAULT_ROUNDS = 12
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_TIMEOUT_SECONDS = 10
+TIMING_WINDOW = 1000
+UNUSABLE_PREFIX = '!'
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def hash_rounds(password_hash):
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def unusable_password():
+    """Placeholder hash for accounts that never log in with a password."""
+    return UNUSABLE_PREFIX + secrets.token_hex(16)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded pool so login bursts queue instead of pinning every request thread.
+
+    At most `workers + queue_size` operations are admitted at once; beyond
+    that callers get PasswordHasherBusy right away.
+    """
+
+    def __init__(self, rounds=DEFAULT_ROUNDS, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 timeout=DEFAULT_TIMEOUT_SECONDS):
+        self.rounds = rounds
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rejected = 0
+        self._timings = {'hash': deque(maxlen=TIMING_WINDOW), 'verify': deque(maxlen=TIMING_WINDOW)}
+        self._counts = {'hash': 0, 'verify': 0}
+
+    def _timed(self, operation, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._timings[operation].append(elapsed)
+                self._counts[operation] += 1
+
+    def _run(self, operation, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PasswordHasherBusy()
+        with self._lock:
+            self._in_flight += 1
+        future = self.executor.submit(self._timed, operation, func, *args)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _hash(self, password, rounds):
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+    def hash(self, password):
+        return self._run('hash', self._hash, password.encode('utf-8'), self.rounds)
+
+    def verify(self, password, password_hash):
+        if not password_hash or password_hash.startswith(UNUSABLE_PREFIX):
+            return False
+        try:
+            return self._run('verify', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, password_hash):
+        return hash_rounds(password_hash) != self.rounds
+
+    def stats(self):
+        with self._lock:
+            timings = {operation: sorted(values) for operation, values in self._timings.items()}
+            counts = dict(self._counts)
+            in_flight, rejected = self._in_flight, self._rejected
+        result = {'rounds': self.rounds, 'inFlight': in_flight, 'rejected': rejected}
+        for operation, values in timings.items():
+            result[operation] = {
+                'count': counts[operation],
+                'p50Ms': round(values[len(values) // 2] * 1000, 2) if values else None,
+                'p99Ms': round(values[min(len(values) - 1, len(values) * 99 // 100)] * 1000, 2) if values else None
+            }
+        return result
+
+
+def get_password_hasher():
+    hasher = current_app.extensions.get('password_hasher')
+    if hasher is None:
+        hasher = current_app.extensions['password_hasher'] = PasswordHasher(
+            rounds=current_app.config.get('BCRYPT_LOG_ROUNDS', DEFAULT_ROUNDS),
+            workers=current_app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+            queue_size=current_app.config.get('PASSWORD_HASH_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+            timeout=current_app.config.get('PASSWORD_HASH_TIMEOUT_SECONDS', DEFAULT_TIMEOUT_SECONDS)
+        )
+    return hasher
@@ -0,0 +1,122 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, inspect, text, update
+from database import db
+from models.igra import Igra, normalize_title, parse_player_range, create_search_index
+from models.actualUser import Korisnik
+from utils.trade_counters import reconcile_unread_trades
+
+
+def _add_missing_columns(connection):
+    inspector = inspect(connection)
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=connection.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            connection.execute(text(ddl))
+
+
+def _has_duplicates(connection, index):
+    columns = list(index.columns)
+    duplicates = db.select(*columns).group_by(*columns).having(func.count() > 1).limit(1)
+    return connection.execute(duplicates).first() is not None
+
+
+def _create_missing_indexes(connection):
+    inspector = inspect(connection)
+    for table in db.metadata.sorted_tables:
+        existing = set()
+        if inspector.has_table(table.name):
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.unique and _has_duplicates(connection, index):
+                print(f"Skipping unique index {index.name}: {table.name} has duplicate values.")
+                continue
+            index.create(connection)
+
+
+def _backfill_player_range():
+    rows = db.session.execute(
+        db.select(Igra.id, Igra.broj_igraca).where(Igra.min_igraca.is_(None))
+    ).all()
+    values = []
+    for game_id, players in rows:
+        min_players, max_players = parse_player_range(players)
+        if min_players is not None:
+            values.append({'id': game_id, 'min_igraca': min_players, 'max_igraca': max_players})
+    if values:
+        db.session.execute(update(Igra), values)
+
+
+def _backfill_normalized_titles():
+    rows = db.session.execute(
+        db.select(Igra.id, Igra.naziv).where(Igra.naziv_normaliziran.is_(None))
+    ).all()
+    if rows:
+        db.session.execute(update(Igra), [
+            {'id': game_id, 'naziv_normaliziran': normalize_title(naziv)}
+            for game_id, naziv in rows
+        ])
+
+
+def _backfill_image_flags():
+    for model in (Igra, Korisnik):
+        db.session.execute(
+            update(model)
+            .where(model.fotografija.is_not(None), model.has_image.is_(False))
+            .values(has_image=True, image_size=func.length(model.fotografija))
+        )
+
+
+def _backfill_image_mimetypes():
+    from utils.image_store import detect_mimetype, get_image_store
+    store = get_image_store()
+    for model in (Igra, Korisnik):
+        rows = db.session.execute(
+            db.select(model.id, model.image_hash)
+            .where(model.image_hash.is_not(None), model.image_mimetype.is_(None))
+        ).all()
+        values = []
+        for row_id, digest in rows:
+            try:
+                values.append({'id': row_id, 'image_mimetype': detect_mimetype(store.read_header(digest))})
+            except FileNotFoundError:
+                print(f"Missing image {digest} for {model.__name__} {row_id}")
+        if values:
+            db.session.execute(update(model), values)
+
+
+def upgrade_schema():
+    with db.engine.begin() as connection:
+        _add_missing_columns(connection)
+        _create_missing_indexes(connection)
+        create_search_index(connection)
+
+    _backfill_player_range()
+    _backfill_normalized_titles()
+    _backfill_image_flags()
+    _backfill_image_mimetypes()
+    reconcile_unread_trades()
+    db.session.commit()
+
+
+def init_database():
+    """Create missing tables and upgrade the schema; run once per deploy, never from every worker."""
+    db.create_all()
+    upgrade_schema()
+
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Create missing tables, columns and indexes and backfill derived data."""
+    init_database()
+    click.echo("Database is up to date")
@@ -0,0 +1,162 @@
+import random
+import re
+import socketserver
+import threading
+import time
+
+import click
+
+ADDRESS_PATTERN = re.compile(r'<([^>]*)>')
+
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+
+    def reply(self, *lines):
+        for line in lines:
+            self.wfile.write(f"{line}\r\n".encode())
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b'.\r\n':
+                return b''.join(lines)
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+    def handle(self):
+        sink = self.server.sink
+        sink.connection_opened()
+        sink.wait()
+        self.reply("220 playtrade-sink ESMTP")
+        mail_from, recipients = None, []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').rstrip('\r\n')
+            verb = command[:4].upper()
+            sink.wait()
+
+            if verb == 'EHLO':
+                self.reply("250-playtrade-sink", "250-AUTH PLAIN", "250 8BITMIME")
+            elif verb == 'HELO':
+                self.reply("250 playtrade-sink")
+            elif verb == 'AUTH':
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == 'MAIL':
+                match = ADDRESS_PATTERN.search(command)
+                mail_from, recipients = match.group(1) if match else '', []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                match = ADDRESS_PATTERN.search(command)
+                recipients.append(match.group(1) if match else '')
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self.read_data()
+                outcome = sink.outcome()
+                if outcome == 'drop':
+                    return
+                if outcome == 'fail':
+                    self.reply("451 4.3.0 Injected failure")
+                else:
+                    sink.record(mail_from, recipients, data)
+                    self.reply("250 OK")
+                mail_from, recipients = None, []
+            elif verb == 'RSET':
+                mail_from, recipients = None, []
+                self.reply("250 OK")
+            elif verb == 'NOOP':
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink:
+    """Local SMTP stand-in that records messages and can inject latency and failures."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, drop_rate=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.messages = []
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def outcome(self):
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.drop_rate:
+            return 'drop'
+        if roll < self.drop_rate + self.failure_rate:
+            return 'fail'
+        return 'ok'
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def record(self, mail_from, recipients, data):
+        with self._lock:
+            self.messages.append((mail_from, list(recipients), data))
+
+    def start(self):
+        self._server = _SinkServer((self.host, self.port), _SMTPHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='smtp-sink', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1')
+@click.option('--port', default=1025, type=int)
+@click.option('--latency', default=0.0, type=float, help='Seconds added to every SMTP reply.')
+@click.option('--failure-rate', default=0.0, type=float, help='Share of messages rejected with 451.')
+@click.option('--drop-rate', default=0.0, type=float, help='Share of messages that drop the connection.')
+def main(host, port, latency, failure_rate, drop_rate):
+    """Run a local SMTP sink for development."""
+    sink = SMTPSink(host, port, latency, failure_rate, drop_rate).start()
+    click.echo(f"SMTP sink listening on {sink.host}:{sink.port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        click.echo(f"{len(sink.messages)} messages received")
+    finally:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
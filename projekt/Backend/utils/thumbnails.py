@@ -0,0 +1,120 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from flask import current_app
+from PIL import Image, ImageOps
+from utils.image_store import DEFAULT_MAX_IMAGE_PIXELS, image_too_large
+
+RENDITION_WIDTHS = {
+    'thumb': 160,
+    'card': 480,
+    'full': None
+}
+ALLOWED_WIDTHS = (160, 320, 480, 800, 1200)
+
+
+def resolve_width(size=None, width=None):
+    if width:
+        return next((allowed for allowed in ALLOWED_WIDTHS if allowed >= width), None)
+    return RENDITION_WIDTHS.get(size)
+
+
+def render_thumbnail(source, width, max_pixels=DEFAULT_MAX_IMAGE_PIXELS):
+    with Image.open(source) as image:
+        if image_too_large(image, max_pixels):
+            raise Image.DecompressionBombError(f"{image.width}x{image.height} exceeds {max_pixels} pixels")
+        if image.format == 'JPEG' and image.width > width:
+            image.draft('RGB', (width, width * image.height // image.width))
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            image.thumbnail((width, width * image.height // image.width))
+        output = BytesIO()
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image.save(output, format='PNG', optimize=True)
+            return output.getvalue(), 'png'
+        image.convert('RGB').save(output, format='JPEG', quality=82, optimize=True)
+        return output.getvalue(), 'jpg'
+
+
+class ThumbnailCache:
+    def __init__(self, root, max_bytes, workers=2, max_pixels=DEFAULT_MAX_IMAGE_PIXELS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='thumbnail')
+        self.lock = threading.Lock()
+        self.pending = {}
+        os.makedirs(root, exist_ok=True)
+        self.total_bytes = sum(
+            entry.stat().st_size for entry in os.scandir(root) if entry.is_file()
+        )
+
+    def _find(self, key):
+        for extension in ('jpg', 'png'):
+            path = os.path.join(self.root, f"{key}.{extension}")
+            if os.path.exists(path):
+                os.utime(path)
+                return path
+        return None
+
+    def _render(self, key, source, width):
+        data, extension = render_thumbnail(source, width, self.max_pixels)
+        path = os.path.join(self.root, f"{key}.{extension}")
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        with self.lock:
+            self.total_bytes += len(data)
+        self._evict()
+        return path
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        entries = sorted(
+            (entry for entry in os.scandir(self.root) if entry.is_file() and not entry.name.endswith('.tmp')),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            with self.lock:
+                if self.total_bytes <= self.max_bytes:
+                    return
+                try:
+                    size = entry.stat().st_size
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                self.total_bytes -= size
+
+    def get(self, digest, width, source, timeout=30):
+        key = f"{digest}-{width}"
+        path = self._find(key)
+        if path:
+            return path
+        with self.lock:
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = self.executor.submit(self._render, key, source, width)
+                future.add_done_callback(lambda done: self._forget(key, done))
+        return future.result(timeout=timeout)
+
+    def _forget(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+
+def get_thumbnail_cache():
+    cache = current_app.extensions.get('thumbnail_cache')
+    if cache is None:
+        root = current_app.config.get('THUMBNAIL_CACHE_DIR') or os.path.join(current_app.instance_path, 'thumbnails')
+        cache = current_app.extensions['thumbnail_cache'] = ThumbnailCache(
+            root,
+            current_app.config.get('THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+            current_app.config.get('THUMBNAIL_WORKERS', 2),
+            current_app.config.get('MAX_IMAGE_PIXELS', DEFAULT_MAX_IMAGE_PIXELS)
+        )
+    return cache
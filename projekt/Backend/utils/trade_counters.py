@@ -0,0 +1,42 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, update
+from database import db
+from models.actualUser import Korisnik
+from models.zamjena import Zamjena
+
+
+def adjust_unread_trades(user_id, delta):
+    db.session.execute(
+        update(Korisnik)
+        .where(Korisnik.id == user_id)
+        .values(broj_novih_zamjena=Korisnik.broj_novih_zamjena + delta)
+    )
+
+
+def unread_trades_subquery():
+    return db.select(func.count(Zamjena.id)).where(
+        Zamjena.id_primatelj == Korisnik.id,
+        Zamjena.primatelj_vidio.is_(False),
+        Zamjena.status == 'pending'
+    ).scalar_subquery()
+
+
+def reconcile_unread_trades():
+    actual = unread_trades_subquery()
+    result = db.session.execute(
+        update(Korisnik)
+        .where(Korisnik.broj_novih_zamjena != actual)
+        .values(broj_novih_zamjena=actual)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+@click.command('reconcile-trade-counters')
+@with_appcontext
+def reconcile_trade_counters_command():
+    """Recompute unread trade counters from the zamjena table."""
+    repaired = reconcile_unread_trades()
+    db.session.commit()
+    click.echo(f"{repaired} counters repaired")
@@ -0,0 +1,303 @@
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from database import db
+from models.igra import Igra
+from models.listazelja import ListaZelja
+from models.ponuda import Ponuda
+
+MAX_CYCLE_LENGTH = 4
+DEFAULT_MAX_AGE_SECONDS = 60
+
+
+class TradeGraph:
+    """Bipartite graph of users and the titles they list or want.
+
+    Users and normalized titles are interned to dense integers. User u points
+    at user v when u wants a title v lists; those edges are never materialized,
+    so a popular title costs O(listers + wishers) instead of their product and
+    every listing or wish change is a constant-time update.
+    """
+
+    def __init__(self):
+        self._user_index = {}
+        self._user_ids = []
+        self._title_index = {}
+        self._wants = []
+        self._listings = []
+        self._wanters = []
+        self._listers = []
+
+    def __len__(self):
+        return len(self._user_ids)
+
+    def _user(self, user_id):
+        index = self._user_index.get(user_id)
+        if index is None:
+            index = self._user_index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._wants.append(set())
+            self._listings.append({})
+        return index
+
+    def _title(self, title):
+        index = self._title_index.get(title)
+        if index is None:
+            index = self._title_index[title] = len(self._wanters)
+            self._wanters.append(set())
+            self._listers.append(set())
+        return index
+
+    def _add_wish(self, u, t):
+        self._wants[u].add(t)
+        self._wanters[t].add(u)
+
+    def _remove_wish(self, u, t):
+        self._wants[u].discard(t)
+        self._wanters[t].discard(u)
+
+    def _add_listing(self, v, game_id, t):
+        self._listings[v].setdefault(t, set()).add(game_id)
+        self._listers[t].add(v)
+
+    def _remove_listing(self, v, game_id, t):
+        games = self._listings[v].get(t)
+        if games is None:
+            return
+        games.discard(game_id)
+        if not games:
+            del self._listings[v][t]
+            self._listers[t].discard(v)
+
+    def add_wish(self, user_id, title):
+        self._add_wish(self._user(user_id), self._title(title))
+
+    def remove_wish(self, user_id, title):
+        if user_id in self._user_index and title in self._title_index:
+            self._remove_wish(self._user_index[user_id], self._title_index[title])
+
+    def add_listing(self, user_id, game_id, title):
+        self._add_listing(self._user(user_id), game_id, self._title(title))
+
+    def remove_listing(self, user_id, game_id, title):
+        if user_id in self._user_index and title in self._title_index:
+            self._remove_listing(self._user_index[user_id], game_id, self._title_index[title])
+
+    def set_user(self, user_id, listings, wishes):
+        u = self._user(user_id)
+        wanted = {self._title(title) for title in wishes}
+        for t in self._wants[u] - wanted:
+            self._remove_wish(u, t)
+        for t in wanted - self._wants[u]:
+            self._add_wish(u, t)
+
+        listed = {(game_id, self._title(title)) for game_id, title in listings}
+        current = {(game_id, t) for t, games in self._listings[u].items() for game_id in games}
+        for game_id, t in current - listed:
+            self._remove_listing(u, game_id, t)
+        for game_id, t in listed - current:
+            self._add_listing(u, game_id, t)
+
+    def games_between(self, receiver_id, giver_id):
+        receiver, giver = self._user_index[receiver_id], self._user_index[giver_id]
+        listings = self._listings[giver]
+        return sorted(game_id for t in self._wants[receiver] if t in listings for game_id in listings[t])
+
+    def _successors(self, u, allowed=None):
+        seen = set()
+        for t in self._wants[u]:
+            listers = self._listers[t]
+            if allowed is not None and len(allowed) < len(listers):
+                candidates = (v for v in allowed if v in listers)
+            else:
+                candidates = listers if allowed is None else (v for v in listers if v in allowed)
+            for v in candidates:
+                if v != u and v not in seen:
+                    seen.add(v)
+                    yield v
+
+    def _predecessors(self, users):
+        titles = {t for v in users for t in self._listings[v]}
+        return {u for t in titles for u in self._wanters[t]}
+
+    def _cycles_from(self, s, max_length, limit, above=-1):
+        found = []
+        closing = {u for u in self._predecessors((s,)) if u > above and u != s}
+        if not closing:
+            return found
+
+        def emit(*path):
+            found.append(path)
+            return limit is not None and len(found) >= limit
+
+        first = [a for a in self._successors(s) if a > above]
+        for a in first:
+            if a in closing and emit(s, a):
+                return found
+        if max_length >= 3:
+            for a in first:
+                for b in self._successors(a, closing):
+                    if b != s and emit(s, a, b):
+                        return found
+        if max_length >= 4:
+            second = {b for b in self._predecessors(closing) if b > above and b != s}
+            for a in first:
+                for b in self._successors(a, second):
+                    for c in self._successors(b, closing):
+                        if c != a and c != s and emit(s, a, b, c):
+                            return found
+        return found
+
+    def cycles_for(self, user_id, max_length=MAX_CYCLE_LENGTH, limit=20):
+        s = self._user_index.get(user_id)
+        if s is None:
+            return []
+        return [[self._user_ids[i] for i in cycle] for cycle in self._cycles_from(s, max_length, limit)]
+
+    def find_cycles(self, max_length=MAX_CYCLE_LENGTH, limit=None):
+        cycles = []
+        for s in range(len(self._user_ids)):
+            remaining = None if limit is None else limit - len(cycles)
+            cycles.extend(self._cycles_from(s, max_length, remaining, above=s))
+            if limit is not None and len(cycles) >= limit:
+                break
+        return [[self._user_ids[i] for i in cycle] for cycle in cycles]
+
+
+def _listing_rows(user_ids=None):
+    query = db.select(Ponuda.id_korisnik, Igra.id, Igra.naziv_normaliziran).join(
+        Igra, Ponuda.id_igra == Igra.id
+    ).where(Ponuda.jeAktivna == 1, Igra.naziv_normaliziran.is_not(None))
+    if user_ids is not None:
+        query = query.where(Ponuda.id_korisnik.in_(user_ids))
+    return db.session.execute(query)
+
+
+def _wish_rows(user_ids=None):
+    query = db.select(ListaZelja.id_korisnik, Igra.naziv_normaliziran).join(
+        Igra, ListaZelja.id_igra == Igra.id
+    ).where(Igra.naziv_normaliziran.is_not(None)).distinct()
+    if user_ids is not None:
+        query = query.where(ListaZelja.id_korisnik.in_(user_ids))
+    return db.session.execute(query)
+
+
+class TradeMatcher:
+    """Keeps a TradeGraph in memory and answers cycle suggestions from it.
+
+    Commits only mark users dirty in the process that made them, so the graph
+    is also rebuilt once it is older than `max_age` seconds, and every
+    suggested step is checked against the active Ponuda and wishlist rows
+    before it is returned. Users on a stale cycle are refreshed and the
+    search runs once more.
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._graph = None
+        self._loaded_at = 0
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def mark_dirty(self, user_ids):
+        with self._lock:
+            self._dirty.update(user_ids)
+
+    def invalidate(self):
+        with self._lock:
+            self._graph = None
+            self._dirty.clear()
+
+    def _load(self):
+        graph = TradeGraph()
+        for user_id, game_id, title in _listing_rows():
+            graph.add_listing(user_id, game_id, title)
+        for user_id, title in _wish_rows():
+            graph.add_wish(user_id, title)
+        self._loaded_at = time.monotonic()
+        return graph
+
+    def _refresh(self, user_ids):
+        listings = {user_id: [] for user_id in user_ids}
+        wishes = {user_id: [] for user_id in user_ids}
+        for user_id, game_id, title in _listing_rows(user_ids):
+            listings[user_id].append((game_id, title))
+        for user_id, title in _wish_rows(user_ids):
+            wishes[user_id].append(title)
+        for user_id in user_ids:
+            self._graph.set_user(user_id, listings[user_id], wishes[user_id])
+
+    def _cycles(self, user_id, limit):
+        suggestions = []
+        for cycle in self._graph.cycles_for(user_id, limit=limit):
+            steps = []
+            for i, receiver_id in enumerate(cycle):
+                giver_id = cycle[(i + 1) % len(cycle)]
+                steps.append((giver_id, receiver_id, self._graph.games_between(receiver_id, giver_id)[0]))
+            suggestions.append(steps)
+        return suggestions
+
+    def _stale_users(self, suggestions):
+        user_ids = list({user for steps in suggestions for step in steps for user in step[:2]})
+        if not user_ids:
+            return set()
+        titles = {(user_id, game_id): title for user_id, game_id, title in _listing_rows(user_ids)}
+        wishes = set(_wish_rows(user_ids))
+        stale = set()
+        for steps in suggestions:
+            for giver_id, receiver_id, game_id in steps:
+                title = titles.get((giver_id, game_id))
+                if title is None or (receiver_id, title) not in wishes:
+                    stale.update((giver_id, receiver_id))
+        return stale
+
+    def suggest(self, user_id, limit):
+        with self._lock:
+            if self._graph is None or time.monotonic() - self._loaded_at >= self.max_age:
+                self._graph = self._load()
+            elif self._dirty:
+                self._refresh(list(self._dirty))
+            self._dirty.clear()
+
+            suggestions = self._cycles(user_id, limit)
+            stale = self._stale_users(suggestions)
+            if stale:
+                self._refresh(list(stale))
+                suggestions = self._cycles(user_id, limit)
+                stale = self._stale_users(suggestions)
+            return [steps for steps in suggestions if stale.isdisjoint(step[0] for step in steps)]
+
+
+def get_trade_matcher():
+    matcher = current_app.extensions.get('trade_matcher')
+    if matcher is None:
+        matcher = current_app.extensions['trade_matcher'] = TradeMatcher(
+            current_app.config.get('TRADE_GRAPH_MAX_AGE_SECONDS', DEFAULT_MAX_AGE_SECONDS)
+        )
+    return matcher
+
+
+def mark_trade_graph_dirty(*user_ids):
+    matcher = current_app.extensions.get('trade_matcher')
+    if matcher is not None:
+        db.session.info.setdefault('trade_graph_changes', []).append((matcher, user_ids))
+
+
+def invalidate_trade_graph():
+    mark_trade_graph_dirty(None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_graph_changes(session):
+    for matcher, user_ids in session.info.pop('trade_graph_changes', ()):
+        if user_ids == (None,):
+            matcher.invalidate()
+        else:
+            matcher.mark_dirty(user_ids)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _drop_graph_changes(session):
+    session.info.pop('trade_graph_changes', None)
@@ -0,0 +1,99 @@
+import os
+import re
+import time
+import uuid
+
+from flask import current_app
+from utils.image_store import ImageUploadError, check_image_header, max_image_size, read_chunks, save_upload
+
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+DEFAULT_MAX_SESSIONS = 5
+HEADER_SIZE = 16
+UPLOAD_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+class UploadOffsetMismatch(Exception):
+    def __init__(self, offset):
+        super().__init__(f"Expected offset {offset}")
+        self.offset = offset
+
+
+def _upload_dir(user_id=None):
+    root = current_app.config.get('UPLOAD_TMP_DIR') or os.path.join(current_app.instance_path, 'uploads')
+    if user_id is not None:
+        root = os.path.join(root, str(int(user_id)))
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def _part_path(upload_id, user_id):
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id or ''):
+        return None
+    path = os.path.join(_upload_dir(user_id), f"{upload_id}.part")
+    return path if os.path.exists(path) else None
+
+
+def _remove_stale_uploads(root):
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if name.endswith('.part') and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+
+
+def create_upload(user_id, total_size=None):
+    """Each user holds at most UPLOAD_MAX_SESSIONS open sessions, which bounds their temporary disk use."""
+    if total_size is not None and total_size > max_image_size():
+        raise ImageUploadError("Slika je prevelika.", 413)
+    _remove_stale_uploads(_upload_dir())
+    root = _upload_dir(user_id)
+    open_sessions = sum(1 for name in os.listdir(root) if name.endswith('.part'))
+    if open_sessions >= current_app.config.get('UPLOAD_MAX_SESSIONS', DEFAULT_MAX_SESSIONS):
+        raise ImageUploadError("Previše započetih uploada.", 429)
+    upload_id = uuid.uuid4().hex
+    open(os.path.join(root, f"{upload_id}.part"), 'wb').close()
+    return upload_id
+
+
+def upload_offset(upload_id, user_id):
+    path = _part_path(upload_id, user_id)
+    return os.path.getsize(path) if path else None
+
+
+def append_chunk(upload_id, user_id, offset, stream):
+    path = _part_path(upload_id, user_id)
+    if path is None:
+        raise KeyError(upload_id)
+    current = os.path.getsize(path)
+    if offset != current:
+        raise UploadOffsetMismatch(current)
+
+    header = None
+    if current < HEADER_SIZE:
+        with open(path, 'rb') as part:
+            header = part.read()
+
+    limit = max_image_size()
+    with open(path, 'ab') as part:
+        for chunk in read_chunks(stream):
+            if header is not None:
+                header += chunk[:HEADER_SIZE - len(header)]
+                if len(header) == HEADER_SIZE:
+                    check_image_header(header)
+                    header = None
+            if current + len(chunk) > limit:
+                raise ImageUploadError("Slika je prevelika.", 413)
+            part.write(chunk)
+            current += len(chunk)
+    return current
+
+
+def finish_upload(upload_id, user_id):
+    path = _part_path(upload_id, user_id)
+    if path is None:
+        raise ImageUploadError("Upload nije pronađen.", 404)
+    with open(path, 'rb') as part:
+        stored = save_upload(part)
+    os.remove(path)
+    return stored